@@ -0,0 +1,244 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+# Daily columns aggregated over each patient's whole history
+AGGREGATE_COLUMNS = ['glucose_mg_dl', 'systolic_bp', 'adherence_avg']
+PATIENT_RISK_SCORES = ['glucose_variability_score', 'bp_risk_score', 'adherence_risk_score']
+
+# Running statistics (zero when empty) and extremes/open-day values (NaN when empty)
+_SUM_STATS = ('count', 's1', 's2')
+_VALUE_STATS = ('vmax', 'vmin', 'open_values')
+
+
+def _column_values(daily):
+    """(records, AGGREGATE_COLUMNS) float block; absent columns are all-missing"""
+    return np.column_stack([
+        daily[col].to_numpy(dtype=np.float64) if col in daily.columns else np.full(len(daily), np.nan)
+        for col in AGGREGATE_COLUMNS
+    ]).reshape(len(daily), len(AGGREGATE_COLUMNS))
+
+
+def risk_scores(count, s1, s2, vmax, vmin):
+    """
+    Composite risk scores from per-column sufficient statistics
+
+    Each argument is an (n, len(AGGREGATE_COLUMNS)) array. Statistics a
+    patient has no values for count as 0, and a single value has std 0.
+
+    Returns:
+        dict: score name -> (n,) array
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count >= 1, s1 / count, 0.0)
+        var = np.where(count >= 2, (s2 - s1 * s1 / count) / (count - 1), 0.0)
+        std = np.sqrt(np.maximum(var, 0.0))
+        variability = np.where(mean != 0, std / mean, 0.0)
+    vmax = np.where(count >= 1, vmax, 0.0)
+    vmin = np.where(count >= 1, vmin, 0.0)
+
+    glucose, systolic, adherence = (AGGREGATE_COLUMNS.index(col)
+                                    for col in ('glucose_mg_dl', 'systolic_bp', 'adherence_avg'))
+    return {
+        'glucose_variability_score': variability[:, glucose],
+        'bp_risk_score': (mean[:, systolic] > 140).astype(int) + (vmax[:, systolic] > 180).astype(int),
+        'adherence_risk_score': (mean[:, adherence] < 0.8).astype(int) + (vmin[:, adherence] < 0.6).astype(int),
+    }
+
+
+def risk_scores_as_of(daily):
+    """
+    Risk scores from each patient's records up to and including every row
+
+    Args:
+        daily (DataFrame): Daily records sorted by patient_id then date
+
+    Returns:
+        DataFrame: PATIENT_RISK_SCORES aligned to ``daily``
+    """
+    keys = pd.factorize(daily['patient_id'])[0]
+    values = pd.DataFrame(_column_values(daily), index=daily.index)
+    filled = values.fillna(0.0)
+
+    def running(frame, how):
+        # Grouped cumulative extremes are NaN on missing rows; carry the last one forward
+        result = getattr(frame.groupby(keys, sort=False), how)()
+        return result.groupby(keys, sort=False).ffill().to_numpy()
+
+    scores = risk_scores(
+        values.notna().groupby(keys, sort=False).cumsum().to_numpy(dtype=np.float64),
+        filled.groupby(keys, sort=False).cumsum().to_numpy(),
+        (filled * filled).groupby(keys, sort=False).cumsum().to_numpy(),
+        running(values, 'cummax'),
+        running(values, 'cummin'),
+    )
+    return pd.DataFrame(scores, index=daily.index)
+
+
+class PatientAggregateTable:
+    """
+    One row per patient of whole-history aggregates behind the composite risk scores
+
+    For each column in AGGREGATE_COLUMNS the table keeps count, sum, sum of
+    squares, max and min over the patient's daily records (missing values
+    skipped); the scores are derived from them on read. The patient's
+    latest (open) day is held apart from the closed days, so a streamed
+    reading that revises that day replaces its values instead of adding to
+    them, and a reading on a new day folds the open day in with O(1) work.
+
+    The table lives next to the daily frame rather than in it: each score is
+    stored once per patient and joined only where patient feature rows are
+    assembled.
+
+    A built table is not written in place: ``with_days`` returns a new
+    table that shares the arrays and keeps the changed patients' statistics
+    in a small per-row overlay, so a snapshot holding this table keeps
+    reading the same scores.
+    """
+
+    def __init__(self, patient_ids, count, s1, s2, vmax, vmin, open_values, open_days):
+        self._rows = {pid: i for i, pid in enumerate(patient_ids)}
+        self.count, self.s1, self.s2 = count, s1, s2
+        self.vmax, self.vmin = vmax, vmin
+        self.open_values = open_values
+        self.open_days = list(open_days)
+        self._overlay = {}
+
+    @classmethod
+    def from_daily(cls, daily):
+        """
+        Build the table from daily records
+
+        Args:
+            daily (DataFrame): Daily records with patient_id and date
+        """
+        df = daily.sort_values(['patient_id', 'date'], kind='stable')
+        codes, patient_ids = pd.factorize(df['patient_id'], sort=False)
+        values = _column_values(df)
+        # The last record of each patient is their open day
+        is_open = np.r_[codes[1:] != codes[:-1], True][:len(df)]
+        n = len(patient_ids)
+
+        closed = pd.DataFrame(values[~is_open])
+        grouped = closed.groupby(codes[~is_open])
+
+        def per_patient(result):
+            return result.reindex(range(n)).to_numpy(dtype=np.float64)
+
+        count = np.nan_to_num(per_patient(grouped.count()), nan=0.0)
+        s1 = np.nan_to_num(per_patient(grouped.sum()), nan=0.0)
+        s2 = np.nan_to_num(per_patient((closed * closed).groupby(codes[~is_open]).sum()), nan=0.0)
+        vmax = per_patient(grouped.max())
+        vmin = per_patient(grouped.min())
+
+        open_values = np.full((n, len(AGGREGATE_COLUMNS)), np.nan)
+        open_values[codes[is_open]] = values[is_open]
+        open_days = [None] * n
+        for code, day in zip(codes[is_open], df['date'].to_numpy()[is_open]):
+            open_days[code] = pd.Timestamp(day).normalize()
+
+        return cls(list(patient_ids), count, s1, s2, vmax, vmin, open_values, open_days)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._rows
+
+    def _row_stats(self, i):
+        """One row's statistics and open day (overlaid values if the row was updated)"""
+        if i in self._overlay:
+            return self._overlay[i]
+        stats = {name: getattr(self, name)[i] for name in _SUM_STATS + _VALUE_STATS}
+        stats['open_day'] = self.open_days[i]
+        return stats
+
+    def with_days(self, days):
+        """
+        New table with patients' latest-day values set
+
+        For each entry, a later day than the patient's open one closes the
+        open day into the running statistics first; the open day itself is
+        overwritten; earlier days are ignored (as the streaming rolling state
+        drops them). This table is left unchanged.
+
+        Args:
+            days (list): (patient_id, day, values) in arrival order, values
+                being column -> that day's value (missing columns are NaN);
+                patients not in the table are ignored
+
+        Returns:
+            PatientAggregateTable: The updated table
+        """
+        overlay = dict(self._overlay)
+        for patient_id, day, values in days:
+            i = self._rows.get(patient_id)
+            if i is None:
+                continue
+            stats = dict(overlay[i] if i in overlay else self._row_stats(i))
+            day = pd.Timestamp(day).normalize()
+            current = stats['open_day']
+            if current is not None and day < current:
+                continue
+            if current is not None and day > current:
+                closing = stats['open_values']
+                valid = ~np.isnan(closing)
+                v = np.where(valid, closing, 0.0)
+                stats['count'] = stats['count'] + valid
+                stats['s1'] = stats['s1'] + v
+                stats['s2'] = stats['s2'] + v * v
+                stats['vmax'] = np.where(valid, np.fmax(stats['vmax'], closing), stats['vmax'])
+                stats['vmin'] = np.where(valid, np.fmin(stats['vmin'], closing), stats['vmin'])
+            stats['open_values'] = np.array(
+                [np.nan if values.get(col) is None else values[col] for col in AGGREGATE_COLUMNS],
+                dtype=np.float64
+            )
+            stats['open_day'] = day
+            overlay[i] = stats
+
+        # Shallow copy: the arrays and the patient index are shared
+        table = copy.copy(self)
+        table._overlay = overlay
+        return table
+
+    def _gathered(self, name, rows):
+        """Statistic ``name`` for the given rows, with overlaid rows substituted"""
+        block = getattr(self, name)[rows]
+        if self._overlay:
+            for k in np.flatnonzero(np.isin(rows, np.fromiter(self._overlay, dtype=np.int64))):
+                block[k] = self._overlay[rows[k]][name]
+        return block
+
+    def scores(self, patient_ids=None):
+        """
+        Composite risk scores, one row per patient
+
+        Args:
+            patient_ids (list): Patients to read (all, in table order, if None);
+                unknown patients get NaN
+
+        Returns:
+            DataFrame: PATIENT_RISK_SCORES indexed by patient_id
+        """
+        ids = list(self._rows) if patient_ids is None else list(patient_ids)
+        positions = np.array([self._rows.get(pid, -1) for pid in ids], dtype=np.int64)
+        known = positions >= 0
+        rows = positions[known]
+
+        open_values = self._gathered('open_values', rows)
+        valid = ~np.isnan(open_values)
+        v = np.where(valid, open_values, 0.0)
+        scores = risk_scores(
+            self._gathered('count', rows) + valid,
+            self._gathered('s1', rows) + v,
+            self._gathered('s2', rows) + v * v,
+            np.fmax(self._gathered('vmax', rows), open_values),
+            np.fmin(self._gathered('vmin', rows), open_values),
+        )
+
+        frame = pd.DataFrame(np.nan, index=pd.Index(ids, name='patient_id'), columns=PATIENT_RISK_SCORES)
+        for name, score in scores.items():
+            frame.loc[known, name] = score
+        return frame
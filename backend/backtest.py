@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, average_precision_score
+from sklearn.model_selection import TimeSeriesSplit
+
+
+def default_cutoffs(dates, freq='7D', warmup_days=30):
+    """
+    Evenly spaced cutoff dates over the span of the data
+
+    The first ``warmup_days`` are skipped so every patient has had a chance
+    to accumulate a lookback window before being scored.
+    """
+    start = dates.min().normalize() + pd.Timedelta(days=warmup_days)
+    return pd.date_range(start, dates.max().normalize(), freq=freq)
+
+
+def as_of_rows(df, cutoffs, min_history=1, max_staleness_days=None):
+    """
+    Locate each patient's last record on or before every cutoff
+
+    One ``merge_asof`` over the (patient, cutoff) grid replaces a per-cutoff,
+    per-patient history scan.
+
+    Args:
+        df (DataFrame): Daily records with patient_id and date
+        cutoffs (DatetimeIndex): Sorted cutoff dates
+        min_history (int): Records a patient needs up to the cutoff to be scored
+        max_staleness_days (int): Skip patients whose last record is older than
+            this many days at the cutoff (no limit if None)
+
+    Returns:
+        DataFrame: patient_id, cutoff and ``row`` (positional index into ``df``)
+    """
+    history_len = df.groupby('patient_id', sort=False).cumcount().to_numpy() + 1
+    records = pd.DataFrame({
+        'date': df['date'].to_numpy(),
+        'patient_id': df['patient_id'].to_numpy(),
+        'row': np.arange(len(df)),
+    }).sort_values('date', kind='stable')
+
+    patients = df['patient_id'].unique()
+    grid = pd.DataFrame({
+        'cutoff': np.repeat(np.asarray(cutoffs, dtype='datetime64[ns]'), len(patients)),
+        'patient_id': np.tile(patients, len(cutoffs)),
+    })
+
+    joined = pd.merge_asof(grid, records, left_on='cutoff', right_on='date',
+                           by='patient_id', direction='backward')
+    joined = joined.dropna(subset=['row'])
+    joined['row'] = joined['row'].astype(np.int64)
+
+    keep = history_len[joined['row'].to_numpy()] >= min_history
+    if max_staleness_days is not None:
+        keep &= (joined['cutoff'] - joined['date']).dt.days.to_numpy() <= max_staleness_days
+    return joined.loc[keep, ['patient_id', 'cutoff', 'row']].reset_index(drop=True)
+
+
+def trailing_means(df, columns, window):
+    """Mean of each column over every record's trailing ``window`` records (per patient)"""
+    if not columns:
+        return pd.DataFrame(index=df.index)
+    means = (df.groupby('patient_id', sort=False)[columns]
+             .rolling(window, min_periods=1).mean()
+             .reset_index(level=0, drop=True))
+    return means.reindex(df.index)
+
+
+def rolling_origin_splits(n_cutoffs, n_splits=5, horizon_days=90, freq_days=7):
+    """
+    Expanding-window train/test splits over cutoff positions
+
+    ``TimeSeriesSplit`` with a gap of one label horizon, so a model trained
+    at an origin never sees labels that resolve after that origin.
+    """
+    gap = int(np.ceil(horizon_days / max(freq_days, 1)))
+    splitter = TimeSeriesSplit(n_splits=n_splits, gap=gap)
+    return list(splitter.split(np.arange(n_cutoffs)))
+
+
+def metrics_by_cutoff(scores):
+    """
+    Discrimination metrics for each cutoff date
+
+    Args:
+        scores (DataFrame): cutoff, target and risk_probability per scored patient
+
+    Returns:
+        list: One dict per cutoff (AUC/AUPRC are None when only one class is present)
+    """
+    results = []
+    for cutoff, group in scores.groupby('cutoff', sort=True):
+        y = group['target'].to_numpy()
+        p = group['risk_probability'].to_numpy()
+        both_classes = 0 < y.sum() < len(y)
+        results.append({
+            'cutoff': pd.Timestamp(cutoff).strftime('%Y-%m-%d'),
+            'patients': int(len(group)),
+            'positives': int(y.sum()),
+            'auc_roc': float(roc_auc_score(y, p)) if both_classes else None,
+            'auc_pr': float(average_precision_score(y, p)) if both_classes else None,
+            'mean_risk': float(p.mean()),
+        })
+    return results
@@ -0,0 +1,368 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+
+# Columns of the daily records HealthcareRiskPredictor consumes
+SCHEMA_COLUMNS = [
+    'patient_id', 'date', 'glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
+    'heart_rate', 'steps', 'exercise_minutes', 'sleep_hours', 'adherence_avg',
+    'hba1c', 'creatinine', 'egfr', 'cholesterol_total', 'cholesterol_ldl',
+    'age', 'comorbidity_count', 'bmi', 'primary_condition', 'baseline_risk',
+    'gender', 'smoking_history', 'deterioration_90d',
+]
+
+CATEGORICAL_DEFAULTS = {
+    'primary_condition': 'unknown',
+    'baseline_risk': 'unknown',
+    'gender': 'unknown',
+    'smoking_history': 'unknown',
+}
+
+
+def to_schema(records):
+    """Add any missing schema columns (numeric as NaN, categorical as 'unknown') and order them"""
+    records = records.copy()
+    for col in SCHEMA_COLUMNS:
+        if col not in records.columns:
+            records[col] = CATEGORICAL_DEFAULTS.get(col, np.nan)
+    return records[SCHEMA_COLUMNS]
+
+
+# ----------------------------------------------------------------------
+# Unix compress (.Z) decoding
+# ----------------------------------------------------------------------
+class LZWReader(io.RawIOBase):
+    """
+    Streaming decoder for Unix ``compress`` (.Z, adaptive LZW) data
+
+    Reads the compressed stream in small chunks and keeps only the code
+    table (at most 2**maxbits entries), so memory does not depend on the
+    size of the input.
+    """
+
+    CLEAR = 256
+
+    def __init__(self, raw, chunk_size=64 * 1024):
+        header = raw.read(3)
+        if len(header) < 3 or header[:2] != b'\x1f\x9d':
+            raise ValueError("Not a Unix compress (.Z) stream")
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.max_bits = header[2] & 0x1f
+        self.block_mode = bool(header[2] & 0x80)
+        if not 9 <= self.max_bits <= 16:
+            raise ValueError(f"Unsupported LZW code width: {self.max_bits}")
+
+        self.max_max_code = 1 << self.max_bits
+        self.prefix = [0] * self.max_max_code
+        self.suffix = bytearray(self.max_max_code)
+        self.suffix[:256] = bytes(range(256))
+        self._reset_width()
+        self.free_ent = 257 if self.block_mode else 256
+
+        self.chunk = b''
+        self.chunk_pos = 0
+        self.bit_buffer = 0
+        self.bit_count = 0
+        self.eof = False
+        self.old_code = -1
+        self.fin_char = 0
+        self.pending = bytearray()
+
+    def _reset_width(self):
+        self.n_bits = 9
+        self.max_code = (1 << self.n_bits) - 1
+        self.group_codes = 0
+
+    def readable(self):
+        return True
+
+    def _read_code(self):
+        # Codes are packed LSB-first; fetch more input until a whole code is buffered
+        while self.bit_count < self.n_bits:
+            if self.chunk_pos >= len(self.chunk):
+                self.chunk = self.raw.read(self.chunk_size)
+                self.chunk_pos = 0
+                if not self.chunk:
+                    return None
+            self.bit_buffer |= self.chunk[self.chunk_pos] << self.bit_count
+            self.chunk_pos += 1
+            self.bit_count += 8
+        code = self.bit_buffer & ((1 << self.n_bits) - 1)
+        self.bit_buffer >>= self.n_bits
+        self.bit_count -= self.n_bits
+        self.group_codes += 1
+        return code
+
+    def _skip_to_group_end(self):
+        # compress emits codes in groups of 8; a width change discards the rest of the group
+        remaining = (8 - self.group_codes % 8) % 8
+        for _ in range(remaining):
+            if self._read_code() is None:
+                break
+
+    def _decode_some(self, limit):
+        out = self.pending
+        while len(out) < limit:
+            if self.free_ent > self.max_code and self.n_bits < self.max_bits:
+                self._skip_to_group_end()
+                self.n_bits += 1
+                self.group_codes = 0
+                self.max_code = self.max_max_code if self.n_bits == self.max_bits else (1 << self.n_bits) - 1
+
+            code = self._read_code()
+            if code is None:
+                self.eof = True
+                break
+
+            if self.old_code == -1:
+                if code >= 256:
+                    raise ValueError("Corrupt .Z stream: first code is not a literal")
+                self.old_code = self.fin_char = code
+                out.append(code)
+                continue
+
+            if code == self.CLEAR and self.block_mode:
+                self._skip_to_group_end()
+                self._reset_width()
+                self.free_ent = 256
+                continue
+
+            in_code = code
+            stack = bytearray()
+            if code >= self.free_ent:
+                if code > self.free_ent:
+                    raise ValueError("Corrupt .Z stream: code out of range")
+                stack.append(self.fin_char)
+                code = self.old_code
+            while code >= 256:
+                stack.append(self.suffix[code])
+                code = self.prefix[code]
+            self.fin_char = code
+            stack.append(code)
+            stack.reverse()
+            out += stack
+
+            if self.free_ent < self.max_max_code:
+                self.prefix[self.free_ent] = self.old_code
+                self.suffix[self.free_ent] = self.fin_char
+                self.free_ent += 1
+            self.old_code = in_code
+
+    def readinto(self, b):
+        if not self.pending and not self.eof:
+            self._decode_some(max(len(b), 1))
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        del self.pending[:n]
+        return n
+
+
+def open_compressed(fileobj):
+    """Buffered binary file object decoding a .Z stream on the fly"""
+    return io.BufferedReader(LZWReader(fileobj))
+
+
+# ----------------------------------------------------------------------
+# UCI Diabetes (diabetes.zip -> diabetes-data.tar.Z -> data-NN)
+# ----------------------------------------------------------------------
+DIABETES_GLUCOSE_CODES = {48, 57, 58, 59, 60, 61, 62, 63, 64}
+DIABETES_INSULIN_CODES = {33, 34, 35}
+DIABETES_HYPO_CODE = 65
+
+
+def _diabetes_patient_records(lines, patient_id):
+    """Aggregate one patient's timestamped readings into daily schema records"""
+    glucose = {}
+    insulin_days = set()
+    hypo_days = set()
+    parsed_dates = {}
+
+    for line in lines:
+        parts = line.split('\t')
+        if len(parts) != 4:
+            continue
+        if parts[0] not in parsed_dates:
+            parsed_dates[parts[0]] = pd.to_datetime(parts[0], format='%m-%d-%Y', errors='coerce')
+        date = parsed_dates[parts[0]]
+        try:
+            code = int(parts[2])
+        except ValueError:
+            continue
+        if pd.isna(date):
+            continue
+
+        readings = glucose.setdefault(date, [])
+        if code in DIABETES_GLUCOSE_CODES:
+            try:
+                value = float(parts[3])
+            except ValueError:
+                continue
+            # Zero readings are recording artifacts in the source
+            if value > 0:
+                readings.append(value)
+        elif code in DIABETES_INSULIN_CODES:
+            insulin_days.add(date)
+        elif code == DIABETES_HYPO_CODE:
+            hypo_days.add(date)
+
+    if not glucose:
+        return None, []
+
+    dates = sorted(glucose)
+    records = pd.DataFrame({
+        'patient_id': patient_id,
+        'date': dates,
+        'glucose_mg_dl': [np.mean(glucose[d]) if glucose[d] else np.nan for d in dates],
+        # A logged insulin dose on the day stands in for medication adherence
+        'adherence_avg': [1.0 if d in insulin_days else 0.0 for d in dates],
+        'primary_condition': 'diabetes',
+    })
+    events = [{'patient_id': patient_id, 'event_date': d, 'event_type': 'hypoglycemia'}
+              for d in sorted(hypo_days)]
+    return records, events
+
+
+def iter_diabetes_patients(path='diabetes.zip', member='diabetes-data.tar.Z'):
+    """
+    Stream the UCI Diabetes archive one patient at a time
+
+    The zip member, the .Z layer and the tar layer are all decoded as
+    streams, so only the current patient's lines are held in memory.
+
+    Yields:
+        tuple: (daily records DataFrame, list of hypoglycemia event dicts)
+    """
+    with zipfile.ZipFile(path) as archive, archive.open(member) as compressed:
+        with tarfile.open(fileobj=open_compressed(compressed), mode='r|') as tar:
+            for info in tar:
+                name = info.name.rsplit('/', 1)[-1]
+                if not info.isfile() or not name.startswith('data-'):
+                    continue
+                f = tar.extractfile(info)
+                lines = (line.decode('latin-1').strip() for line in f)
+                patient_id = f"DIAB_{name.split('-', 1)[1]}"
+                records, events = _diabetes_patient_records(lines, patient_id)
+                if records is not None:
+                    yield records, events
+
+
+def load_diabetes(path='diabetes.zip'):
+    """
+    UCI Diabetes data mapped to the predictor schema
+
+    Daily mean blood glucose per patient; hypoglycemic-symptom entries
+    become events (the target is derived from them with generate_labels).
+    Events fall inside each patient's recording period, so the label of the
+    last record is almost always negative; load_public_data therefore has
+    prepare_ml_dataset take one sample per record, as of that record.
+
+    Returns:
+        tuple: (records, events, demographics) DataFrames
+    """
+    frames, events = [], []
+    for records, patient_events in iter_diabetes_patients(path):
+        frames.append(records)
+        events.extend(patient_events)
+
+    records = to_schema(pd.concat(frames, ignore_index=True)).drop(columns='deterioration_90d')
+    events = pd.DataFrame(events, columns=['patient_id', 'event_date', 'event_type'])
+    demographics = records.groupby('patient_id', sort=False).first().reset_index()[
+        ['patient_id', 'age', 'gender', 'primary_condition']
+    ]
+    return records, events, demographics
+
+
+# ----------------------------------------------------------------------
+# UCI Heart Disease (heart+disease.zip -> processed.<site>.data)
+# ----------------------------------------------------------------------
+HEART_DISEASE_SITES = {
+    'cleveland': 'processed.cleveland.data',
+    'hungarian': 'processed.hungarian.data',
+    'switzerland': 'processed.switzerland.data',
+    'va': 'processed.va.data',
+}
+
+HEART_DISEASE_COLUMNS = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+                         'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal', 'num']
+
+
+def iter_heart_disease(path='heart+disease.zip', sites=None, chunk_rows=10_000,
+                       record_date='2000-01-01'):
+    """
+    Stream the processed UCI Heart Disease tables as schema records
+
+    Each examination becomes one record for one patient. The data has no
+    dates, so every record gets ``record_date``. The target is the
+    angiographic diagnosis (num > 0), stored in deterioration_90d so the
+    pipeline can train on it; with a single record per patient that needs a
+    1-record lookback, which load_public_data sets.
+
+    Yields:
+        DataFrame: Up to ``chunk_rows`` schema records
+    """
+    sites = sites or list(HEART_DISEASE_SITES)
+    with zipfile.ZipFile(path) as archive:
+        for site in sites:
+            with archive.open(HEART_DISEASE_SITES[site]) as f:
+                reader = pd.read_csv(io.TextIOWrapper(f, encoding='latin-1'), header=None,
+                                     names=HEART_DISEASE_COLUMNS, na_values='?',
+                                     chunksize=chunk_rows)
+                offset = 0
+                for chunk in reader:
+                    ids = [f'HD_{site[:3].upper()}_{i:04d}' for i in range(offset, offset + len(chunk))]
+                    offset += len(chunk)
+                    yield to_schema(pd.DataFrame({
+                        'patient_id': ids,
+                        'date': pd.Timestamp(record_date),
+                        'age': chunk['age'].to_numpy(),
+                        'gender': np.where(chunk['sex'] == 1, 'M', np.where(chunk['sex'] == 0, 'F', 'unknown')),
+                        'systolic_bp': chunk['trestbps'].to_numpy(),
+                        'cholesterol_total': chunk['chol'].replace(0, np.nan).to_numpy(),
+                        'primary_condition': 'heart_disease',
+                        'deterioration_90d': (chunk['num'] > 0).astype(int).to_numpy(),
+                    }))
+
+
+def load_heart_disease(path='heart+disease.zip', sites=None):
+    """
+    UCI Heart Disease data mapped to the predictor schema
+
+    Returns:
+        tuple: (records, events, demographics) DataFrames (events is empty)
+    """
+    records = pd.concat(iter_heart_disease(path, sites), ignore_index=True)
+    events = pd.DataFrame(columns=['patient_id', 'event_date', 'event_type'])
+    demographics = records[['patient_id', 'age', 'gender', 'primary_condition']].copy()
+    return records, events, demographics
+
+
+# Archives bundled at the repository root
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+PUBLIC_DATASETS = {
+    'diabetes': (load_diabetes, 'diabetes.zip'),
+    'heart_disease': (load_heart_disease, 'heart+disease.zip'),
+}
+
+
+def load_public_dataset(name, path=None):
+    """
+    Load a bundled public dataset by name
+
+    Args:
+        name (str): Key of PUBLIC_DATASETS
+        path (str): Archive path (the bundled archive if None)
+
+    Returns:
+        tuple: (records, events, demographics) DataFrames
+    """
+    if name not in PUBLIC_DATASETS:
+        raise ValueError(f"Unknown dataset: {name}. Available: {sorted(PUBLIC_DATASETS)}")
+    loader, archive = PUBLIC_DATASETS[name]
+    return loader(path or os.path.join(ARCHIVE_DIR, archive))
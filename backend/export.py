@@ -0,0 +1,145 @@
+import argparse
+import io
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+class _ChunkWriter:
+    """Writes DataFrame chunks to one output in a given format"""
+
+    def __init__(self, sink, fmt):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Available: {sorted(EXPORT_FORMATS)}")
+        self.sink = sink
+        self.fmt = fmt
+        self.schema = None
+        self._writer = None
+
+    def write(self, chunk):
+        if self.schema is None:
+            self.schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            # Columns that are all-null in the first chunk still hold strings later
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in self.schema
+            ])
+            if self.fmt == 'csv':
+                self._writer = pa_csv.CSVWriter(self.sink, self.schema)
+            elif self.fmt == 'parquet':
+                self._writer = pq.ParquetWriter(self.sink, self.schema)
+            else:
+                self._writer = ipc.new_stream(self.sink, self.schema)
+
+        table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def export_scores(chunks, output, fmt='parquet'):
+    """
+    Write score chunks to a file, one chunk in memory at a time
+
+    Args:
+        chunks (iterable): DataFrames with identical columns
+            (HealthcareRiskPredictor.iter_score_chunks)
+        output (str | file): Destination path or binary file object
+        fmt (str): 'csv', 'parquet' or 'arrow' (Arrow IPC stream)
+
+    Returns:
+        int: Rows written
+    """
+    rows = 0
+    owns_file = isinstance(output, str)
+    sink = open(output, 'wb') if owns_file else output
+    writer = _ChunkWriter(sink, fmt)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            rows += len(chunk)
+        writer.close()
+    finally:
+        if owns_file:
+            sink.close()
+    return rows
+
+
+class _DrainBuffer(io.RawIOBase):
+    """Write-only sink whose contents are handed out and cleared after each chunk"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_export_bytes(chunks, fmt='parquet'):
+    """
+    Encode score chunks incrementally for a streamed HTTP response
+
+    Yields the bytes produced by each chunk as soon as it is written (for
+    Parquet, one row group per chunk; the footer comes last).
+    """
+    buffer = _DrainBuffer()
+    writer = _ChunkWriter(buffer, fmt)
+    for chunk in chunks:
+        writer.write(chunk)
+        data = buffer.drain()
+        if data:
+            yield data
+    writer.close()
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export cohort risk scores in chunks')
+    parser.add_argument('--model', default='trained_healthcare_model.pkl', help='Saved model package')
+    parser.add_argument('--serving', default='serving_features', help='Serving feature matrix directory')
+    parser.add_argument('--output', required=True, help='Output file')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='parquet')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--features', action='store_true', help='Include the model feature columns')
+    parser.add_argument('--top-factors', type=int, default=3)
+    args = parser.parse_args()
+
+    from main import build_predictor
+
+    # Serving rows are memory-mapped, so only one chunk is resident at a time
+    predictor = build_predictor(args.model, args.serving)
+    chunks = predictor.iter_score_chunks(args.chunk_size, args.features, args.top_factors)
+    rows = export_scores(chunks, args.output, args.format)
+    print(f"✓ Exported {rows} patients to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
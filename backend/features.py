@@ -0,0 +1,180 @@
+import numpy as np
+
+
+# Windows (in daily records) and columns of the rolling features; the
+# streaming rolling state (streaming.RollingWindowState) keeps the same ones
+ROLLING_WINDOWS = (7, 14, 30)
+ROLLING_COLUMNS = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'heart_rate',
+                   'adherence_avg', 'steps', 'sleep_hours']
+
+# Preprocessing stages, in pipeline order: (stage id, progress message)
+FEATURE_STAGES = [
+    ('clinical_features', 'Engineering clinical features'),
+    ('time_features', 'Creating time-based features'),
+    ('rolling_features', 'Computing rolling aggregations'),
+    ('encoding', 'Encoding categorical variables'),
+]
+
+ROLLING_STATS = ('mean', 'std', 'slope')
+
+
+def _threshold(column, op, value):
+    def compute(df, cache):
+        return op(df[column], value).astype(int)
+    return compute
+
+
+def _sorted_view(df, cache):
+    # Rolling windows run over a patient/date sorted copy, taken once per pipeline run
+    if 'sorted' not in cache:
+        cache['sorted'] = df.sort_values(['patient_id', 'date'])
+    return cache['sorted']
+
+
+def _slope(series):
+    if len(series.dropna()) < 2:
+        return 0
+    x = np.arange(len(series))
+    y = series.values
+    valid_idx = ~np.isnan(y)
+    if np.sum(valid_idx) < 2:
+        return 0
+    return np.polyfit(x[valid_idx], y[valid_idx], 1)[0]
+
+
+def _rolling(column, stat, window):
+    def compute(df, cache):
+        grouped = _sorted_view(df, cache).groupby('patient_id')[column]
+        if stat == 'slope':
+            result = grouped.rolling(window=window, min_periods=2).apply(_slope)
+        else:
+            result = getattr(grouped.rolling(window=window, min_periods=1), stat)()
+        return result.reset_index(0, drop=True)
+    return compute
+
+
+def _encoded(column, encoder):
+    def compute(df, cache):
+        return encoder.transform(df[column].astype(str))
+    return compute
+
+
+def build_feature_graph(encoders=None):
+    """
+    Declarative table of every derived daily column the pipeline can build
+
+    Each node names its input columns (raw columns or other nodes) and the
+    stage it belongs to. Nodes are listed in the order the full pipeline
+    creates them, which fixes the column order of processed_data.
+
+    Args:
+        encoders (dict): Fitted LabelEncoders by categorical column
+
+    Returns:
+        dict: node name -> {'inputs', 'stage', 'compute'}
+    """
+    nodes = []
+
+    def add(name, inputs, stage, compute):
+        nodes.append((name, {'inputs': list(inputs), 'stage': stage, 'compute': compute}))
+
+    # Time in range features (glucose)
+    add('glucose_tir', ['glucose_mg_dl'], 'clinical_features',
+        lambda df, cache: ((df['glucose_mg_dl'] >= 70) & (df['glucose_mg_dl'] <= 180)).astype(int))
+    add('glucose_very_high', ['glucose_mg_dl'], 'clinical_features', _threshold('glucose_mg_dl', np.greater, 250))
+    add('glucose_very_low', ['glucose_mg_dl'], 'clinical_features', _threshold('glucose_mg_dl', np.less, 70))
+
+    # Blood pressure control
+    add('bp_controlled', ['systolic_bp', 'diastolic_bp'], 'clinical_features',
+        lambda df, cache: ((df['systolic_bp'] < 140) & (df['diastolic_bp'] < 90)).astype(int))
+    add('hypertensive_crisis', ['systolic_bp', 'diastolic_bp'], 'clinical_features',
+        lambda df, cache: ((df['systolic_bp'] > 180) | (df['diastolic_bp'] > 120)).astype(int))
+
+    # Weight stability
+    add('weight_change_7d', ['weight_kg'], 'clinical_features',
+        lambda df, cache: df.groupby('patient_id')['weight_kg'].pct_change(periods=7))
+    add('rapid_weight_gain', ['weight_change_7d'], 'clinical_features',
+        _threshold('weight_change_7d', np.greater, 0.02))  # >2% in 7 days
+
+    # Medication adherence categories
+    add('adherence_excellent', ['adherence_avg'], 'clinical_features',
+        _threshold('adherence_avg', np.greater_equal, 0.9))
+    add('adherence_poor', ['adherence_avg'], 'clinical_features', _threshold('adherence_avg', np.less, 0.7))
+
+    # Calendar and monitoring-time features
+    add('day_of_week', ['date'], 'time_features', lambda df, cache: df['date'].dt.dayofweek)
+    add('month', ['date'], 'time_features', lambda df, cache: df['date'].dt.month)
+    add('is_weekend', ['day_of_week'], 'time_features', _threshold('day_of_week', np.greater_equal, 5))
+    add('days_since_start', ['date'], 'time_features',
+        lambda df, cache: df.groupby('patient_id')['date'].rank() - 1)
+
+    # Rolling window statistics (windows and columns shared with the streaming ingestion state)
+    for window in ROLLING_WINDOWS:
+        for column in ROLLING_COLUMNS:
+            for stat in ROLLING_STATS:
+                add(f'{column}_{stat}_{window}d', [column], 'rolling_features', _rolling(column, stat, window))
+
+    for column, encoder in (encoders or {}).items():
+        add(f'{column}_encoded', [column], 'encoding', _encoded(column, encoder))
+
+    return dict(nodes)
+
+
+def model_feature_sources(feature_names):
+    """
+    Daily columns a list of model features is assembled from
+
+    ``<column>_latest`` features read the raw column; every other model
+    feature (static, rolling, window-averaged indicators) reads the daily
+    column of the same name.
+    """
+    return [name[:-len('_latest')] if name.endswith('_latest') else name for name in feature_names]
+
+
+def required_features(graph, targets):
+    """
+    Graph nodes needed to produce ``targets``, including transitive inputs
+
+    Targets that are not nodes (raw columns) need nothing computed.
+    """
+    required = set()
+    stack = [name for name in targets if name in graph]
+    while stack:
+        name = stack.pop()
+        if name in required:
+            continue
+        required.add(name)
+        stack.extend(dep for dep in graph[name]['inputs'] if dep in graph)
+    return required
+
+
+def compute_features(df, graph, names=None, stages=None, metrics=None, log=None):
+    """
+    Add graph nodes to ``df`` in place, stage by stage
+
+    Args:
+        df (DataFrame): Imputed daily records
+        graph (dict): Output of build_feature_graph
+        names (set): Nodes to compute (every node if None)
+        stages (list): Only run these stage ids (all FEATURE_STAGES if None)
+        metrics (PipelineMetrics): Stage instrumentation
+        log (callable): Progress printer
+    """
+    cache = {}
+    for stage, message in FEATURE_STAGES:
+        if stages is not None and stage not in stages:
+            continue
+        nodes = [
+            (name, node) for name, node in graph.items()
+            if node['stage'] == stage and (names is None or name in names)
+            and all(dep in df.columns or dep in graph for dep in node['inputs'])
+        ]
+        if not nodes:
+            continue
+        if log is not None:
+            log(f"- {message}...")
+        with metrics.stage(f'preprocess.{stage}'):
+            for name, node in nodes:
+                if all(dep in df.columns for dep in node['inputs']):
+                    df[name] = node['compute'](df, cache)
+    return df
@@ -0,0 +1,270 @@
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+# Histogram bucket upper bounds (seconds) shared by stage and request latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_NULL_STAGE = nullcontext()
+
+
+def _current_rss_bytes():
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process, or None when it cannot be read"""
+    try:
+        import resource
+        # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak * 1024 if sys.platform.startswith('linux') else peak
+    except Exception:
+        return None
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + body + '}'
+
+
+class _Histogram:
+    """Cumulative latency histogram for a single label set"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class PipelineMetrics:
+    """
+    Stage timing, memory and request latency instrumentation
+
+    Timings are kept as Prometheus-style counters and histograms and can be
+    rendered in the text exposition format for a /metrics endpoint. When
+    disabled (or when a call is not sampled) instrumentation points return a
+    shared no-op context, so the cost is a single attribute check.
+    """
+
+    def __init__(self, enabled=True, sample_rate=1.0, track_memory=False,
+                 namespace='caresight', buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled (bool): Master switch for all instrumentation
+            sample_rate (float): Fraction of stages/requests to record (0-1)
+            track_memory (bool): Trace Python allocations per stage (tracemalloc)
+            namespace (str): Prefix for exported metric names
+            buckets (tuple): Histogram bucket upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.track_memory = track_memory
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self.last_stage_timings = {}
+        # Per-thread stack of the traced-memory peaks of the open stages
+        self._memory_peaks = threading.local()
+
+    @property
+    def active(self):
+        return self.enabled and self.sample_rate > 0
+
+    def _sampled(self):
+        if not self.enabled or self.sample_rate <= 0:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    # ------------------------------------------------------------------
+    # Primitive metric updates
+    # ------------------------------------------------------------------
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    # ------------------------------------------------------------------
+    # Pipeline stages
+    # ------------------------------------------------------------------
+    def stage(self, name):
+        """
+        Context manager timing one pipeline stage
+
+        Args:
+            name (str): Dotted stage name, e.g. 'preprocess.imputation'
+        """
+        if not self._sampled():
+            return _NULL_STAGE
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name):
+        trace_memory = self.track_memory
+        started_tracing = False
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            peaks = self._peak_stack()
+            if peaks:
+                # Fold the enclosing stage's peak so far in before the reset clears it
+                peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+            peaks.append(mem_before)
+
+        status = 'ok'
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('stage_duration_seconds', elapsed, stage=name)
+            self.inc('stage_runs_total', stage=name, status=status)
+            timing = {'seconds': elapsed}
+
+            if trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, peaks.pop())
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                self.set_gauge('stage_memory_peak_bytes', max(peak - mem_before, 0), stage=name)
+                self.set_gauge('stage_memory_delta_bytes', current - mem_before, stage=name)
+                timing['memory_peak_bytes'] = max(peak - mem_before, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self._record_process_memory()
+            self.last_stage_timings[name] = timing
+
+    def _peak_stack(self):
+        peaks = getattr(self._memory_peaks, 'stack', None)
+        if peaks is None:
+            peaks = self._memory_peaks.stack = []
+        return peaks
+
+    def _record_process_memory(self):
+        """Set the current RSS gauge, or the peak RSS gauge where only that is available"""
+        rss = _current_rss_bytes()
+        if rss is not None:
+            self.set_gauge('process_resident_memory_bytes', rss)
+            return
+        peak = _peak_rss_bytes()
+        if peak is not None:
+            self.set_gauge('process_peak_resident_memory_bytes', peak)
+
+    # ------------------------------------------------------------------
+    # HTTP requests
+    # ------------------------------------------------------------------
+    def start_request(self):
+        """Return a start token for a request, or None when not sampled"""
+        if not self._sampled():
+            return None
+        return time.perf_counter()
+
+    def finish_request(self, token, method, endpoint, status):
+        if token is None:
+            return
+        elapsed = time.perf_counter() - token
+        self.inc('http_requests_total', method=method, endpoint=endpoint, status=str(status))
+        self.observe('http_request_duration_seconds', elapsed, method=method, endpoint=endpoint)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        if self.enabled:
+            self._record_process_memory()
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            full = f'{self.namespace}_{name}'
+            declare(full, 'counter')
+            lines.append(f'{full}{_format_labels(labels)} {value}')
+
+        for (name, labels), value in gauges:
+            full = f'{self.namespace}_{name}'
+            declare(full, 'gauge')
+            lines.append(f'{full}{_format_labels(labels)} {value}')
+
+        for (name, labels), hist in histograms:
+            full = f'{self.namespace}_{name}'
+            declare(full, 'histogram')
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                le = labels + (('le', repr(float(bound))),)
+                lines.append(f'{full}_bucket{_format_labels(le)} {cumulative}')
+            lines.append(f'{full}_bucket{_format_labels(labels + (("le", "+Inf"),))} {hist.count}')
+            lines.append(f'{full}_sum{_format_labels(labels)} {hist.sum}')
+            lines.append(f'{full}_count{_format_labels(labels)} {hist.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._gauges.clear()
+            self.last_stage_timings.clear()
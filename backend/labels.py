@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+def _day_numbers(dates):
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def next_event_days(records, events, event_types=None):
+    """
+    Days from each record to the patient's next event strictly after it
+
+    Events are encoded as one sorted (patient, day) key array, so every record
+    is resolved with a single ``searchsorted`` instead of a per-patient loop.
+
+    Args:
+        records (DataFrame): Rows with patient_id and date
+        events (DataFrame): Rows with patient_id, event_date and optionally event_type
+        event_types (list): Only count these event types (all if None)
+
+    Returns:
+        ndarray: float days until the next event (NaN when there is none)
+    """
+    result = np.full(len(records), np.nan)
+    if events is None or events.empty or records.empty:
+        return result
+
+    if event_types is not None:
+        events = events[events['event_type'].isin(event_types)]
+    events = events.dropna(subset=['patient_id', 'event_date'])
+
+    patients = pd.Index(pd.unique(records['patient_id']))
+    record_codes = patients.get_indexer(records['patient_id'])
+    event_codes = patients.get_indexer(events['patient_id'])
+    known = event_codes >= 0
+    if not known.any():
+        return result
+
+    record_days = _day_numbers(records['date'])
+    event_days = _day_numbers(events['event_date'])[known]
+    event_codes = event_codes[known]
+
+    # Composite key orders by patient, then day; the offset keeps patients apart
+    base = min(record_days.min(), event_days.min())
+    span = max(record_days.max(), event_days.max()) - base + 1
+    event_keys = np.sort(event_codes * span + (event_days - base))
+    record_keys = record_codes * span + (record_days - base)
+
+    pos = np.searchsorted(event_keys, record_keys, side='right')
+    has_next = pos < len(event_keys)
+    next_keys = event_keys[np.minimum(pos, len(event_keys) - 1)]
+    same_patient = has_next & (next_keys // span == record_codes)
+
+    result[same_patient] = (next_keys - record_keys)[same_patient]
+    return result
+
+
+def deterioration_labels(records, events, horizon_days=90, event_types=None):
+    """
+    Binary deterioration target for every (patient, date) record
+
+    A record is positive when the patient has an event within
+    ``(date, date + horizon_days]``.
+
+    Args:
+        records (DataFrame): Rows with patient_id and date
+        events (DataFrame): Rows with patient_id, event_date and optionally event_type
+        horizon_days (int): Prediction horizon in days
+        event_types (list): Only count these event types (all if None)
+
+    Returns:
+        ndarray: int8 labels aligned with ``records``
+    """
+    days = next_event_days(records, events, event_types)
+    with np.errstate(invalid='ignore'):
+        return (days <= horizon_days).astype(np.int8)
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+# Dashboard polling behaviour (services/api.ts), in seconds: SWR refreshInterval
+# for polled hooks, dedupingInterval for hooks refetched on navigation/focus
+FRONTEND_TRAFFIC = {
+    'health': {'path': '/health', 'interval': 30},
+    'cohort_summary': {'path': '/cohort_summary', 'interval': 300},
+    'patients': {'path': '/patients', 'interval': 300},
+    'model_metrics': {'path': '/model_metrics', 'interval': 600},
+    'predict': {'path': '/predict/{patient_id}', 'interval': 60, 'per_patient': True},
+    'patient_details': {'path': '/patient_details/{patient_id}', 'interval': 120, 'per_patient': True},
+}
+
+# Seconds a clinician spends on one patient before opening another
+PATIENT_DWELL_SECONDS = 45
+
+
+async def http_get(host, port, path, headers=None, timeout=30):
+    """
+    Minimal HTTP/1.1 GET over asyncio streams
+
+    Returns:
+        tuple: (status code, response headers dict, body bytes)
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        lines = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = int(status_line.split(' ', 2)[1])
+        response_headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await asyncio.wait_for(reader.read(), timeout)
+        return status, response_headers, bytes(body)
+    finally:
+        writer.close()
+
+
+def process_rss_bytes(pid):
+    """Resident set size of a process (Linux /proc), or None if unavailable"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class DashboardUser:
+    """
+    One open dashboard: polls the cohort views and walks through patients
+
+    Each endpoint is requested on its own schedule (scaled by time_scale).
+    With ``revalidate`` the user keeps each URL's ETag and sends
+    If-None-Match, as a browser honouring Cache-Control: no-cache does.
+    """
+
+    def __init__(self, runner, user_id, patient_ids, revalidate=True):
+        self.runner = runner
+        self.user_id = user_id
+        self.patient_ids = patient_ids
+        self.revalidate = revalidate
+        self.etags = {}
+        self.rng = random.Random(user_id)
+        self.patient_id = self.rng.choice(patient_ids)
+
+    async def request(self, route, path):
+        headers = {}
+        if self.revalidate and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        start = time.perf_counter()
+        try:
+            status, response_headers, _ = await http_get(self.runner.host, self.runner.port, path, headers)
+            error = status >= 400
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            status, response_headers, error = 0, {}, True
+        elapsed = time.perf_counter() - start
+        if 'etag' in response_headers:
+            self.etags[path] = response_headers['etag']
+        self.runner.record(route, status, elapsed, error)
+
+    async def poll(self, route, spec, stop_at):
+        interval = spec['interval'] * self.runner.time_scale
+        # Dashboards are opened at different times
+        await asyncio.sleep(self.rng.uniform(0, interval))
+        while time.monotonic() < stop_at:
+            path = spec['path'].format(patient_id=self.patient_id)
+            await self.request(route, path)
+            await asyncio.sleep(interval)
+
+    async def browse(self, stop_at):
+        dwell = PATIENT_DWELL_SECONDS * self.runner.time_scale
+        while time.monotonic() < stop_at:
+            await asyncio.sleep(self.rng.expovariate(1.0 / dwell))
+            self.patient_id = self.rng.choice(self.patient_ids)
+            # Opening a patient fetches both patient views immediately
+            for route, spec in FRONTEND_TRAFFIC.items():
+                if spec.get('per_patient'):
+                    await self.request(route, spec['path'].format(patient_id=self.patient_id))
+
+    async def run(self, stop_at):
+        tasks = [self.poll(route, spec, stop_at) for route, spec in FRONTEND_TRAFFIC.items()]
+        tasks.append(self.browse(stop_at))
+        await asyncio.gather(*tasks)
+
+
+class LoadTestRunner:
+    """
+    Replays dashboard traffic at increasing concurrency and summarises it
+
+    Args:
+        base_url (str): API root, e.g. http://127.0.0.1:5055
+        server_pid (int): Process to sample RSS from (skipped if None)
+        time_scale (float): Multiplier for all frontend intervals (0.01 turns
+            a 30 s poll into 0.3 s, so short runs still exercise every route)
+        revalidate (bool): Send If-None-Match with stored ETags
+    """
+
+    def __init__(self, base_url, server_pid=None, time_scale=0.01, revalidate=True):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.server_pid = server_pid
+        self.time_scale = time_scale
+        self.revalidate = revalidate
+        self.samples = []
+        self.rss_samples = []
+
+    def record(self, route, status, elapsed, error):
+        self.samples.append((route, status, elapsed, error))
+
+    async def _sample_rss(self, stop_at, every=0.5):
+        while time.monotonic() < stop_at:
+            rss = process_rss_bytes(self.server_pid)
+            if rss is not None:
+                self.rss_samples.append(rss)
+            await asyncio.sleep(every)
+
+    async def _patient_ids(self):
+        status, _, body = await http_get(self.host, self.port, '/patients')
+        if status != 200:
+            raise RuntimeError(f"GET /patients returned {status}")
+        return json.loads(body)['patients']
+
+    async def run_level(self, users, duration):
+        """Run ``users`` concurrent dashboards for ``duration`` seconds"""
+        self.samples = []
+        self.rss_samples = []
+        patient_ids = await self._patient_ids()
+        stop_at = time.monotonic() + duration
+
+        start = time.perf_counter()
+        tasks = [DashboardUser(self, i, patient_ids, self.revalidate).run(stop_at) for i in range(users)]
+        if self.server_pid is not None:
+            tasks.append(self._sample_rss(stop_at))
+        await asyncio.gather(*tasks)
+        return self.summarise(users, time.perf_counter() - start)
+
+    def summarise(self, users, wall_seconds):
+        def latency_stats(samples):
+            if not samples:
+                return {'requests': 0}
+            latencies = np.array([s[2] for s in samples]) * 1000
+            errors = sum(1 for s in samples if s[3])
+            return {
+                'requests': len(samples),
+                'errors': errors,
+                'error_rate': errors / len(samples),
+                'not_modified': sum(1 for s in samples if s[1] == 304),
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+                'max_ms': float(latencies.max()),
+            }
+
+        summary = latency_stats(self.samples)
+        summary.update({
+            'users': users,
+            'seconds': wall_seconds,
+            'throughput_rps': len(self.samples) / wall_seconds if wall_seconds else 0.0,
+            'routes': {
+                route: latency_stats([s for s in self.samples if s[0] == route])
+                for route in FRONTEND_TRAFFIC
+            },
+        })
+        if self.rss_samples:
+            summary['server_rss_bytes'] = {
+                'start': self.rss_samples[0],
+                'max': max(self.rss_samples),
+                'end': self.rss_samples[-1],
+            }
+        return summary
+
+
+def start_server(port, model_path, serving_path, data_path=None, serving_only=False, timeout=600):
+    """
+    Start the API in a child process and wait until /health answers
+
+    Returns:
+        Popen: The server process (terminate it when done)
+    """
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(port),
+               '--model', model_path, '--serving', serving_path]
+    if data_path:
+        command += ['--data', data_path]
+    if serving_only:
+        command.append('--serving-only')
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            status, _, _ = asyncio.run(http_get('127.0.0.1', port, '/health', timeout=2))
+            if status == 200:
+                return process
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("API server did not become healthy in time")
+
+
+def serve(args):
+    """Child-process entry point: threaded WSGI server like the dev deployment"""
+    from werkzeug.serving import make_server
+    from main import build_predictor, HealthcareAPI
+
+    if args.serving_only:
+        predictor = build_predictor(args.model, args.serving)
+    else:
+        data_dir = os.path.dirname(os.path.abspath(args.data))
+        predictor = build_predictor(
+            args.model, args.serving, reload_data=True, data_path=args.data,
+            events_path=os.path.join(data_dir, 'deterioration_events.csv'),
+            demographics_path=os.path.join(data_dir, 'patient_demographics.csv')
+        )
+    api = HealthcareAPI(predictor)
+    make_server('127.0.0.1', args.port, api.app, threaded=True).serve_forever()
+
+
+def write_artifacts(output_dir, config, levels, samples_by_level):
+    """
+    Save a JSON summary and a CSV of every request
+
+    Returns:
+        str: Path of the JSON summary
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    summary_path = os.path.join(output_dir, f'loadtest-{stamp}.json')
+    with open(summary_path, 'w') as f:
+        json.dump({'config': config, 'levels': levels, 'created_at': datetime.now().isoformat()}, f, indent=2)
+
+    with open(os.path.join(output_dir, f'loadtest-{stamp}-requests.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['users', 'route', 'status', 'latency_ms', 'error'])
+        for users, samples in samples_by_level.items():
+            for route, status, elapsed, error in samples:
+                writer.writerow([users, route, status, round(elapsed * 1000, 3), int(error)])
+    return summary_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the HealthcareAPI with dashboard-like traffic')
+    sub = parser.add_subparsers(dest='command')
+
+    run = sub.add_parser('run', help='Start (or target) a server and replay traffic')
+    run.add_argument('--url', help='Target an already running API instead of starting one')
+    run.add_argument('--server-pid', type=int, help='PID to sample RSS from when using --url')
+    run.add_argument('--model', default='trained_healthcare_model.pkl')
+    run.add_argument('--serving', default='serving_features')
+    run.add_argument('--data', default='synthetic_healthcare_dataset.csv')
+    run.add_argument('--serving-only', action='store_true',
+                     help='Start a serving-only worker (no /patient_details data)')
+    run.add_argument('--port', type=int, default=5055)
+    run.add_argument('--users', default='1,10,50', help='Comma-separated concurrency levels')
+    run.add_argument('--duration', type=float, default=30, help='Seconds per level')
+    run.add_argument('--time-scale', type=float, default=0.01)
+    run.add_argument('--no-revalidate', action='store_true', help='Never send If-None-Match')
+    run.add_argument('--output', default='loadtest_results')
+
+    server = sub.add_parser('serve', help=argparse.SUPPRESS)
+    server.add_argument('--port', type=int, required=True)
+    server.add_argument('--model', required=True)
+    server.add_argument('--serving', required=True)
+    server.add_argument('--data')
+    server.add_argument('--serving-only', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+        return
+    if args.command != 'run':
+        parser.print_help()
+        return
+
+    process = None
+    if args.url:
+        base_url, server_pid = args.url, args.server_pid
+    else:
+        print(f"🔄 Starting API server on port {args.port}...")
+        process = start_server(args.port, args.model, args.serving,
+                               None if args.serving_only else args.data, args.serving_only)
+        base_url, server_pid = f'http://127.0.0.1:{args.port}', process.pid
+
+    runner = LoadTestRunner(base_url, server_pid, args.time_scale, not args.no_revalidate)
+    levels, samples_by_level = [], {}
+    try:
+        for users in [int(u) for u in args.users.split(',')]:
+            summary = asyncio.run(runner.run_level(users, args.duration))
+            levels.append(summary)
+            samples_by_level[users] = runner.samples
+            print(f"✓ {users} users: {summary['throughput_rps']:.1f} req/s, "
+                  f"p50 {summary.get('p50_ms', 0):.1f} ms, p95 {summary.get('p95_ms', 0):.1f} ms, "
+                  f"p99 {summary.get('p99_ms', 0):.1f} ms, errors {summary.get('error_rate', 0):.2%}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    config = {key: value for key, value in vars(args).items() if key != 'command'}
+    path = write_artifacts(args.output, config, levels, samples_by_level)
+    print(f"✓ Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
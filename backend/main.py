@@ -1,16 +1,18 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
 import pickle
 import json
 import warnings
 warnings.filterwarnings('ignore')
 
 # ML Libraries
-from sklearn.model_selection import train_test_split, StratifiedKFold, TimeSeriesSplit
+from sklearn.model_selection import train_test_split, StratifiedKFold, TimeSeriesSplit, GroupShuffleSplit
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
 from sklearn.metrics import (roc_auc_score, average_precision_score, 
                            confusion_matrix, classification_report,
                            roc_curve, precision_recall_curve)
@@ -18,12 +20,36 @@ from sklearn.calibration import calibration_curve
 import lightgbm as lgb
 import shap
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # API Framework
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, stream_with_context
 from flask_cors import CORS
 import json
 
+from instrumentation import PipelineMetrics
+from trends import compute_trend_table, trends_from_row
+from serving import ServingFeatureMatrix
+from sharding import (partition_frame, partition_csv, process_shard, read_feature_store,
+                      write_manifest, merge_correlation_moments, correlation_from_moments)
+from tuning import successive_halving
+from selection import benchmark_candidate, select_model, build_explainer, positive_class_shap
+from registry import ModelRegistry, write_registry
+from riskstore import RiskScoreStore, RISK_CATEGORIES, risk_category_codes
+from export import EXPORT_FORMATS, iter_export_bytes
+from similarity import SimilarPatientIndex
+from aggregates import PatientAggregateTable, PATIENT_RISK_SCORES, risk_scores_as_of
+from features import build_feature_graph, model_feature_sources, required_features, compute_features
+from labels import deterioration_labels
+from datasets import load_public_dataset
+from snapshot import ModelSnapshot, SnapshotHolder, artifact_version, processed_key
+from streaming import VitalsIngestionService, start_background
+from backtest import (default_cutoffs, as_of_rows, trailing_means, rolling_origin_splits,
+                      metrics_by_cutoff)
+from rules import (RECOMMENDATION_RULES, EXPLANATION_RULES, evaluate_rules,
+                   recommendations_from_masks, explanations_from_masks,
+                   build_worklists, trend_features)
+
 
 class NumpyEncoder(json.JSONEncoder):
     """Custom JSON encoder for NumPy data types and Pandas objects"""
@@ -51,14 +77,21 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 plt.style.use('default')
 
+# Used by pipeline stages running outside a predictor (e.g. in shard workers)
+_DISABLED_METRICS = PipelineMetrics(enabled=False)
+
 class HealthcareRiskPredictor:
     """
     Complete healthcare risk prediction backend system
     """
     
+    LIFESTYLE_COLS = ['steps', 'exercise_minutes', 'sleep_hours']
+    CATEGORICAL_COLS = ['primary_condition', 'baseline_risk', 'gender', 'smoking_history']
+    DEFAULT_LOOKBACK_DAYS = 30
+    
     def __init__(self, data_path='synthetic_healthcare_dataset.csv', 
                  events_path='deterioration_events.csv', 
-                 demographics_path='patient_demographics.csv'):
+                 demographics_path='patient_demographics.csv', metrics=None):
         """
         Initialize the risk prediction system
         
@@ -66,6 +99,7 @@ class HealthcareRiskPredictor:
             data_path (str): Path to main dataset CSV
             events_path (str): Path to events CSV  
             demographics_path (str): Path to demographics CSV
+            metrics (PipelineMetrics): Instrumentation sink (a default one is created if None)
         """
         self.data_path = data_path
         self.events_path = events_path
@@ -77,6 +111,26 @@ class HealthcareRiskPredictor:
         self.feature_names = []
         self.model_metrics = {}
         self.shap_explainer = None
+        self.label_encoders = {}
+        self.lifestyle_medians = {}
+        
+        # LightGBM candidate kept for warm-start incremental retraining
+        self.warm_start_model = None
+        
+        # Content hash of the package the model was saved to or loaded from
+        self.model_version = None
+        
+        # Optional per-condition models (lazily loaded, global model is the fallback)
+        self.condition_models = None
+        
+        # Records per patient behind the window-averaged features: lowered for short
+        # public datasets, fixed by prepare_ml_dataset and saved with the model so
+        # serving assembles features over the same window training did
+        self.lookback_days = self.DEFAULT_LOOKBACK_DAYS
+        
+        # One training sample per record instead of per patient (set for public
+        # datasets whose latest records are all labelled alike)
+        self.per_record_samples = False
         
         # Data storage
         self.raw_data = None
@@ -84,11 +138,33 @@ class HealthcareRiskPredictor:
         self.events_data = None
         self.demographics_data = None
         
+        # Latest feature row per patient (optionally memory-mapped)
+        self.serving_features = None
+        
+        # Nearest-neighbour index over the serving rows (built with them)
+        self.similarity_index = None
+        
+        # Patient/date-sorted view of processed_data with per-patient row bounds
+        self._history = None
+        self._history_source = None
+        self._history_bounds = {}
+        
+        # One row per patient of whole-history aggregates, kept alongside processed_data
+        self.patient_aggregates = None
+        self._aggregates_source = None
+        
+        # Stage timing / request latency instrumentation
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        
         print("Healthcare Risk Prediction System initialized")
     
     def load_data(self):
         """Load all CSV files and perform initial validation"""
         print("Loading data files...")
+        if self.model is None:
+            # A loaded model keeps the lookback it was trained with
+            self.lookback_days = self.DEFAULT_LOOKBACK_DAYS
+        self.per_record_samples = False
         
         try:
             # Load main dataset
@@ -103,6 +179,10 @@ class HealthcareRiskPredictor:
             # Load demographics
             self.demographics_data = pd.read_csv(self.demographics_path)
             
+            # Derive the target from the events table when the dataset does not carry it
+            if 'deterioration_90d' not in self.raw_data.columns:
+                self.generate_labels(horizon_days=90)
+            
             print(f"✓ Loaded main dataset: {self.raw_data.shape}")
             print(f"✓ Loaded events data: {self.events_data.shape}")
             print(f"✓ Loaded demographics: {self.demographics_data.shape}")
@@ -114,6 +194,67 @@ class HealthcareRiskPredictor:
             print(f"❌ Error loading data: {str(e)}")
             raise
     
+    def load_public_data(self, name, path=None):
+        """
+        Load a bundled public dataset instead of the CSV files
+        
+        Args:
+            name (str): 'diabetes' (UCI Diabetes) or 'heart_disease' (UCI Heart Disease)
+            path (str): Archive path (the archive shipped with the repo if None)
+        """
+        print(f"Loading public dataset '{name}'...")
+        
+        with self.metrics.stage(f'load.{name}'):
+            self.raw_data, self.events_data, self.demographics_data = load_public_dataset(name, path)
+        
+        print(f"✓ Loaded main dataset: {self.raw_data.shape}")
+        print(f"✓ Loaded events data: {self.events_data.shape}")
+        print(f"✓ Loaded demographics: {self.demographics_data.shape}")
+        
+        # Short histories (e.g. one examination per patient) set the usable lookback
+        shortest = int(self.raw_data.groupby('patient_id').size().min()) if len(self.raw_data) else 1
+        if self.model is None:
+            self.lookback_days = max(1, min(self.DEFAULT_LOOKBACK_DAYS, shortest))
+            if self.lookback_days < self.DEFAULT_LOOKBACK_DAYS:
+                print(f"✓ Lookback set to {self.lookback_days} record(s) per patient")
+        
+        if 'deterioration_90d' not in self.raw_data.columns:
+            self.generate_labels(horizon_days=90)
+        
+        # Events inside the recording period leave every latest record negative;
+        # sample each record as of its own date so both classes are present
+        latest = self.raw_data.sort_values('date').groupby('patient_id').tail(1)['deterioration_90d']
+        self.per_record_samples = (latest.nunique() < 2 and self.raw_data['deterioration_90d'].nunique() > 1)
+        if self.per_record_samples:
+            print("✓ Latest records carry a single label; training samples are taken per record")
+        
+        self._validate_data()
+    
+    def generate_labels(self, horizon_days=90, event_types=None, column=None):
+        """
+        Derive a deterioration target for every daily record from events_data
+        
+        Args:
+            horizon_days (int): Record is positive if an event falls within
+                (date, date + horizon_days]
+            event_types (list): Only count these event types (all if None)
+            column (str): Target column to write (deterioration_<horizon>d if None)
+            
+        Returns:
+            str: Name of the label column written
+        """
+        if self.raw_data is None:
+            raise ValueError("Data not loaded. Call load_data() first.")
+        
+        column = column or f'deterioration_{horizon_days}d'
+        with self.metrics.stage('labels'):
+            for frame in (self.raw_data, self.processed_data):
+                if frame is not None:
+                    frame[column] = deterioration_labels(frame, self.events_data, horizon_days, event_types)
+        
+        print(f"✓ Labels '{column}' generated: {int(self.raw_data[column].sum())}/{len(self.raw_data)} positive records")
+        return column
+    
     def _validate_data(self):
         """Validate data integrity and consistency"""
         print("Validating data integrity...")
@@ -138,261 +279,340 @@ class HealthcareRiskPredictor:
         
         print("Data validation complete ✓")
     
-    def preprocess_data(self):
-        """Comprehensive data preprocessing and feature engineering"""
+    def preprocess_data(self, n_shards=None, max_workers=None, feature_store_dir=None, collect=True,
+                        serving=False):
+        """
+        Comprehensive data preprocessing and feature engineering
+        
+        Args:
+            n_shards (int): Partition patients by hash into this many shards and run
+                the per-patient pipeline in a process pool (single process if None)
+            max_workers (int): Worker processes for sharded mode (defaults to CPU count)
+            feature_store_dir (str): Write each shard's features to this directory as
+                Parquet instead of returning them from the workers (sharded mode only)
+            collect (bool): Load the feature store back into processed_data
+            serving (bool): Only compute the columns the loaded model's features
+                depend on, and skip correlation pruning (the model's feature set
+                is already fixed). The result is not suitable for training.
+        """
         print("Starting data preprocessing...")
         
-        df = self.raw_data.copy()
+        features = None
+        if serving:
+            if not self.feature_names:
+                raise ValueError("Serving preprocessing needs a loaded model. Call load_model() first.")
+            features = list(self.feature_names)
         
-        # 1. Handle missing values
-        print("- Handling missing values...")
+        with self.metrics.stage('preprocess'):
+            if n_shards:
+                df = self._preprocess_sharded(n_shards, max_workers, feature_store_dir, collect, features)
+            else:
+                df = self._preprocess_stages(features)
         
-        # Forward fill lab values within patients
-        lab_cols = ['hba1c', 'creatinine', 'egfr', 'cholesterol_total', 'cholesterol_ldl']
-        for col in lab_cols:
-            if col in df.columns:
-                df[col] = df.groupby('patient_id')[col].fillna(method='ffill')
-                df[col] = df.groupby('patient_id')[col].fillna(method='bfill')
+        # Serving rows were derived from the previous data
+        self.serving_features = None
+        self.similarity_index = None
         
-        # Fill vital signs with patient-specific medians
-        vital_cols = ['weight_kg', 'glucose_mg_dl', 'systolic_bp', 'diastolic_bp', 'heart_rate']
-        for col in vital_cols:
-            if col in df.columns:
-                df[col] = df.groupby('patient_id')[col].fillna(
-                    df.groupby('patient_id')[col].transform('median')
-                )
+        if df is None:
+            print(f"✓ Preprocessing complete. Features written to {feature_store_dir}")
+            return None
         
-        # Fill lifestyle data with population medians
-        lifestyle_cols = ['steps', 'exercise_minutes', 'sleep_hours']
-        for col in lifestyle_cols:
-            if col in df.columns:
-                df[col] = df[col].fillna(df[col].median())
-        
-        # 2. Create advanced clinical features
-        print("- Engineering clinical features...")
-        
-        # Time in range features (glucose)
-        if 'glucose_mg_dl' in df.columns:
-            df['glucose_tir'] = ((df['glucose_mg_dl'] >= 70) & (df['glucose_mg_dl'] <= 180)).astype(int)
-            df['glucose_very_high'] = (df['glucose_mg_dl'] > 250).astype(int)
-            df['glucose_very_low'] = (df['glucose_mg_dl'] < 70).astype(int)
-        
-        # Blood pressure control
-        if 'systolic_bp' in df.columns and 'diastolic_bp' in df.columns:
-            df['bp_controlled'] = ((df['systolic_bp'] < 140) & (df['diastolic_bp'] < 90)).astype(int)
-            df['hypertensive_crisis'] = ((df['systolic_bp'] > 180) | (df['diastolic_bp'] > 120)).astype(int)
-        
-        # Weight stability
-        if 'weight_kg' in df.columns:
-            df['weight_change_7d'] = df.groupby('patient_id')['weight_kg'].pct_change(periods=7)
-            df['rapid_weight_gain'] = (df['weight_change_7d'] > 0.02).astype(int)  # >2% in 7 days
-        
-        # Medication adherence categories
-        if 'adherence_avg' in df.columns:
-            df['adherence_excellent'] = (df['adherence_avg'] >= 0.9).astype(int)
-            df['adherence_poor'] = (df['adherence_avg'] < 0.7).astype(int)
-        
-        # 3. Create time-based features
-        print("- Creating time-based features...")
-        df['day_of_week'] = df['date'].dt.dayofweek
-        df['month'] = df['date'].dt.month
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-        
-        # Days since start of monitoring
-        df['days_since_start'] = df.groupby('patient_id')['date'].rank() - 1
-        
-        # 4. Create rolling aggregation features
-        print("- Computing rolling aggregations...")
-        self._create_rolling_features(df)
-        
-        # 5. Create patient-level risk features
-        print("- Computing patient risk features...")
-        self._create_patient_risk_features(df)
-        
-        # 6. Handle categorical variables
-        print("- Encoding categorical variables...")
-        categorical_cols = ['primary_condition', 'baseline_risk', 'gender', 'smoking_history']
-        le_dict = {}
-        
-        for col in categorical_cols:
-            if col in df.columns:
-                le = LabelEncoder()
-                df[f'{col}_encoded'] = le.fit_transform(df[col].astype(str))
-                le_dict[col] = le
+        self.processed_data = df
+        self._patient_aggregate_table()
+        print(f"✓ Preprocessing complete. Final shape: {df.shape}")
         
-        # 7. Remove highly correlated features
-        print("- Removing highly correlated features...")
-        df_numeric = df.select_dtypes(include=[np.number])
-        correlation_matrix = df_numeric.corr().abs()
-        upper_triangle = correlation_matrix.where(
-            np.triu(np.ones(correlation_matrix.shape), k=1).astype(bool)
+        return df
+    
+    def _preprocess_stages(self, features=None):
+        """Run the individual preprocessing stages, each one instrumented"""
+        # Population-level state is fitted on the full frame
+        self.lifestyle_medians = self._fit_population_medians(self.raw_data)
+        self.label_encoders = self._fit_categorical_encoders(self.raw_data)
+        
+        df = self._engineer_patient_features(
+            self.raw_data, self.lifestyle_medians, self.label_encoders, self.metrics, features=features
         )
+        if features is not None:
+            return df
         
-        # Find features with correlation > 0.95
-        high_corr_features = [column for column in upper_triangle.columns 
-                             if any(upper_triangle[column] > 0.95)]
-        df = df.drop(columns=high_corr_features)
+        # 6. Remove highly correlated features
+        print("- Removing highly correlated features...")
+        with self.metrics.stage('preprocess.correlation_pruning'):
+            high_corr_features = self._find_correlated_features(
+                df.select_dtypes(include=[np.number]).corr()
+            )
+            df = df.drop(columns=high_corr_features)
         
         print(f"- Removed {len(high_corr_features)} highly correlated features")
         
-        self.processed_data = df
-        print(f"✓ Preprocessing complete. Final shape: {df.shape}")
+        return df
+    
+    def _preprocess_sharded(self, n_shards, max_workers, feature_store_dir, collect, features=None):
+        """Run the per-patient pipeline on hash-partitioned patient shards in a process pool"""
+        print(f"- Sharding patients into {n_shards} shards...")
+        
+        # Global steps: population medians and encoders are fitted centrally
+        with self.metrics.stage('preprocess.global_fit'):
+            if self.raw_data is not None:
+                self.lifestyle_medians = self._fit_population_medians(self.raw_data)
+                self.label_encoders = self._fit_categorical_encoders(self.raw_data)
+            else:
+                # Only read the narrow columns needed for the global fits
+                header = pd.read_csv(self.data_path, nrows=0).columns
+                self.lifestyle_medians = self._fit_population_medians(pd.read_csv(
+                    self.data_path, usecols=[c for c in self.LIFESTYLE_COLS if c in header]
+                ))
+                self.label_encoders = self._fit_categorical_encoders(pd.read_csv(
+                    self.data_path, usecols=[c for c in self.CATEGORICAL_COLS if c in header]
+                ))
+        
+        with self.metrics.stage('preprocess.partition'):
+            if self.raw_data is not None:
+                shards = partition_frame(self.raw_data, n_shards)
+            elif feature_store_dir is not None:
+                # Stream the source CSV into per-shard partitions so no process holds it whole
+                shards = partition_csv(self.data_path, os.path.join(feature_store_dir, 'raw'), n_shards)
+            else:
+                raise ValueError("Data not loaded. Call load_data() or pass feature_store_dir.")
+        
+        if feature_store_dir is not None:
+            os.makedirs(feature_store_dir, exist_ok=True)
+        
+        fn_args = (self.lifestyle_medians, self.label_encoders, None, False, features)
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(
+                    process_shard, HealthcareRiskPredictor._engineer_patient_features,
+                    shard_id, source, fn_args,
+                    None if feature_store_dir is None
+                    else os.path.join(feature_store_dir, f'features-{shard_id:05d}.parquet')
+                )
+                for shard_id, source in shards
+            ]
+            for future in as_completed(futures):
+                shard = future.result()
+                self.metrics.observe('stage_duration_seconds', shard['seconds'], stage='preprocess.shard')
+                self.metrics.inc('stage_runs_total', stage='preprocess.shard', status='ok')
+                results.append(shard)
+        results.sort(key=lambda r: r['shard_id'])
+        
+        if features is not None:
+            # Serving mode: the model's feature set is fixed, nothing to prune
+            if feature_store_dir is None:
+                return pd.concat([r['result'] for r in results]).sort_index()
+            write_manifest(feature_store_dir, [r['result'] for r in results], [],
+                           {'n_shards': n_shards, 'rows': int(sum(r['rows'] for r in results))})
+            return read_feature_store(feature_store_dir) if collect else None
+        
+        print("- Removing highly correlated features...")
+        with self.metrics.stage('preprocess.correlation_pruning'):
+            if feature_store_dir is None:
+                # Results are in memory: concatenate and prune exactly as the single-process path
+                df = pd.concat([r['result'] for r in results]).sort_index()
+                high_corr_features = self._find_correlated_features(
+                    df.select_dtypes(include=[np.number]).corr()
+                )
+                df = df.drop(columns=high_corr_features)
+            else:
+                # Shards stay on disk: merge their co-moments into the global correlation matrix
+                moments = None
+                for r in results:
+                    moments = merge_correlation_moments(moments, r['moments'])
+                high_corr_features = self._find_correlated_features(correlation_from_moments(moments))
+                write_manifest(feature_store_dir, [r['result'] for r in results], high_corr_features,
+                               {'n_shards': n_shards, 'rows': int(sum(r['rows'] for r in results))})
+                df = read_feature_store(feature_store_dir) if collect else None
+        
+        print(f"- Removed {len(high_corr_features)} highly correlated features")
         
         return df
     
-    def _create_rolling_features(self, df):
-        """Create rolling window features for time series analysis"""
+    def load_feature_store(self, feature_store_dir):
+        """Load features written by a sharded preprocess_data run into processed_data"""
+        self.processed_data = read_feature_store(feature_store_dir)
+        print(f"✓ Loaded feature store {feature_store_dir}: {self.processed_data.shape}")
+        return self.processed_data
+    
+    def _fit_population_medians(self, df):
+        """Population medians used to fill lifestyle data"""
+        return {col: df[col].median() for col in self.LIFESTYLE_COLS if col in df.columns}
+    
+    def _fit_categorical_encoders(self, df):
+        """Fit one LabelEncoder per categorical column on the full population"""
+        encoders = {}
+        for col in self.CATEGORICAL_COLS:
+            if col in df.columns:
+                le = LabelEncoder()
+                le.fit(df[col].astype(str))
+                encoders[col] = le
+        return encoders
+    
+    @staticmethod
+    def _find_correlated_features(correlation_matrix, threshold=0.95):
+        """Columns whose absolute correlation with an earlier column exceeds the threshold"""
+        correlation_matrix = correlation_matrix.abs()
+        upper_triangle = correlation_matrix.where(
+            np.triu(np.ones(correlation_matrix.shape), k=1).astype(bool)
+        )
+        
+        # Find features with correlation > threshold
+        return [column for column in upper_triangle.columns 
+                if any(upper_triangle[column] > threshold)]
+    
+    @staticmethod
+    def _engineer_patient_features(df, lifestyle_medians, encoders, metrics=None, verbose=True,
+                                   features=None):
+        """
+        Per-patient part of the preprocessing pipeline (steps 1-5)
         
-        # Sort by patient and date
-        df_sorted = df.sort_values(['patient_id', 'date'])
+        Every step only looks at one patient's rows or at centrally fitted state,
+        so this can run independently on patient-disjoint shards.
         
-        # Define windows and features
-        windows = [7, 14, 30]
-        rolling_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'heart_rate', 
-                       'adherence_avg', 'steps', 'sleep_hours']
+        Args:
+            df (DataFrame): Raw daily records for a set of patients
+            lifestyle_medians (dict): Population medians for lifestyle columns
+            encoders (dict): Fitted LabelEncoders for categorical columns
+            metrics (PipelineMetrics): Stage instrumentation (disabled if None)
+            verbose (bool): Print progress for each step
+            features (list): Model features to serve; only the derived columns
+                they need are computed (the full feature catalogue if None)
+        """
+        metrics = metrics if metrics is not None else _DISABLED_METRICS
+        log = print if verbose else (lambda *args: None)
+        df = df.copy()
         
-        for window in windows:
-            for col in rolling_cols:
+        # 1. Handle missing values
+        log("- Handling missing values...")
+        with metrics.stage('preprocess.imputation'):
+            # Patient ids are factorized once; each grouped pass below covers all of its
+            # columns. Grouped fills keep the frame's row order within each patient.
+            patient_codes = pd.factorize(df['patient_id'])[0]
+            
+            # Forward fill lab values within patients
+            lab_cols = [col for col in ['hba1c', 'creatinine', 'egfr', 'cholesterol_total', 'cholesterol_ldl']
+                        if col in df.columns]
+            if lab_cols:
+                filled = df[lab_cols].groupby(patient_codes, sort=False).ffill()
+                df[lab_cols] = filled.groupby(patient_codes, sort=False).bfill()
+            
+            # Fill vital signs with patient-specific medians
+            vital_cols = [col for col in ['weight_kg', 'glucose_mg_dl', 'systolic_bp', 'diastolic_bp', 'heart_rate']
+                          if col in df.columns]
+            if vital_cols:
+                medians = df[vital_cols].groupby(patient_codes, sort=False).transform('median')
+                df[vital_cols] = df[vital_cols].fillna(medians)
+            
+            # Fill lifestyle data with population medians
+            for col, median in lifestyle_medians.items():
                 if col in df.columns:
-                    # Rolling mean
-                    df[f'{col}_mean_{window}d'] = df_sorted.groupby('patient_id')[col].rolling(
-                        window=window, min_periods=1
-                    ).mean().reset_index(0, drop=True)
-                    
-                    # Rolling standard deviation
-                    df[f'{col}_std_{window}d'] = df_sorted.groupby('patient_id')[col].rolling(
-                        window=window, min_periods=1
-                    ).std().reset_index(0, drop=True)
-                    
-                    # Rolling trend (slope)
-                    def calculate_slope(series):
-                        if len(series.dropna()) < 2:
-                            return 0
-                        x = np.arange(len(series))
-                        y = series.values
-                        valid_idx = ~np.isnan(y)
-                        if np.sum(valid_idx) < 2:
-                            return 0
-                        return np.polyfit(x[valid_idx], y[valid_idx], 1)[0]
-                    
-                    df[f'{col}_slope_{window}d'] = df_sorted.groupby('patient_id')[col].rolling(
-                        window=window, min_periods=2
-                    ).apply(calculate_slope).reset_index(0, drop=True)
-    
-    def _create_patient_risk_features(self, df):
-        """Create patient-level risk assessment features"""
-        
-        # Aggregate patient-level features
-        patient_features = df.groupby('patient_id').agg({
-            'age': 'first',
-            'comorbidity_count': 'first',
-            'bmi': 'first',
-            'glucose_mg_dl': ['mean', 'std', 'max', 'min'],
-            'systolic_bp': ['mean', 'std', 'max'],
-            'weight_kg': ['mean', 'std'],
-            'adherence_avg': ['mean', 'min'],
-            'steps': ['mean', 'std'],
-            'glucose_tir': 'mean',
-            'bp_controlled': 'mean'
-        }).fillna(0)
-        
-        # Flatten column names
-        patient_features.columns = ['_'.join(col).strip() for col in patient_features.columns]
-        patient_features = patient_features.reset_index()
-        
-        # Create composite risk scores
-        patient_features['glucose_variability_score'] = (
-            patient_features['glucose_mg_dl_std'] / patient_features['glucose_mg_dl_mean']
-        ).fillna(0)
-        
-        patient_features['bp_risk_score'] = (
-            (patient_features['systolic_bp_mean'] > 140).astype(int) +
-            (patient_features['systolic_bp_max'] > 180).astype(int)
-        )
+                    df[col] = df[col].fillna(median)
         
-        patient_features['adherence_risk_score'] = (
-            (patient_features['adherence_avg_mean'] < 0.8).astype(int) +
-            (patient_features['adherence_avg_min'] < 0.6).astype(int)
-        )
+        # 2-4. Clinical, time-based and rolling features from the feature graph;
+        # with a feature list only the nodes those features depend on are built
+        graph = build_feature_graph(encoders)
+        needed = None if features is None else required_features(graph, model_feature_sources(features))
+        compute_features(df, graph, needed, ['clinical_features', 'time_features', 'rolling_features'],
+                         metrics, log)
         
-        # Merge back to main dataframe
-        risk_cols = ['patient_id', 'glucose_variability_score', 'bp_risk_score', 'adherence_risk_score']
-        df = df.merge(patient_features[risk_cols], on='patient_id', how='left')
+        # 5. Handle categorical variables
+        compute_features(df, graph, needed, ['encoding'], metrics, log)
+        
+        return df
     
-    def prepare_ml_dataset(self, lookback_days=30):
+    def prepare_ml_dataset(self, lookback_days=None, target_col='deterioration_90d', per_record=None):
         """
         Prepare dataset for machine learning with proper temporal splits
         
         Args:
             lookback_days (int): Number of days of historical data to use for prediction
+                (self.lookback_days if None; patients with fewer records are skipped)
+            target_col (str): Label column to predict (see generate_labels)
+            per_record (bool): One sample per record, with features as of that
+                record (self.per_record_samples if None), instead of one per
+                patient at their latest record
         """
+        lookback_days = lookback_days or self.lookback_days
+        per_record = self.per_record_samples if per_record is None else per_record
+        # The model trained on this dataset is served with the same window
+        self.lookback_days = lookback_days
         print(f"Preparing ML dataset with {lookback_days}-day lookback...")
-        
-        df = self.processed_data.copy()
-        
-        # Create prediction dataset by taking the last N days for each patient
-        prediction_data = []
-        
-        for patient_id in df['patient_id'].unique():
-            patient_data = df[df['patient_id'] == patient_id].sort_values('date')
-            
-            # Skip patients with insufficient data
-            if len(patient_data) < lookback_days:
-                continue
+        with self.metrics.stage('prepare_ml_dataset'):
+            df = self.processed_data.copy()
             
-            # Take the most recent data for prediction
-            recent_data = patient_data.tail(lookback_days)
+            # Patient-level risk scores are joined from the aggregate table
+            risk_scores = self._patient_aggregate_table().scores()
             
-            # Aggregate features for this patient
-            patient_features = {
-                'patient_id': patient_id,
-                'target': patient_data['deterioration_90d'].iloc[-1]  # Target from latest record
-            }
+            # Create prediction dataset by taking the last N days for each patient
+            prediction_data = []
             
-            # Demographic features (static)
-            static_cols = ['age', 'comorbidity_count', 'bmi', 'primary_condition_encoded', 
-                          'baseline_risk_encoded', 'gender_encoded']
-            for col in static_cols:
-                if col in recent_data.columns:
-                    patient_features[col] = recent_data[col].iloc[-1]
-            
-            # Latest values
-            latest_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
-                          'heart_rate', 'adherence_avg', 'steps', 'sleep_hours', 'hba1c',
-                          'creatinine', 'egfr']
-            for col in latest_cols:
-                if col in recent_data.columns:
-                    patient_features[f'{col}_latest'] = recent_data[col].iloc[-1]
-            
-            # Rolling features (use latest computed values)
-            rolling_cols = [col for col in recent_data.columns if any(
-                suffix in col for suffix in ['_mean_', '_std_', '_slope_']
-            )]
-            for col in rolling_cols:
-                if col in recent_data.columns:
-                    patient_features[col] = recent_data[col].iloc[-1]
-            
-            # Clinical risk indicators
-            risk_cols = ['glucose_tir', 'bp_controlled', 'glucose_variability_score',
-                        'bp_risk_score', 'adherence_risk_score']
-            for col in risk_cols:
-                if col in recent_data.columns:
-                    if col.endswith('_score'):
+            for patient_id in ([] if per_record else df['patient_id'].unique()):
+                patient_data = df[df['patient_id'] == patient_id].sort_values('date')
+                
+                # Skip patients with insufficient data
+                if len(patient_data) < lookback_days:
+                    continue
+                
+                # Take the most recent data for prediction
+                recent_data = patient_data.tail(lookback_days)
+                
+                # Aggregate features for this patient
+                patient_features = {
+                    'patient_id': patient_id,
+                    'target': patient_data[target_col].iloc[-1]  # Target from latest record
+                }
+                
+                # Demographic features (static)
+                static_cols = ['age', 'comorbidity_count', 'bmi', 'primary_condition_encoded', 
+                              'baseline_risk_encoded', 'gender_encoded']
+                for col in static_cols:
+                    if col in recent_data.columns:
                         patient_features[col] = recent_data[col].iloc[-1]
-                    else:
+                
+                # Latest values
+                latest_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
+                              'heart_rate', 'adherence_avg', 'steps', 'sleep_hours', 'hba1c',
+                              'creatinine', 'egfr']
+                for col in latest_cols:
+                    if col in recent_data.columns:
+                        patient_features[f'{col}_latest'] = recent_data[col].iloc[-1]
+                
+                # Rolling features (use latest computed values)
+                rolling_cols = [col for col in recent_data.columns if any(
+                    suffix in col for suffix in ['_mean_', '_std_', '_slope_']
+                )]
+                for col in rolling_cols:
+                    if col in recent_data.columns:
+                        patient_features[col] = recent_data[col].iloc[-1]
+                
+                # Clinical risk indicators
+                for col in ['glucose_tir', 'bp_controlled']:
+                    if col in recent_data.columns:
                         patient_features[col] = recent_data[col].mean()
+                for col in PATIENT_RISK_SCORES:
+                    patient_features[col] = risk_scores.at[patient_id, col]
+                
+                prediction_data.append(patient_features)
             
-            prediction_data.append(patient_features)
-        
-        # Convert to DataFrame
-        ml_df = pd.DataFrame(prediction_data)
-        
-        # Remove rows with too many missing values
-        ml_df = ml_df.dropna(thresh=len(ml_df.columns) * 0.8)  # Keep rows with at least 80% non-null
-        
-        # Fill remaining missing values
-        numeric_cols = ml_df.select_dtypes(include=[np.number]).columns
-        ml_df[numeric_cols] = ml_df[numeric_cols].fillna(ml_df[numeric_cols].median())
+            # Convert to DataFrame
+            ml_df = self._per_record_samples(df, lookback_days, target_col) if per_record \
+                else pd.DataFrame(prediction_data)
+            
+            if ml_df.empty:
+                raise ValueError(
+                    f"No patient has {lookback_days} records to build features from. "
+                    f"Pass a smaller lookback_days."
+                )
+            
+            # Drop features never observed (e.g. vitals a public dataset does not record)
+            ml_df = ml_df.dropna(axis=1, how='all')
+            
+            # Remove rows with too many missing values
+            ml_df = ml_df.dropna(thresh=len(ml_df.columns) * 0.8)  # Keep rows with at least 80% non-null
+            
+            # Fill remaining missing values
+            numeric_cols = ml_df.select_dtypes(include=[np.number]).columns
+            ml_df[numeric_cols] = ml_df[numeric_cols].fillna(ml_df[numeric_cols].median())
         
         print(f"✓ ML dataset prepared: {ml_df.shape}")
         print(f"✓ Features: {len(ml_df.columns) - 2}")  # Subtract patient_id and target
@@ -400,7 +620,28 @@ class HealthcareRiskPredictor:
         
         return ml_df
     
-    def train_models(self, ml_df, test_size=0.2, random_state=42):
+    def _per_record_samples(self, df, lookback_days, target_col):
+        """
+        One training sample per record with at least lookback_days of history
+        
+        Features are assembled as of each record, the way run_backtest builds
+        its samples, so no later record leaks into a sample.
+        """
+        df = df.sort_values(['patient_id', 'date'], kind='stable').reset_index(drop=True)
+        rows = df[df.groupby('patient_id', sort=False).cumcount() + 1 >= lookback_days]
+        window_cols = [col for col in ['glucose_tir', 'bp_controlled'] if col in df.columns]
+        means = trailing_means(df, window_cols, lookback_days).loc[rows.index]
+        risk_scores = risk_scores_as_of(df).loc[rows.index]
+        
+        features = self._feature_frame_from_rows(rows, means, risk_scores)
+        features.insert(0, 'target', rows[target_col])
+        features.insert(0, 'patient_id', rows['patient_id'])
+        return features.reset_index(drop=True)
+    
+    def train_models(self, ml_df, test_size=0.2, random_state=42, tune=False,
+                     n_candidates=27, eta=3, selection_policy='auc', latency_budget_ms=None,
+                     per_condition=False, registry_dir='condition_models', min_condition_samples=50,
+                     registry_budget_mb=256):
         """
         Train multiple models and select the best one
         
@@ -408,6 +649,17 @@ class HealthcareRiskPredictor:
             ml_df (DataFrame): Prepared ML dataset
             test_size (float): Proportion of data for testing
             random_state (int): Random state for reproducibility
+            tune (bool): Run a successive-halving search per candidate, with early
+                stopping on a validation fold for the boosting models
+            n_candidates (int): Configurations sampled per candidate when tuning
+            eta (int): Successive-halving rate when tuning
+            selection_policy (str): 'auc', 'latency_budget' or 'pareto' (see selection.select_model)
+            latency_budget_ms (float): Per-request predict + SHAP budget for latency-aware policies
+            per_condition (bool): Also train one model per primary_condition (see
+                _train_condition_models); the selected model stays the global fallback
+            registry_dir (str): Directory for the per-condition model registry
+            min_condition_samples (int): Training rows a condition needs for its own model
+            registry_budget_mb (float): Memory budget for cached condition models when serving
         """
         print("Starting model training...")
         
@@ -416,13 +668,29 @@ class HealthcareRiskPredictor:
         X = ml_df[feature_cols].copy()
         y = ml_df['target'].copy()
         
+        if y.nunique() < 2:
+            raise ValueError(
+                f"Target has a single class ({y.iloc[0] if len(y) else 'no rows'}); "
+                f"no model can be trained or evaluated on it"
+            )
+        
         self.feature_names = feature_cols
+        self.serving_features = None
         print(f"Training with {len(feature_cols)} features")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y
-        )
+        # Split data (by patient when a patient contributes several samples)
+        if ml_df['patient_id'].duplicated().any():
+            train_idx, test_idx = next(GroupShuffleSplit(
+                n_splits=1, test_size=test_size, random_state=random_state
+            ).split(X, y, groups=ml_df['patient_id']))
+            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=random_state, stratify=y
+            )
+        if y_train.nunique() < 2 or y_test.nunique() < 2:
+            raise ValueError("Train/test split left a single class on one side; use a different test_size")
         
         # Scale features
         self.scaler = StandardScaler()
@@ -462,46 +730,78 @@ class HealthcareRiskPredictor:
         
         # Train and evaluate models
         model_results = {}
+        tuning_report = {}
         
         for name, model in models.items():
             print(f"\n🔄 Training {name}...")
             
-            try:
-                # Use scaled data for LR, original for tree-based models
-                if name == 'Logistic Regression':
-                    model.fit(X_train_scaled, y_train)
-                    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-                    y_pred = model.predict(X_test_scaled)
-                else:
-                    model.fit(X_train, y_train)
-                    y_pred_proba = model.predict_proba(X_test)[:, 1]
-                    y_pred = model.predict(X_test)
-                
-                # Calculate metrics
-                auc = roc_auc_score(y_test, y_pred_proba)
-                auprc = average_precision_score(y_test, y_pred_proba)
-                cm = confusion_matrix(y_test, y_pred)
-                
-                model_results[name] = {
-                    'model': model,
-                    'auc': auc,
-                    'auprc': auprc,
-                    'confusion_matrix': cm,
-                    'predictions': y_pred_proba,
-                    'actual': y_test
-                }
-                
-                print(f"  ✓ AUC: {auc:.4f}")
-                print(f"  ✓ AUPRC: {auprc:.4f}")
-                
-            except Exception as e:
-                print(f"  ❌ Error training {name}: {str(e)}")
-        
-        # Select best model based on AUC
-        best_model_name = max(model_results.keys(), key=lambda k: model_results[k]['auc'])
+            with self.metrics.stage(f'train.{name}'):
+                try:
+                    # Use scaled data for LR, original for tree-based models
+                    if name == 'Logistic Regression':
+                        X_fit, X_eval = X_train_scaled, X_test_scaled
+                    else:
+                        X_fit, X_eval = X_train, X_test
+                    
+                    if tune:
+                        model, tuning_report[name] = successive_halving(
+                            name, model, X_fit, y_train, n_candidates=n_candidates,
+                            eta=eta, random_state=random_state
+                        )
+                        budget = tuning_report[name]['budget']
+                        print(f"  ✓ Tuned: {budget['fits']} fits, {budget['samples_used']} rows "
+                              f"({budget['samples_used'] / budget['full_search_samples']:.0%} of full search)")
+                    else:
+                        model.fit(X_fit, y_train)
+                    
+                    y_pred_proba = model.predict_proba(X_eval)[:, 1]
+                    y_pred = model.predict(X_eval)
+                    
+                    # Calculate metrics
+                    auc = roc_auc_score(y_test, y_pred_proba)
+                    if not np.isfinite(auc):
+                        raise ValueError("AUC is undefined for this model's predictions")
+                    auprc = average_precision_score(y_test, y_pred_proba)
+                    cm = confusion_matrix(y_test, y_pred)
+                    
+                    model_results[name] = {
+                        'model': model,
+                        'auc': auc,
+                        'auprc': auprc,
+                        'confusion_matrix': cm,
+                        'predictions': y_pred_proba,
+                        'actual': y_test
+                    }
+                    
+                    print(f"  ✓ AUC: {auc:.4f}")
+                    print(f"  ✓ AUPRC: {auprc:.4f}")
+                    
+                except Exception as e:
+                    print(f"  ❌ Error training {name}: {str(e)}")
+            
+            if name in model_results:
+                # Serving cost: single-row and batch predict, SHAP and artifact size
+                with self.metrics.stage(f'benchmark.{name}'):
+                    serving, explainer = benchmark_candidate(name, model, X_eval, X_fit)
+                model_results[name]['serving'] = serving
+                model_results[name]['explainer'] = explainer
+                print(f"  ✓ Serving: {serving['serving_ms']:.2f} ms/request, "
+                      f"{serving['model_size_bytes'] / 1024:.0f} KiB")
+        
+        if not model_results:
+            raise ValueError("No candidate model could be trained; see the errors above")
+        
+        # Select the model to serve (best AUC by default, optionally within a latency budget)
+        best_model_name, selection = select_model(
+            model_results, policy=selection_policy, latency_budget_ms=latency_budget_ms
+        )
         self.model = model_results[best_model_name]['model']
+        self.model_version = None
         
-        print(f"\n🏆 Best model: {best_model_name}")
+        if 'LightGBM' in model_results:
+            self.warm_start_model = model_results['LightGBM']['model']
+        
+        print(f"\n🏆 Best model: {best_model_name} (selection policy: {selection_policy})")
         
         # Store comprehensive metrics for the best model
         self.model_metrics = {
@@ -512,10 +812,21 @@ class HealthcareRiskPredictor:
             'all_results': {name: {
                 'auc': float(results['auc']),
                 'auprc': float(results['auprc']),
-                'confusion_matrix': results['confusion_matrix'].tolist()
-            } for name, results in model_results.items()}
+                'confusion_matrix': results['confusion_matrix'].tolist(),
+                'serving': results['serving']
+            } for name, results in model_results.items()},
+            'selection': selection
         }
         
+        if tune:
+            self.model_metrics['tuning'] = {
+                'candidates': tuning_report,
+                'total_budget': {
+                    key: sum(report['budget'][key] for report in tuning_report.values())
+                    for key in ('fits', 'samples_used', 'boosting_rounds', 'seconds', 'full_search_samples')
+                }
+            }
+        
         # Calculate additional metrics
         y_test_pred = model_results[best_model_name]['predictions']
         
@@ -537,9 +848,11 @@ class HealthcareRiskPredictor:
             
             self.model_metrics['feature_importance'] = feature_importance
         
-        # Setup SHAP explainer
+        # Setup SHAP explainer (reuse the one built while benchmarking)
         try:
-            if best_model_name == 'Logistic Regression':
+            if model_results[best_model_name].get('explainer') is not None:
+                self.shap_explainer = model_results[best_model_name]['explainer']
+            elif best_model_name == 'Logistic Regression':
                 self.shap_explainer = shap.LinearExplainer(self.model, X_train_scaled)
             else:
                 self.shap_explainer = shap.TreeExplainer(self.model)
@@ -548,89 +861,297 @@ class HealthcareRiskPredictor:
         except Exception as e:
             print(f"⚠️ Warning: Could not initialize SHAP explainer: {str(e)}")
         
+        self.condition_models = None
+        if per_condition:
+            with self.metrics.stage('train.conditions'):
+                self.model_metrics['conditions'] = self._train_condition_models(
+                    best_model_name, X_train, X_test, y_train, y_test, y_test_pred,
+                    registry_dir, min_condition_samples, registry_budget_mb
+                )
+        
         print(f"\n✅ Model training complete!")
         return self.model_metrics
     
-    def predict_patient_risk(self, patient_id):
+    def _train_condition_models(self, model_name, X_train, X_test, y_train, y_test, global_test_pred,
+                                registry_dir, min_samples, budget_mb):
         """
-        Generate risk prediction and explanation for a specific patient
+        Fit the selected model type separately for each primary condition
+        
+        Uses the global train/test split, so each condition model is compared
+        with the global model on the same held-out patients. A condition keeps
+        its own model only if it scores at least as well there; otherwise (or
+        with too few rows or a single class) it routes to the global model.
+        
+        Returns:
+            dict: Per-condition report (rows, AUCs, whether a model was registered)
+        """
+        condition_col = 'primary_condition_encoded'
+        if condition_col not in X_train.columns:
+            print("⚠️ primary_condition_encoded not among features; per-condition training skipped")
+            return {}
+        
+        encoder = self.label_encoders.get('primary_condition')
+        global_test_pred = pd.Series(global_test_pred, index=X_test.index)
+        packages = {}
+        report = {}
+        
+        for code in sorted(X_train[condition_col].unique()):
+            name = str(encoder.classes_[int(code)]) if encoder is not None else str(int(code))
+            train_rows = (X_train[condition_col] == code).to_numpy()
+            test_rows = (X_test[condition_col] == code).to_numpy()
+            entry = {'train_rows': int(train_rows.sum()), 'test_rows': int(test_rows.sum()),
+                     'registered': False}
+            report[name] = entry
+            
+            y_fit, y_eval = y_train[train_rows], y_test[test_rows]
+            if train_rows.sum() < min_samples or y_fit.nunique() < 2 or y_eval.nunique() < 2:
+                entry['reason'] = 'insufficient data'
+                continue
+            
+            X_fit, X_eval = X_train[train_rows], X_test[test_rows]
+            scaler = None
+            if model_name == 'Logistic Regression':
+                scaler = StandardScaler()
+                X_fit = scaler.fit_transform(X_fit)
+                X_eval = scaler.transform(X_eval)
+            
+            try:
+                model = clone(self.model).fit(X_fit, y_fit)
+                entry['auc'] = float(roc_auc_score(y_eval, model.predict_proba(X_eval)[:, 1]))
+                entry['global_auc'] = float(roc_auc_score(y_eval, global_test_pred[test_rows]))
+                if entry['auc'] < entry['global_auc']:
+                    entry['reason'] = 'global model is better'
+                    continue
+                explainer = build_explainer(model_name, model, X_fit)
+            except Exception as e:
+                entry['reason'] = str(e)
+                continue
+            
+            packages[int(code)] = {
+                'condition': name,
+                'model': model,
+                'scaler': scaler,
+                'feature_names': list(self.feature_names),
+                'shap_explainer': explainer
+            }
+            entry['registered'] = True
+            print(f"  ✓ {name}: AUC {entry['auc']:.4f} (global {entry['global_auc']:.4f})")
+        
+        if packages:
+            write_registry(registry_dir, packages, report)
+            self.condition_models = ModelRegistry(registry_dir, int(budget_mb * 2 ** 20))
+        print(f"✓ Condition models registered: {len(packages)}/{len(report)}")
+        return report
+    
+    def load_condition_models(self, registry_dir, memory_budget_mb=256):
+        """Attach a per-condition registry written by train_models(per_condition=True)"""
+        self.condition_models = ModelRegistry(registry_dir, int(memory_budget_mb * 2 ** 20))
+        return self.condition_models
+    
+    def retrain_incremental(self, ml_df, n_new_trees=100, validation_size=0.3,
+                            auc_tolerance=0.02, full_ml_df=None, random_state=42):
+        """
+        Continue boosting the saved LightGBM model on newly labelled patients
+        
+        The new trees are fitted with ``init_model`` on part of ``ml_df`` and
+        validated on the rest. A full retrain (train_models) is run instead when
+        there is no LightGBM model to continue, when the previous model's AUC on
+        the new patients has drifted more than ``auc_tolerance`` below its
+        recorded validation AUC, or when the continued model does worse than the
+        previous one.
+        
+        Only a served LightGBM model can be continued; any per-condition models
+        were fitted against the previous global model and are dropped (retrain
+        them with train_models(per_condition=True)).
         
         Args:
-            patient_id (str): Patient identifier
+            ml_df (DataFrame): Newly labelled patients (prepare_ml_dataset output)
+            n_new_trees (int): Boosting rounds to add
+            validation_size (float): Share of ml_df held out for the AUC guardrail
+            auc_tolerance (float): Allowed AUC drop before falling back to a full retrain
+            full_ml_df (DataFrame): Dataset for the fallback full retrain (ml_df if None)
+            random_state (int): Random state for reproducibility
             
         Returns:
-            dict: Comprehensive prediction results
+            dict: Retrain summary (mode, AUCs and the reason for the decision)
         """
-        if self.model is None:
-            raise ValueError("Model not trained. Call train_models() first.")
+        if self.model is not None and type(self.model).__name__ != 'LGBMClassifier':
+            raise ValueError(
+                f"Incremental retraining continues a LightGBM model, but the served model is "
+                f"{self.model_metrics.get('best_model', type(self.model).__name__)}. Use train_models() instead."
+            )
         
-        # Get patient data
-        patient_data = self.processed_data[
-            self.processed_data['patient_id'] == patient_id
-        ].sort_values('date')
+        print("Starting incremental retraining...")
         
-        if patient_data.empty:
-            raise ValueError(f"Patient {patient_id} not found")
+        def full_retrain(reason):
+            print(f"⚠️ {reason} - falling back to full retrain")
+            self.train_models(full_ml_df if full_ml_df is not None else ml_df, random_state=random_state)
+            summary = {'mode': 'full', 'reason': reason, 'trained_at': datetime.now().isoformat()}
+            self.model_metrics['retrain'] = summary
+            return summary
         
-        # Prepare features (similar to ML dataset preparation)
-        recent_data = patient_data.tail(30)  # Last 30 days
+        base = self.warm_start_model
+        if base is None or not self.feature_names:
+            return full_retrain("No saved LightGBM model to continue")
         
-        patient_features = {}
+        X = ml_df.reindex(columns=self.feature_names)
+        y = ml_df['target']
+        if y.nunique() < 2:
+            return full_retrain("New data has a single class, AUC guardrail cannot be evaluated")
         
-        # Static features
-        static_cols = ['age', 'comorbidity_count', 'bmi', 'primary_condition_encoded', 
-                      'baseline_risk_encoded', 'gender_encoded']
-        for col in static_cols:
-            if col in recent_data.columns:
-                patient_features[col] = recent_data[col].iloc[-1]
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=validation_size, random_state=random_state, stratify=y
+        )
         
-        # Latest values
-        latest_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
-                      'heart_rate', 'adherence_avg', 'steps', 'sleep_hours', 'hba1c',
-                      'creatinine', 'egfr']
-        for col in latest_cols:
-            if col in recent_data.columns:
-                patient_features[f'{col}_latest'] = recent_data[col].iloc[-1]
+        with self.metrics.stage('train.incremental'):
+            previous_auc = roc_auc_score(y_val, base.predict_proba(X_val)[:, 1])
+            reference_auc = self.model_metrics.get('all_results', {}).get('LightGBM', {}).get('auc')
+            print(f"  ✓ Previous model AUC on new patients: {previous_auc:.4f}")
+            
+            if reference_auc is not None and previous_auc < reference_auc - auc_tolerance:
+                return full_retrain(
+                    f"Drift detected (AUC {previous_auc:.4f} vs {reference_auc:.4f} at training)"
+                )
+            
+            params = base.get_params()
+            params['n_estimators'] = n_new_trees
+            candidate = lgb.LGBMClassifier(**params)
+            candidate.fit(X_train, y_train, init_model=base.booster_)
+            
+            y_pred_proba = candidate.predict_proba(X_val)[:, 1]
+            new_auc = roc_auc_score(y_val, y_pred_proba)
+            print(f"  ✓ Continued model AUC: {new_auc:.4f} ({candidate.booster_.num_trees()} trees)")
         
-        # Rolling features
-        rolling_cols = [col for col in recent_data.columns if any(
-            suffix in col for suffix in ['_mean_', '_std_', '_slope_']
-        )]
-        for col in rolling_cols:
-            if col in recent_data.columns:
-                patient_features[col] = recent_data[col].iloc[-1]
+        if new_auc < previous_auc - auc_tolerance:
+            return full_retrain(f"Continued model regressed (AUC {new_auc:.4f} vs {previous_auc:.4f})")
         
-        # Risk indicators
-        risk_cols = ['glucose_tir', 'bp_controlled', 'glucose_variability_score',
-                    'bp_risk_score', 'adherence_risk_score']
-        for col in risk_cols:
-            if col in recent_data.columns:
-                if col.endswith('_score'):
-                    patient_features[col] = recent_data[col].iloc[-1]
-                else:
-                    patient_features[col] = recent_data[col].mean()
+        self.model = candidate
+        self.model_version = None
+        self.warm_start_model = candidate
         
-        # Create feature vector
-        feature_vector = []
-        for feature_name in self.feature_names:
-            if feature_name in patient_features:
-                feature_vector.append(patient_features[feature_name])
-            else:
-                feature_vector.append(0)  # Default value for missing features
+        dropped_conditions = self.condition_models is not None
+        if dropped_conditions:
+            print("⚠️ Condition models were fitted against the previous model - dropping them")
+            self.condition_models = None
+            self.model_metrics.pop('conditions', None)
+        
+        fraction_of_positives, mean_predicted_value = calibration_curve(y_val, y_pred_proba, n_bins=10)
+        self.model_metrics['calibration'] = {
+            'fraction_of_positives': fraction_of_positives.tolist(),
+            'mean_predicted_value': mean_predicted_value.tolist()
+        }
+        
+        auprc = average_precision_score(y_val, y_pred_proba)
+        cm = confusion_matrix(y_val, candidate.predict(X_val))
+        serving, explainer = benchmark_candidate('LightGBM', candidate, X_val, X_train)
+        self.model_metrics.setdefault('all_results', {})['LightGBM'] = {
+            'auc': float(new_auc),
+            'auprc': float(auprc),
+            'confusion_matrix': cm.tolist(),
+            'serving': serving
+        }
+        self.model_metrics.update({
+            'best_model': 'LightGBM',
+            'auc': float(new_auc),
+            'auprc': float(auprc),
+            'confusion_matrix': cm.tolist(),
+            'feature_importance': pd.DataFrame({
+                'feature': self.feature_names,
+                'importance': candidate.feature_importances_
+            }).sort_values('importance', ascending=False)
+        })
+        
+        self.shap_explainer = explainer if explainer is not None else self.shap_explainer
+        
+        summary = {
+            'mode': 'incremental',
+            'reason': 'AUC guardrail passed',
+            'previous_auc': float(previous_auc),
+            'new_auc': float(new_auc),
+            'added_trees': n_new_trees,
+            'new_patients': int(len(ml_df)),
+            'condition_models_dropped': dropped_conditions,
+            'trained_at': datetime.now().isoformat()
+        }
+        self.model_metrics['retrain'] = summary
+        print(f"\n✅ Incremental retraining complete!")
+        return summary
+    
+    def predict_patient_risk(self, patient_id, trends=None, as_of=None):
+        """
+        Generate risk prediction and explanation for a specific patient
         
-        feature_vector = np.array(feature_vector).reshape(1, -1)
+        Args:
+            patient_id (str): Patient identifier
+            trends (dict): Precomputed trends for this patient (computed if None)
+            as_of (str | datetime): Score the patient as of this date, using only
+                records on or before it (latest data if None)
+            
+        Returns:
+            dict: Comprehensive prediction results
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_models() first.")
+        
+        patient_data = None
+        serving_row = None
+        if self.serving_features is not None and as_of is None:
+            serving_row = self.serving_features.row(patient_id)
+        
+        if serving_row is not None:
+            # Precomputed serving features: the prediction is a row read
+            patient_features = dict(zip(self.serving_features.columns, serving_row.tolist()))
+            feature_vector = np.asarray(
+                serving_row[:self.serving_features.n_model_features], dtype=np.float64
+            ).reshape(1, -1)
+            if trends is None:
+                trends = trends_from_row(patient_features)
+        else:
+            if self.processed_data is None:
+                raise ValueError(f"Patient {patient_id} not found")
+            
+            # Get patient data
+            patient_data = self._patient_history(patient_id, as_of)
+            
+            if patient_data.empty:
+                if as_of is not None and patient_id in self._history_bounds:
+                    raise ValueError(f"Patient {patient_id} has no records on or before {as_of}")
+                raise ValueError(f"Patient {patient_id} not found")
+            
+            # Prepare features (similar to ML dataset preparation); a point-in-time
+            # score aggregates only the records up to the as-of date
+            risk_scores = None
+            if as_of is None:
+                risk_scores = self._patient_aggregate_table().scores([patient_id]).iloc[0]
+            patient_features = self._features_from_history(patient_data, risk_scores=risk_scores)
+            
+            # Create feature vector
+            feature_vector = []
+            for feature_name in self.feature_names:
+                if feature_name in patient_features:
+                    feature_vector.append(patient_features[feature_name])
+                else:
+                    feature_vector.append(0)  # Default value for missing features
+            
+            feature_vector = np.array(feature_vector).reshape(1, -1)
+        
+        # Route to the patient's condition model when one is registered
+        model, scaler, explainer, scored_by = self._condition_package(
+            patient_features.get('primary_condition_encoded')
+        )
         
         # Keep unscaled version for tree-based SHAP explainers
         feature_vector_unscaled = feature_vector.copy()
         
         # Scale features
-        if hasattr(self, 'scaler') and self.scaler is not None:
-            if type(self.model).__name__ == 'LogisticRegression':
-                feature_vector = self.scaler.transform(feature_vector)
+        if scaler is not None:
+            if type(model).__name__ == 'LogisticRegression':
+                feature_vector = scaler.transform(feature_vector)
         
         # Make prediction
-        risk_probability = self.model.predict_proba(feature_vector)[0, 1]
-        risk_class = self.model.predict(feature_vector)[0]
+        with self.metrics.stage('predict.model'):
+            risk_probability = model.predict_proba(feature_vector)[0, 1]
+            risk_class = model.predict(feature_vector)[0]
         
         # Risk categorization
         if risk_probability < 0.3:
@@ -641,18 +1162,22 @@ class HealthcareRiskPredictor:
             risk_category = "High"
         
         # Generate explanations (use appropriate feature vector based on model type)
-        if type(self.model).__name__ == 'LogisticRegression':
-            explanations = self._generate_explanations(feature_vector, patient_features)
-        else:
-            explanations = self._generate_explanations(feature_vector_unscaled, patient_features)
+        with self.metrics.stage('predict.shap'):
+            if type(model).__name__ == 'LogisticRegression':
+                explanations = self._generate_explanations(feature_vector, patient_features, explainer)
+            else:
+                explanations = self._generate_explanations(feature_vector_unscaled, patient_features, explainer)
         
         # Get recent trends
-        trends = self._analyze_patient_trends(patient_data)
+        if trends is None:
+            with self.metrics.stage('predict.trends'):
+                trends = self._analyze_patient_trends(patient_data)
         
         # Generate recommendations
-        recommendations = self._generate_recommendations(
-            risk_probability, patient_features, trends
-        )
+        with self.metrics.stage('predict.recommendations'):
+            recommendations = self._generate_recommendations(
+                risk_probability, patient_features, trends
+            )
         
         return {
             'patient_id': patient_id,
@@ -662,79 +1187,105 @@ class HealthcareRiskPredictor:
             'explanations': explanations,
             'trends': trends,
             'recommendations': recommendations,
+            'as_of': patient_data['date'].iloc[-1].isoformat() if as_of is not None else None,
+            'scored_by': scored_by,
             'last_updated': datetime.now().isoformat()
         }
     
-    def _generate_explanations(self, feature_vector, patient_features):
-        """Generate SHAP-based explanations for the prediction"""
-        try:
-            if self.shap_explainer is None:
-                return self._generate_rule_based_explanations(patient_features)
-            
-            # Ensure feature_vector is properly shaped and contains only numeric data
-            if feature_vector.ndim != 2:
-                feature_vector = feature_vector.reshape(1, -1)
-            
-            # Ensure we have the right number of features
-            if feature_vector.shape[1] != len(self.feature_names):
-                print(f"Feature mismatch: expected {len(self.feature_names)}, got {feature_vector.shape[1]}")
+    def _patient_history(self, patient_id, as_of=None):
+        """
+        One patient's date-sorted records, optionally truncated at an as-of date
+        
+        The sorted view and the per-patient row bounds are built once per
+        processed_data, so each lookup is a slice rather than a cohort scan.
+        """
+        if self._history_source is not self.processed_data:
+            df = self.processed_data.sort_values(['patient_id', 'date'], kind='stable')
+            codes = pd.factorize(df['patient_id'])[0]
+            starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+            stops = np.r_[starts[1:], len(df)]
+            self._history = df
+            self._history_bounds = dict(zip(df['patient_id'].to_numpy()[starts], zip(starts, stops)))
+            self._history_source = self.processed_data
+        
+        start, stop = self._history_bounds.get(patient_id, (0, 0))
+        if as_of is not None and stop > start:
+            dates = self._history['date'].to_numpy()[start:stop]
+            stop = start + int(np.searchsorted(dates, np.datetime64(pd.Timestamp(as_of)), side='right'))
+        return self._history.iloc[start:stop]
+    
+    def _features_from_history(self, patient_data, lookback_days=None, risk_scores=None):
+        """
+        Assemble one patient's feature dict from their date-sorted daily records
+        
+        Args:
+            patient_data (DataFrame): The patient's daily records
+            lookback_days (int): Records used for window-averaged indicators
+                (self.lookback_days, the model's training lookback, if None)
+            risk_scores (Series): The patient's PATIENT_RISK_SCORES row from the
+                aggregate table (computed from ``patient_data`` if None)
+        """
+        lookback_days = lookback_days or self.lookback_days
+        recent_data = patient_data.tail(lookback_days)
+        
+        patient_features = {}
+        
+        # Static features
+        static_cols = ['age', 'comorbidity_count', 'bmi', 'primary_condition_encoded', 
+                      'baseline_risk_encoded', 'gender_encoded']
+        for col in static_cols:
+            if col in recent_data.columns:
+                patient_features[col] = recent_data[col].iloc[-1]
+        
+        # Latest values
+        latest_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
+                      'heart_rate', 'adherence_avg', 'steps', 'sleep_hours', 'hba1c',
+                      'creatinine', 'egfr']
+        for col in latest_cols:
+            if col in recent_data.columns:
+                patient_features[f'{col}_latest'] = recent_data[col].iloc[-1]
+        
+        # Rolling features
+        rolling_cols = [col for col in recent_data.columns if any(
+            suffix in col for suffix in ['_mean_', '_std_', '_slope_']
+        )]
+        for col in rolling_cols:
+            if col in recent_data.columns:
+                patient_features[col] = recent_data[col].iloc[-1]
+        
+        # Risk indicators
+        for col in ['glucose_tir', 'bp_controlled']:
+            if col in recent_data.columns:
+                patient_features[col] = recent_data[col].mean()
+        
+        if risk_scores is None:
+            risk_scores = PatientAggregateTable.from_daily(patient_data).scores().iloc[0]
+        for col in PATIENT_RISK_SCORES:
+            patient_features[col] = risk_scores[col]
+        
+        return patient_features
+    
+    def _generate_explanations(self, feature_vector, patient_features, explainer=None):
+        """Generate SHAP-based explanations for the prediction (global explainer if None)"""
+        explainer = explainer if explainer is not None else self.shap_explainer
+        try:
+            if explainer is None:
+                return self._generate_rule_based_explanations(patient_features)
+            
+            # Ensure feature_vector is properly shaped and contains only numeric data
+            if feature_vector.ndim != 2:
+                feature_vector = feature_vector.reshape(1, -1)
+            
+            # Ensure we have the right number of features
+            if feature_vector.shape[1] != len(self.feature_names):
+                print(f"Feature mismatch: expected {len(self.feature_names)}, got {feature_vector.shape[1]}")
                 return self._generate_rule_based_explanations(patient_features)
             
             # Convert to float and handle any NaN values
             feature_vector_clean = np.array(feature_vector, dtype=np.float32)
             feature_vector_clean = np.nan_to_num(feature_vector_clean, nan=0.0, posinf=0.0, neginf=0.0)
             
-            # Calculate SHAP values
-            shap_values = self.shap_explainer.shap_values(feature_vector_clean)
-            
-            if isinstance(shap_values, list):
-                shap_values = shap_values[1]  # For binary classification
-            
-            # Ensure shap_values is 1D
-            if shap_values.ndim > 1:
-                shap_values = shap_values.flatten()
-            
-            # Validate array lengths before creating DataFrame
-            feature_values = feature_vector_clean[0]
-            
-            # Ensure all arrays have the same length
-            min_length = min(len(self.feature_names), len(shap_values), len(feature_values))
-            
-            if min_length != len(self.feature_names) or min_length != len(shap_values) or min_length != len(feature_values):
-                print(f"Array length mismatch: features={len(self.feature_names)}, shap={len(shap_values)}, values={len(feature_values)}")
-                # Truncate or pad to match the minimum length
-                feature_names_adj = self.feature_names[:min_length]
-                shap_values_adj = shap_values[:min_length]
-                feature_values_adj = feature_values[:min_length]
-            else:
-                feature_names_adj = self.feature_names
-                shap_values_adj = shap_values
-                feature_values_adj = feature_values
-            
-            # Get top contributing features
-            shap_df = pd.DataFrame({
-                'feature': feature_names_adj,
-                'shap_value': shap_values_adj,
-                'feature_value': feature_values_adj
-            })
-            
-            # Sort by absolute SHAP value
-            shap_df['abs_shap'] = np.abs(shap_df['shap_value'])
-            top_features = shap_df.nlargest(5, 'abs_shap')
-            
-            explanations = []
-            for _, row in top_features.iterrows():
-                direction = "increases" if row['shap_value'] > 0 else "decreases"
-                feature_readable = self._make_feature_readable(row['feature'])
-                
-                explanations.append({
-                    'factor': feature_readable,
-                    'impact': direction + " risk",
-                    'magnitude': float(abs(row['shap_value'])),
-                    'value': float(row['feature_value'])
-                })
-            
-            return explanations
+            return self._shap_explanations(explainer, feature_vector_clean)[0]
             
         except Exception as e:
             print(f"SHAP explanation failed: {e}")
@@ -742,53 +1293,9 @@ class HealthcareRiskPredictor:
     
     def _generate_rule_based_explanations(self, patient_features):
         """Generate rule-based explanations when SHAP is not available"""
-        explanations = []
-        
-        # Glucose control
-        if 'glucose_mg_dl_latest' in patient_features:
-            glucose = patient_features['glucose_mg_dl_latest']
-            if glucose > 200:
-                explanations.append({
-                    'factor': 'Recent glucose levels',
-                    'impact': 'increases risk',
-                    'magnitude': 0.8,
-                    'value': glucose
-                })
-        
-        # Blood pressure
-        if 'systolic_bp_latest' in patient_features:
-            bp = patient_features['systolic_bp_latest']
-            if bp > 150:
-                explanations.append({
-                    'factor': 'Blood pressure control',
-                    'impact': 'increases risk',
-                    'magnitude': 0.6,
-                    'value': bp
-                })
-        
-        # Medication adherence
-        if 'adherence_avg_latest' in patient_features:
-            adherence = patient_features['adherence_avg_latest']
-            if adherence < 0.8:
-                explanations.append({
-                    'factor': 'Medication adherence',
-                    'impact': 'increases risk',
-                    'magnitude': 0.9,
-                    'value': adherence
-                })
-        
-        # Age
-        if 'age' in patient_features:
-            age = patient_features['age']
-            if age > 70:
-                explanations.append({
-                    'factor': 'Age',
-                    'impact': 'increases risk',
-                    'magnitude': 0.4,
-                    'value': age
-                })
-        
-        return sorted(explanations, key=lambda x: x['magnitude'], reverse=True)[:5]
+        features = pd.DataFrame([patient_features])
+        masks = evaluate_rules(features, EXPLANATION_RULES)
+        return explanations_from_masks(features, masks)[0]
     
     def _make_feature_readable(self, feature_name):
         """Convert technical feature names to readable descriptions"""
@@ -813,167 +1320,499 @@ class HealthcareRiskPredictor:
     
     def _analyze_patient_trends(self, patient_data, days=30):
         """Analyze recent trends in patient data"""
-        recent_data = patient_data.tail(days)
-        
-        trends = {}
-        
-        # Glucose trend
-        if 'glucose_mg_dl' in recent_data.columns:
-            glucose_data = recent_data['glucose_mg_dl'].dropna()
-            if len(glucose_data) >= 7:
-                slope = np.polyfit(range(len(glucose_data)), glucose_data, 1)[0]
-                trends['glucose_trend'] = {
-                    'direction': 'increasing' if slope > 1 else 'decreasing' if slope < -1 else 'stable',
-                    'magnitude': abs(slope),
-                    'current_avg': glucose_data.tail(7).mean()
-                }
-        
-        # Weight trend
-        if 'weight_kg' in recent_data.columns:
-            weight_data = recent_data['weight_kg'].dropna()
-            if len(weight_data) >= 7:
-                slope = np.polyfit(range(len(weight_data)), weight_data, 1)[0]
-                trends['weight_trend'] = {
-                    'direction': 'increasing' if slope > 0.1 else 'decreasing' if slope < -0.1 else 'stable',
-                    'magnitude': abs(slope),
-                    'current_avg': weight_data.tail(7).mean()
-                }
-        
-        # Blood pressure trend
-        if 'systolic_bp' in recent_data.columns:
-            bp_data = recent_data['systolic_bp'].dropna()
-            if len(bp_data) >= 7:
-                slope = np.polyfit(range(len(bp_data)), bp_data, 1)[0]
-                trends['bp_trend'] = {
-                    'direction': 'increasing' if slope > 0.5 else 'decreasing' if slope < -0.5 else 'stable',
-                    'magnitude': abs(slope),
-                    'current_avg': bp_data.tail(7).mean()
-                }
+        trend_table = compute_trend_table(patient_data, days=days)
+        if trend_table.empty:
+            return {}
+        return trends_from_row(trend_table.iloc[0])
+    
+    def analyze_cohort_trends(self, days=30):
+        """
+        Compute trend statistics for every patient at once
         
-        # Adherence trend
-        if 'adherence_avg' in recent_data.columns:
-            adherence_data = recent_data['adherence_avg'].dropna()
-            if len(adherence_data) >= 7:
-                trends['adherence_trend'] = {
-                    'current_avg': adherence_data.tail(7).mean(),
-                    'consistency': 1 - adherence_data.tail(7).std()  # Higher is more consistent
-                }
+        Args:
+            days (int): Number of most recent records per patient to analyse
+            
+        Returns:
+            DataFrame: Per-patient slopes and recent averages (see trends.compute_trend_table)
+        """
+        if self.processed_data is None:
+            raise ValueError("Data not processed. Call preprocess_data() first.")
         
-        return trends
+        with self.metrics.stage('cohort.trends'):
+            return compute_trend_table(self.processed_data, days=days)
     
     def _generate_recommendations(self, risk_probability, patient_features, trends):
         """Generate actionable clinical recommendations"""
-        recommendations = []
-        
-        # High risk interventions
-        if risk_probability > 0.6:
-            recommendations.append({
-                'priority': 'high',
-                'action': 'Schedule immediate clinical assessment',
-                'rationale': 'High risk of deterioration in next 90 days',
-                'timeframe': 'within 48 hours'
-            })
+        features = pd.DataFrame([{
+            **patient_features,
+            **trend_features(trends),
+            'risk_probability': risk_probability
+        }])
+        masks = evaluate_rules(features, RECOMMENDATION_RULES)
+        return recommendations_from_masks(features, masks)[0]
+    
+    def predict_batch(self, patient_ids=None, records=None, explain=False, lookback_days=None,
+                      chunk_size=512):
+        """
+        Score many patients with a single model call
         
-        # Glucose management
-        if 'glucose_mg_dl_latest' in patient_features:
-            glucose = patient_features['glucose_mg_dl_latest']
-            if glucose > 180:
-                recommendations.append({
-                    'priority': 'high',
-                    'action': 'Review and adjust diabetes medications',
-                    'rationale': f'Recent glucose level {glucose:.0f} mg/dL is above target',
-                    'timeframe': 'within 1 week'
-                })
-            elif glucose > 150:
-                recommendations.append({
-                    'priority': 'medium',
-                    'action': 'Increase glucose monitoring frequency',
-                    'rationale': f'Glucose level {glucose:.0f} mg/dL trending above target',
-                    'timeframe': 'within 2 weeks'
-                })
+        Known patients are read from the serving rows (or their processed
+        records); raw records run through the per-patient preprocessing
+        pipeline with the fitted encoders and medians first, so patients that
+        are not loaded can be scored too. Each patient is scored by the same
+        model predict_patient_risk would use (condition model or global).
         
-        # Medication adherence
-        if 'adherence_avg_latest' in patient_features:
-            adherence = patient_features['adherence_avg_latest']
-            if adherence < 0.7:
-                recommendations.append({
-                    'priority': 'high',
-                    'action': 'Medication adherence counseling and support',
-                    'rationale': f'Poor medication adherence ({adherence:.1%})',
-                    'timeframe': 'within 1 week'
-                })
-            elif adherence < 0.8:
-                recommendations.append({
-                    'priority': 'medium',
-                    'action': 'Review medication barriers and simplify regimen if possible',
-                    'rationale': f'Suboptimal adherence ({adherence:.1%})',
-                    'timeframe': 'within 2 weeks'
-                })
+        Args:
+            patient_ids (list): Patients to score from loaded data
+            records (list): Raw daily records (patient_id, date and the
+                dataset's measurement columns) for patients to score from scratch
+            explain (bool): Include SHAP explanations, computed per chunk
+            lookback_days (int): Number of most recent records per patient to use
+                (self.lookback_days, the model's training lookback, if None)
+            chunk_size (int): Rows per explanation batch
+            
+        Returns:
+            iterator: One result dict per patient; unknown patient_ids yield
+            an entry with an 'error' key
+        """
+        lookback_days = lookback_days or self.lookback_days
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_models() first.")
+        if not patient_ids and not records:
+            raise ValueError("Provide patient_ids or records")
+        
+        with self.metrics.stage('predict.batch'):
+            frames = []
+            missing = []
+            if patient_ids:
+                known, missing = self._split_known_patients(pd.unique(pd.Series(patient_ids, dtype=str)))
+                if known:
+                    frames.append(self._stored_feature_frame(known, lookback_days))
+            if records:
+                frames.append(self._raw_feature_frame(records, lookback_days))
+            
+            features = pd.concat(frames) if frames else pd.DataFrame(columns=self.feature_names)
+            conditions = self._row_conditions(features)
+            if len(features):
+                X = self._model_input(features)
+                risk, scored_by = self._predict_risk(X, conditions)
+            else:
+                X, risk, scored_by = None, np.array([]), np.array([], dtype=object)
+            categories = risk_category_codes(risk)
         
-        # Blood pressure management
-        if 'systolic_bp_latest' in patient_features:
-            bp = patient_features['systolic_bp_latest']
-            if bp > 160:
-                recommendations.append({
-                    'priority': 'high',
-                    'action': 'Urgent blood pressure management',
-                    'rationale': f'Systolic BP {bp:.0f} mmHg requires immediate attention',
-                    'timeframe': 'within 24 hours'
-                })
-            elif bp > 140:
-                recommendations.append({
-                    'priority': 'medium',
-                    'action': 'Optimize antihypertensive therapy',
-                    'rationale': f'BP {bp:.0f} mmHg above target',
-                    'timeframe': 'within 1 week'
-                })
+        def results():
+            for patient_id in missing:
+                yield {'patient_id': patient_id, 'error': f"Patient {patient_id} not found"}
+            
+            for start in range(0, len(features), chunk_size):
+                stop = min(start + chunk_size, len(features))
+                explanations = None
+                if explain:
+                    with self.metrics.stage('predict.batch_explanations'):
+                        explanations = self._batch_explanations(
+                            X[start:stop], features.iloc[start:stop],
+                            None if conditions is None else conditions[start:stop]
+                        )
+                for i in range(start, stop):
+                    result = {
+                        'patient_id': features.index[i],
+                        'risk_probability': float(risk[i]),
+                        'risk_category': RISK_CATEGORIES[categories[i]],
+                        'scored_by': scored_by[i],
+                    }
+                    if explanations is not None:
+                        result['explanations'] = explanations[i - start]
+                    yield result
+        
+        return results()
+    
+    def _split_known_patients(self, patient_ids):
+        if self.serving_features is not None:
+            available = self.serving_features
+        elif self.processed_data is not None:
+            self._patient_history(None)  # builds the per-patient row bounds on first use
+            available = self._history_bounds
+        else:
+            raise ValueError("Data not processed. Call preprocess_data() first.")
+        known = [pid for pid in patient_ids if pid in available]
+        missing = [pid for pid in patient_ids if pid not in available]
+        return known, missing
+    
+    def _stored_feature_frame(self, patient_ids, lookback_days):
+        """Feature rows of loaded patients, from serving rows when available"""
+        if self.serving_features is not None:
+            return pd.DataFrame(self.serving_features.rows(patient_ids).astype(np.float64),
+                                index=pd.Index(patient_ids, name='patient_id'),
+                                columns=self.serving_features.columns)
+        daily = self.processed_data[self.processed_data['patient_id'].isin(patient_ids)]
+        return self._latest_feature_frame(daily, lookback_days,
+                                          self._patient_aggregate_table()).reindex(patient_ids)
+    
+    def _raw_feature_frame(self, records, lookback_days):
+        """Feature rows for patients given as raw daily records"""
+        raw = pd.DataFrame(records)
+        missing = {'patient_id', 'date'} - set(raw.columns)
+        if missing:
+            raise ValueError(f"Records are missing required fields: {sorted(missing)}")
+        raw['patient_id'] = raw['patient_id'].astype(str)
+        raw['date'] = pd.to_datetime(raw['date'])
+        raw = raw.sort_values(['patient_id', 'date'], kind='stable').reset_index(drop=True)
+        
+        # Population medians from training; the batch's own medians if the package predates them
+        medians = self.lifestyle_medians or self._fit_population_medians(raw)
+        try:
+            daily = self._engineer_patient_features(raw, medians, self.label_encoders, verbose=False,
+                                                    features=self.feature_names)
+        except ValueError as e:
+            raise ValueError(f"Could not preprocess records: {e}")
+        return self._latest_feature_frame(daily, lookback_days, PatientAggregateTable.from_daily(daily))
+    
+    def _batch_explanations(self, X, features, conditions=None):
+        """
+        Top-5 SHAP factors for each row of an unscaled model-input block
         
-        # Weight management
-        if 'weight_trend' in trends and trends['weight_trend']['direction'] == 'increasing':
-            if trends['weight_trend']['magnitude'] > 0.3:  # >0.3 kg/day trend
-                recommendations.append({
-                    'priority': 'high',
-                    'action': 'Evaluate for fluid retention and heart failure',
-                    'rationale': 'Rapid weight gain detected',
-                    'timeframe': 'within 48 hours'
-                })
+        Each row is explained by the explainer of the model that scores it
+        (see _condition_groups); rows without one get rule-based explanations.
+        """
+        explanations = [None] * len(X)
+        readable = [self._make_feature_readable(name) for name in self.feature_names]
+        
+        for rows, model, scaler, explainer, _ in self._condition_groups(conditions, len(X)):
+            if explainer is None:
+                group = features.iloc[rows]
+                masks = evaluate_rules(group, EXPLANATION_RULES)
+                for i, explanation in zip(rows, explanations_from_masks(group, masks)):
+                    explanations[i] = explanation
+                continue
+            
+            X_explain = self._scaled_for(model, scaler, X[rows])
+            X_explain = np.nan_to_num(X_explain.astype(np.float32), nan=0.0, posinf=0.0, neginf=0.0)
+            
+            for i, explanation in zip(rows, self._shap_explanations(explainer, X_explain, readable)):
+                explanations[i] = explanation
+        return explanations
+    
+    def _shap_explanations(self, explainer, X_explain, readable=None, k=5):
+        """
+        Top-k SHAP factors for each row of a cleaned model-input block
         
-        # Lab monitoring
-        if 'hba1c_latest' in patient_features:
-            hba1c = patient_features['hba1c_latest']
-            if hba1c > 8.0:
-                recommendations.append({
-                    'priority': 'medium',
-                    'action': 'Intensify diabetes management plan',
-                    'rationale': f'HbA1c {hba1c:.1f}% above target',
-                    'timeframe': 'within 1 week'
-                })
+        Shared by the single-patient and batch paths so both report the same
+        factors for the same row.
         
-        # Lifestyle interventions
-        if risk_probability > 0.4:
-            recommendations.append({
-                'priority': 'medium',
-                'action': 'Reinforce lifestyle modifications (diet, exercise, stress management)',
-                'rationale': 'Elevated risk profile warrants comprehensive lifestyle review',
-                'timeframe': 'within 2 weeks'
-            })
+        Args:
+            explainer: SHAP explainer of the model scoring the rows
+            X_explain (ndarray): Rows as the model sees them (scaled for LR), NaN-free
+            readable (list): Readable name of each feature (derived if None)
+            k (int): Factors per row
+            
+        Returns:
+            list: One list of factor dicts per row, largest |SHAP| first
+        """
+        if readable is None:
+            readable = [self._make_feature_readable(name) for name in self.feature_names]
+        shap_values = positive_class_shap(explainer, X_explain)
+        if shap_values.shape[1] != len(self.feature_names):
+            raise ValueError(f"SHAP output has {shap_values.shape[1]} values per row, "
+                             f"expected {len(self.feature_names)}")
+        
+        top = np.argsort(-np.abs(shap_values), axis=1, kind='stable')[:, :min(k, shap_values.shape[1])]
+        return [[{
+            'factor': readable[j],
+            'impact': ("increases" if shap_values[n, j] > 0 else "decreases") + " risk",
+            'magnitude': float(abs(shap_values[n, j])),
+            'value': float(X_explain[n, j])
+        } for j in columns] for n, columns in enumerate(top)]
+    
+    def iter_score_chunks(self, chunk_size=10000, include_features=False, top_factors=3):
+        """
+        Score the whole cohort in fixed-size chunks
+        
+        Reads consecutive slices of the serving matrix (memory-mapped when
+        loaded from disk), so memory stays proportional to chunk_size however
+        many patients there are. Serving rows are built in memory first if
+        none are loaded.
+        
+        Args:
+            chunk_size (int): Patients per chunk
+            include_features (bool): Append the model-input feature columns
+            top_factors (int): Number of top explanation factors per patient (0 to skip)
+            
+        Returns:
+            iterator: DataFrames with patient_id, risk_probability, risk_category,
+            top_factor_<k> / top_factor_<k>_impact and optionally the features
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_models() first.")
+        if self.serving_features is None:
+            self.build_serving_features()
+        serving = self.serving_features
+        n_model = serving.n_model_features
+        
+        def chunks():
+            for start in range(0, len(serving), chunk_size):
+                stop = min(start + chunk_size, len(serving))
+                with self.metrics.stage('export.chunk'):
+                    block = serving.block(start, stop).astype(np.float64)
+                    frame = pd.DataFrame(block, columns=serving.columns)
+                    conditions = self._row_conditions(frame)
+                    X = block[:, :n_model]
+                    risk, _ = self._predict_risk(X, conditions)
+                    
+                    chunk = pd.DataFrame({
+                        'patient_id': serving.patient_ids[start:stop],
+                        'risk_probability': risk,
+                        'risk_category': np.asarray(RISK_CATEGORIES, dtype=object)[risk_category_codes(risk)],
+                    })
+                    if top_factors:
+                        explanations = self._batch_explanations(X, frame, conditions)
+                        for k in range(top_factors):
+                            top = [row[k] if k < len(row) else None for row in explanations]
+                            chunk[f'top_factor_{k + 1}'] = [e['factor'] if e else None for e in top]
+                            chunk[f'top_factor_{k + 1}_impact'] = [e['impact'] if e else None for e in top]
+                    if include_features:
+                        features = pd.DataFrame(block[:, :n_model].astype(np.float32), columns=serving.feature_names)
+                        chunk = pd.concat([chunk, features], axis=1)
+                yield chunk
+        
+        return chunks()
+    
+    def build_cohort_feature_frame(self, lookback_days=None):
+        """
+        Assemble the patient-level feature rows for the whole cohort in one pass
+        
+        Produces the same features as predict_patient_risk builds for a single
+        patient, one row per patient, indexed by patient_id.
+        
+        Args:
+            lookback_days (int): Number of most recent records per patient to use
+                (self.lookback_days, the model's training lookback, if None)
+        """
+        lookback_days = lookback_days or self.lookback_days
+        if self.processed_data is None:
+            raise ValueError("Data not processed. Call preprocess_data() first.")
+        
+        return self._latest_feature_frame(self.processed_data, lookback_days, self._patient_aggregate_table())
+    
+    def _patient_aggregate_table(self):
+        """
+        The patient aggregate table for the current processed_data
+        
+        Built once per processed_data (like the sorted history view) and then
+        kept current per patient by the ingestion path.
+        """
+        if self.processed_data is None:
+            raise ValueError("Data not processed. Call preprocess_data() first.")
+        if self._aggregates_source is not self.processed_data:
+            with self.metrics.stage('patient_aggregates'):
+                self.patient_aggregates = PatientAggregateTable.from_daily(self.processed_data)
+            self._aggregates_source = self.processed_data
+        return self.patient_aggregates
+    
+    def _latest_feature_frame(self, daily, lookback_days=None, aggregates=None):
+        """
+        Patient-level feature rows from each patient's most recent processed records
+        
+        Args:
+            daily (DataFrame): Processed daily records
+            lookback_days (int): Records used for window-averaged indicators
+                (self.lookback_days, the model's training lookback, if None)
+            aggregates (PatientAggregateTable): Table the patient risk scores are
+                joined from (the scores are left out if None)
+        """
+        lookback_days = lookback_days or self.lookback_days
+        df = daily.sort_values(['patient_id', 'date'], kind='stable')
+        recent = df[df.groupby('patient_id', sort=False).cumcount(ascending=False) < lookback_days]
+        latest = recent.groupby('patient_id', sort=False).tail(1).set_index('patient_id')
+        window_means = recent.groupby('patient_id', sort=False)[
+            [col for col in ['glucose_tir', 'bp_controlled'] if col in recent.columns]
+        ].mean()
+        risk_scores = aggregates.scores(latest.index) if aggregates is not None else None
+        
+        return self._feature_frame_from_rows(latest, window_means, risk_scores)
+    
+    def _feature_frame_from_rows(self, rows, window_means, risk_scores=None):
+        """
+        Patient-level feature rows from selected daily records
+        
+        Args:
+            rows (DataFrame): One daily record per output row (static, latest and
+                rolling values are read from it)
+            window_means (DataFrame): Lookback-window means of glucose_tir and
+                bp_controlled, aligned to ``rows``
+            risk_scores (DataFrame): PATIENT_RISK_SCORES aligned to ``rows``
+        """
+        features = {}
+        
+        static_cols = ['age', 'comorbidity_count', 'bmi', 'primary_condition_encoded', 
+                      'baseline_risk_encoded', 'gender_encoded']
+        for col in static_cols:
+            if col in rows.columns:
+                features[col] = rows[col]
+        
+        latest_cols = ['glucose_mg_dl', 'weight_kg', 'systolic_bp', 'diastolic_bp',
+                      'heart_rate', 'adherence_avg', 'steps', 'sleep_hours', 'hba1c',
+                      'creatinine', 'egfr']
+        for col in latest_cols:
+            if col in rows.columns:
+                features[f'{col}_latest'] = rows[col]
+        
+        rolling_cols = [col for col in rows.columns if any(
+            suffix in col for suffix in ['_mean_', '_std_', '_slope_']
+        )]
+        for col in rolling_cols:
+            features[col] = rows[col]
+        
+        for col in ['glucose_tir', 'bp_controlled']:
+            if col in rows.columns:
+                features[col] = window_means[col]
+        
+        if risk_scores is not None:
+            for col in PATIENT_RISK_SCORES:
+                features[col] = risk_scores[col].to_numpy()
+        
+        return pd.DataFrame(features, index=rows.index)
+    
+    def _model_input(self, feature_frame):
+        """Align a feature frame to the trained feature order (unscaled; see _predict_risk)"""
+        return feature_frame.reindex(columns=self.feature_names, fill_value=0).to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def _row_conditions(frame):
+        """primary_condition_encoded per row of a feature frame (None if absent)"""
+        if 'primary_condition_encoded' not in frame.columns:
+            return None
+        return frame['primary_condition_encoded'].to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def _scaled_for(model, scaler, X):
+        """Apply a package's scaler when its model expects scaled input"""
+        if scaler is not None and type(model).__name__ == 'LogisticRegression':
+            return scaler.transform(X)
+        return X
+    
+    def _condition_package(self, condition):
+        """
+        Model used for a primary_condition_encoded value
+        
+        Returns:
+            tuple: (model, scaler, explainer, scored_by) of the registered
+            condition model, or of the global model if there is none
+        """
+        if self.condition_models is not None:
+            package = self.condition_models.get(condition)
+            if package is not None:
+                return (package['model'], package['scaler'], package['shap_explainer'],
+                        f"condition:{package['condition']}")
+        return self.model, self.scaler, self.shap_explainer, 'global'
+    
+    def _condition_groups(self, conditions, n_rows):
+        """
+        Partition rows by the model that scores them
         
-        return sorted(recommendations, key=lambda x: 0 if x['priority'] == 'high' else 1)
+        Args:
+            conditions (array): primary_condition_encoded per row (all rows go
+                to the global model if None)
+            n_rows (int): Number of rows
+            
+        Yields:
+            tuple: (row indices, model, scaler, explainer, scored_by)
+        """
+        routed = np.zeros(n_rows, dtype=bool)
+        if self.condition_models is not None and conditions is not None:
+            conditions = np.asarray(conditions, dtype=np.float64)
+            for condition in np.unique(conditions[~np.isnan(conditions)]):
+                package = self._condition_package(condition)
+                if package[3] == 'global':
+                    continue
+                rows = np.flatnonzero(conditions == condition)
+                routed[rows] = True
+                yield (rows,) + package
+        rest = np.flatnonzero(~routed)
+        if len(rest):
+            yield (rest, self.model, self.scaler, self.shap_explainer, 'global')
+    
+    def _predict_risk(self, X, conditions=None):
+        """
+        Risk probabilities for a block of unscaled model-input rows
+        
+        Rows are scored exactly as predict_patient_risk would score them: rows
+        whose condition has a registered model use that package, the rest the
+        global model, with one predict_proba call per group.
+        
+        Args:
+            X (ndarray): Unscaled rows in feature_names order
+            conditions (array): primary_condition_encoded per row
+            
+        Returns:
+            tuple: (probabilities, scored_by label per row)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        risk = np.empty(len(X))
+        scored_by = np.empty(len(X), dtype=object)
+        for rows, model, scaler, _, label in self._condition_groups(conditions, len(X)):
+            risk[rows] = model.predict_proba(self._scaled_for(model, scaler, X[rows]))[:, 1]
+            scored_by[rows] = label
+        return risk, scored_by
+    
+    def get_cohort_worklists(self, lookback_days=None, include_patient_recommendations=False):
+        """
+        Evaluate the recommendation rule table against the whole cohort at once
+        
+        Args:
+            lookback_days (int): Number of most recent records per patient to use
+                (self.lookback_days, the model's training lookback, if None)
+            include_patient_recommendations (bool): Also return each patient's recommendation list
+            
+        Returns:
+            dict: Worklists by rule and by timeframe (e.g. all patients needing
+            BP follow-up within 24 hours)
+        """
+        lookback_days = lookback_days or self.lookback_days
+        with self.metrics.stage('cohort.worklists'):
+            features = self.build_cohort_feature_frame(lookback_days)
+            if self.model is not None:
+                features['risk_probability'], _ = self._predict_risk(
+                    self._model_input(features), self._row_conditions(features)
+                )
+            features = features.join(compute_trend_table(self.processed_data, days=lookback_days))
+            
+            masks = evaluate_rules(features, RECOMMENDATION_RULES)
+            result = build_worklists(features.index, masks)
+            
+            if include_patient_recommendations:
+                result['patient_recommendations'] = dict(zip(
+                    features.index, recommendations_from_masks(features, masks)
+                ))
+        
+        result['total_patients'] = len(features)
+        result['generated_at'] = datetime.now().isoformat()
+        return result
     
     def get_cohort_risk_summary(self, risk_threshold=0.3):
         """Generate cohort-level risk summary for dashboard"""
-        if self.processed_data is None:
+        if self.processed_data is None and self.serving_features is None:
             raise ValueError("Data not processed. Call preprocess_data() first.")
         
-        # Get all unique patients
-        patients = self.processed_data['patient_id'].unique()
+        if self.processed_data is not None:
+            # Get all unique patients
+            patients = self.processed_data['patient_id'].unique()
+            
+            # Trends for the whole cohort in one batched pass
+            trend_table = self.analyze_cohort_trends()
+        else:
+            # Serving-only worker: trends are stored in the serving rows
+            patients = self.serving_features.patient_ids
+            trend_table = None
         
         cohort_results = []
         risk_distribution = {'low': 0, 'medium': 0, 'high': 0}
         
         for patient_id in patients:
             try:
-                result = self.predict_patient_risk(patient_id)
+                trends = None
+                if trend_table is not None:
+                    trends = trends_from_row(trend_table.loc[patient_id]) if patient_id in trend_table.index else {}
+                result = self.predict_patient_risk(patient_id, trends=trends)
                 cohort_results.append({
                     'patient_id': patient_id,
                     'risk_probability': result['risk_probability'],
@@ -1009,34 +1848,308 @@ class HealthcareRiskPredictor:
             'generated_at': datetime.now().isoformat()
         }
     
+    def run_backtest(self, cutoffs=None, freq='7D', lookback_days=None, max_staleness_days=7,
+                     refit=False, n_splits=5, horizon_days=90, target_col='deterioration_90d',
+                     return_scores=False):
+        """
+        Rolling-origin backtest: score every patient at every cutoff date
+        
+        Each (patient, cutoff) sample uses the patient's last record on or before
+        the cutoff, exactly what predict_patient_risk(..., as_of=cutoff) sees, and
+        is labelled with that record's target_col value. Features are read from
+        the precomputed rolling columns, so the whole grid is assembled with one
+        as-of join and scored in one vectorized call.
+        
+        Args:
+            cutoffs (list): Cutoff dates (weekly over the data span if None)
+            freq (str): Spacing of the default cutoffs
+            lookback_days (int): Records a patient needs before being scored, and
+                the window for averaged indicators (self.lookback_days, the
+                model's training lookback, if None)
+            max_staleness_days (int): Skip patients with no record this close to a cutoff
+            refit (bool): Retrain a clone of the current model at each origin on
+                earlier cutoffs only (TimeSeriesSplit with a horizon-sized gap)
+                instead of scoring every cutoff with the current model
+            n_splits (int): Number of origins when refitting
+            horizon_days (int): Label horizon, used as the gap between train and test cutoffs
+            target_col (str): Label column (see generate_labels)
+            return_scores (bool): Include the per-sample scores frame
+            
+        Returns:
+            dict: AUC/AUPRC per cutoff, pooled AUC and sample counts
+        """
+        lookback_days = lookback_days or self.lookback_days
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_models() first.")
+        if self.processed_data is None:
+            raise ValueError("Data not processed. Call preprocess_data() first.")
+        
+        with self.metrics.stage('backtest'):
+            df = self.processed_data.sort_values(['patient_id', 'date'], kind='stable')
+            if cutoffs is None:
+                cutoffs = default_cutoffs(df['date'], freq=freq, warmup_days=lookback_days)
+            cutoffs = pd.DatetimeIndex(cutoffs).sort_values()
+            
+            samples = as_of_rows(df, cutoffs, min_history=lookback_days,
+                                 max_staleness_days=max_staleness_days)
+            if samples.empty:
+                raise ValueError("No patients have enough history at the requested cutoffs")
+            
+            rows = df.iloc[samples['row'].to_numpy()].reset_index(drop=True)
+            window_cols = [col for col in ['glucose_tir', 'bp_controlled'] if col in df.columns]
+            means = trailing_means(df, window_cols, lookback_days).iloc[samples['row'].to_numpy()]
+            # Aggregate scores as of each cutoff, so no later records leak in
+            risk_scores = risk_scores_as_of(df).iloc[samples['row'].to_numpy()]
+            
+            features = self._feature_frame_from_rows(rows, means.reset_index(drop=True),
+                                                     risk_scores.reset_index(drop=True))
+            conditions = self._row_conditions(features)
+            features = features.reindex(columns=self.feature_names, fill_value=0)
+            features = features.fillna(features.median()).fillna(0)
+            
+            scores = samples[['patient_id', 'cutoff']].copy()
+            scores['target'] = rows[target_col].to_numpy()
+            scores['risk_probability'] = np.nan
+            
+            if not refit:
+                scores['risk_probability'], _ = self._predict_risk(self._model_input(features), conditions)
+                origins = []
+            else:
+                freq_days = int(np.median((cutoffs[1:] - cutoffs[:-1]).days)) if len(cutoffs) > 1 else 1
+                cutoff_pos = cutoffs.get_indexer(scores['cutoff'])
+                X = features.to_numpy(dtype=np.float64)
+                y = scores['target'].to_numpy()
+                origins = []
+                
+                for train_idx, test_idx in rolling_origin_splits(len(cutoffs), n_splits, horizon_days, freq_days):
+                    train = np.isin(cutoff_pos, train_idx)
+                    test = np.isin(cutoff_pos, test_idx)
+                    if len(np.unique(y[train])) < 2 or not test.any():
+                        continue
+                    
+                    model = clone(self.model)
+                    X_train, X_test = X[train], X[test]
+                    if type(model).__name__ == 'LogisticRegression':
+                        scaler = StandardScaler().fit(X_train)
+                        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+                    model.fit(X_train, y[train])
+                    scores.loc[test, 'risk_probability'] = model.predict_proba(X_test)[:, 1]
+                    origins.append({
+                        'origin': cutoffs[train_idx[-1]].strftime('%Y-%m-%d'),
+                        'train_samples': int(train.sum()),
+                        'test_cutoffs': int(len(test_idx))
+                    })
+            
+            scored = scores.dropna(subset=['risk_probability'])
+            per_cutoff = metrics_by_cutoff(scored)
+        
+        y_all = scored['target'].to_numpy()
+        result = {
+            'refit': refit,
+            'cutoffs': len(per_cutoff),
+            'samples': int(len(scored)),
+            'pooled_auc_roc': float(roc_auc_score(y_all, scored['risk_probability']))
+                              if 0 < y_all.sum() < len(y_all) else None,
+            'per_cutoff': per_cutoff,
+            'generated_at': datetime.now().isoformat()
+        }
+        if refit:
+            result['origins'] = origins
+        if return_scores:
+            result['scores'] = scored
+        
+        print(f"✓ Backtest: {result['samples']} samples over {result['cutoffs']} cutoffs, "
+              f"pooled AUC {result['pooled_auc_roc']}")
+        return result
+    
+    def backfill_risk_history(self, store, cutoffs=None, freq='1D', lookback_days=None, max_staleness_days=7):
+        """
+        Populate a RiskScoreStore with as-of scores for past dates
+        
+        Scores every patient at every cutoff with the current model (the same
+        as-of rows run_backtest uses) and appends one run per cutoff date.
+        
+        Args:
+            store (RiskScoreStore): Destination store
+            cutoffs (list): Dates to score (daily over the data span if None)
+            freq (str): Spacing of the default cutoffs
+            lookback_days (int): Records a patient needs before being scored
+                (self.lookback_days, the model's training lookback, if None)
+            max_staleness_days (int): Skip patients with no record this close to a cutoff
+            
+        Returns:
+            int: Number of dates written
+        """
+        scores = self.run_backtest(cutoffs=cutoffs, freq=freq, lookback_days=lookback_days,
+                                   max_staleness_days=max_staleness_days, return_scores=True)['scores']
+        written = 0
+        for cutoff, day_scores in scores.groupby('cutoff', sort=True):
+            written += store.append(day_scores, day=cutoff, run_id='backfill')
+        print(f"✓ Risk history backfilled for {written} dates")
+        return written
+    
     def save_model(self, filepath='healthcare_risk_model.pkl'):
         """Save the trained model and components"""
         model_package = {
             'model': self.model,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
+            'lookback_days': self.lookback_days,
             'model_metrics': self.model_metrics,
-            'shap_explainer': self.shap_explainer
+            'shap_explainer': self.shap_explainer,
+            'warm_start_model': self.warm_start_model,
+            # Preprocessing state, needed to score raw records (predict_batch)
+            'label_encoders': self.label_encoders,
+            'lifestyle_medians': self.lifestyle_medians,
+            'condition_registry': (
+                os.path.abspath(self.condition_models.directory) if self.condition_models is not None else None
+            ),
+            'condition_budget_bytes': (
+                self.condition_models.memory_budget_bytes if self.condition_models is not None else None
+            )
         }
         
+        data = pickle.dumps(model_package)
         with open(filepath, 'wb') as f:
-            pickle.dump(model_package, f)
+            f.write(data)
+        # Versioned by the artifact's bytes, so every process loading it agrees
+        self.model_version = artifact_version(data)
         
         print(f"✓ Model saved to {filepath}")
     
     def load_model(self, filepath='healthcare_risk_model.pkl'):
         """Load a pre-trained model"""
         with open(filepath, 'rb') as f:
-            model_package = pickle.load(f)
+            data = f.read()
+        model_package = pickle.loads(data)
         
         self.model = model_package['model']
+        self.model_version = artifact_version(data)
         self.scaler = model_package['scaler']
         self.feature_names = model_package['feature_names']
+        self.lookback_days = model_package.get('lookback_days', self.DEFAULT_LOOKBACK_DAYS)
         self.model_metrics = model_package['model_metrics']
         self.shap_explainer = model_package.get('shap_explainer')
+        self.warm_start_model = model_package.get('warm_start_model')
+        self.label_encoders = model_package.get('label_encoders') or self.label_encoders
+        self.lifestyle_medians = model_package.get('lifestyle_medians') or self.lifestyle_medians
+        self.serving_features = None
+        self.similarity_index = None
+        
+        # Condition models stay on disk until a patient with that condition is scored
+        self.condition_models = None
+        registry_dir = model_package.get('condition_registry')
+        if registry_dir and os.path.isdir(registry_dir):
+            self.condition_models = ModelRegistry(registry_dir, model_package['condition_budget_bytes'])
         
         print(f"✓ Model loaded from {filepath}")
     
+    def build_serving_features(self, path=None, lookback_days=None):
+        """
+        Precompute each patient's latest feature row for serving
+        
+        Args:
+            path (str): Directory to write the memory-mappable matrix to (kept in memory if None)
+            lookback_days (int): Number of most recent records per patient to use
+                (self.lookback_days, the model's training lookback, if None)
+        """
+        lookback_days = lookback_days or self.lookback_days
+        if not self.feature_names:
+            raise ValueError("Model not trained. Call train_models() first.")
+        
+        with self.metrics.stage('serving.build'):
+            frame = self.build_cohort_feature_frame(lookback_days).join(
+                compute_trend_table(self.processed_data, days=lookback_days)
+            )
+            # Identified by its inputs, so rebuilding the same rows keeps the snapshot version
+            source = hashlib.sha1('|'.join(
+                [processed_key(self.processed_data), str(lookback_days)] + list(self.feature_names)
+            ).encode('utf-8')).hexdigest()[:12]
+            matrix = ServingFeatureMatrix.from_frame(frame, self.feature_names, source=source)
+            
+            if path is not None:
+                matrix.save(path)
+                # Serve from the mapped file so this process shares pages with other workers
+                matrix = ServingFeatureMatrix.load(path)
+        
+        self.serving_features = matrix
+        self._build_similarity_index()
+        print(f"✓ Serving features built: {matrix.matrix.shape}")
+        return matrix
+    
+    def load_serving_features(self, path):
+        """Memory-map a serving feature matrix written by build_serving_features"""
+        matrix = ServingFeatureMatrix.load(path)
+        if self.feature_names and matrix.feature_names != list(self.feature_names):
+            raise ValueError(f"Serving features at {path} do not match the loaded model's features")
+        
+        self.serving_features = matrix
+        self._build_similarity_index()
+        print(f"✓ Serving features mapped from {path}: {matrix.matrix.shape}")
+        return matrix
+    
+    def _build_similarity_index(self):
+        with self.metrics.stage('serving.similarity_index'):
+            self.similarity_index = SimilarPatientIndex.from_serving(self.serving_features)
+    
+    def find_similar_patients(self, patient_id, k=5):
+        """
+        The k patients whose serving feature vectors are closest to this patient's
+        
+        Args:
+            patient_id (str): Patient identifier
+            k (int): Number of neighbours
+            
+        Returns:
+            dict: Neighbours nearest first, each with its distance, current
+            risk and outcome (latest deterioration label and recorded events,
+            when the daily records and events are loaded)
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_models() first.")
+        if self.similarity_index is None:
+            raise ValueError("Serving features not built. Call build_serving_features() first.")
+        
+        with self.metrics.stage('similar.query'):
+            neighbours = self.similarity_index.query(patient_id, k)
+            ids = [pid for pid, _ in neighbours]
+            
+            risk = np.array([])
+            if ids:
+                frame = pd.DataFrame(self.serving_features.rows(ids).astype(np.float64),
+                                     columns=self.serving_features.columns)
+                risk, _ = self._predict_risk(self.serving_features.model_rows(ids),
+                                             self._row_conditions(frame))
+            
+            labels = {}
+            if self.processed_data is not None and 'deterioration_90d' in self.processed_data.columns:
+                for pid in ids:
+                    history = self._patient_history(pid)
+                    if len(history):
+                        labels[pid] = int(history['deterioration_90d'].iloc[-1])
+            
+            event_counts = {}
+            if self.events_data is not None and len(ids):
+                events = self.events_data[self.events_data['patient_id'].isin(ids)]
+                event_counts = events['patient_id'].value_counts().to_dict()
+        
+        similar = []
+        for (pid, distance), probability in zip(neighbours, risk):
+            similar.append({
+                'patient_id': pid,
+                'distance': distance,
+                'risk_probability': float(probability),
+                'risk_category': RISK_CATEGORIES[risk_category_codes([probability])[0]],
+                'deteriorated': labels.get(pid),
+                'event_count': int(event_counts.get(pid, 0)) if self.events_data is not None else None
+            })
+        
+        return {
+            'patient_id': patient_id,
+            'similar_patients': similar,
+            'generated_at': datetime.now().isoformat()
+        }
+    
     def generate_model_report(self):
         """Generate comprehensive model evaluation report"""
         if not self.model_metrics:
@@ -1051,6 +2164,11 @@ class HealthcareRiskPredictor:
             },
             'feature_importance': None,
             'calibration': self.model_metrics.get('calibration'),
+            'all_results': self.model_metrics.get('all_results'),
+            'selection': self.model_metrics.get('selection'),
+            'tuning': self.model_metrics.get('tuning'),
+            'conditions': self.model_metrics.get('conditions'),
+            'condition_registry': self.condition_models.describe() if self.condition_models is not None else None,
             'clinical_interpretation': self._generate_clinical_interpretation()
         }
         
@@ -1098,27 +2216,260 @@ class HealthcareRiskPredictor:
 class HealthcareAPI:
     """Flask API wrapper for the healthcare risk prediction system"""
     
-    def __init__(self, predictor):
-        self.predictor = predictor
+    # Reload options a request may set; paths only come from server-side configuration
+    RELOAD_REQUEST_OPTIONS = {'reload_data'}
+    
+    # Read routes answered from the snapshot, and the extra state their body depends on
+    CONDITIONAL_ENDPOINTS = {
+        'health_check': None,
+        'predict_patient': None,
+        'cohort_summary': 'cohort',
+        'model_metrics': None,
+        'worklists': None,
+        'list_patients': None,
+        'patient_details': None,
+        'risk_history': 'risk_store',
+        'cohort_risk_history': 'risk_store',
+        'export_scores': None,
+        'similar_patients': None,
+    }
+    
+    def __init__(self, predictor, reload_config=None, risk_store=None):
+        """
+        Args:
+            predictor (HealthcareRiskPredictor): Trained predictor to serve
+            reload_config (dict): build_predictor arguments used by /admin/reload
+                (model_path, serving_path, data paths)
+            risk_store (RiskScoreStore): Where cohort scoring runs are recorded
+                for the risk history routes (disabled if None)
+        """
+        self.snapshots = SnapshotHolder(ModelSnapshot(predictor))
+        self.reload_config = dict(reload_config or {})
+        self.risk_store = risk_store
+        self.ingestion = None
         self.app = Flask(__name__)
         CORS(self.app)
+        self._setup_instrumentation()
         self._setup_routes()
+        self._setup_conditional_requests()
+    
+    @property
+    def predictor(self):
+        """Predictor of the live snapshot"""
+        return self.snapshots.current.predictor
+    
+    def start_ingestion(self, events_path, follow=True, **options):
+        """
+        Stream device readings into the live snapshots on a background thread
+        
+        Each consumed batch is published as a new snapshot (see
+        VitalsIngestionService), so /predict and the other read routes serve
+        the refreshed rows.
+        
+        Args:
+            events_path (str): JSON-lines file of events (tailed if follow)
+            follow (bool): Keep reading events appended to the file
+            **options: VitalsIngestionService options (batch_size, max_queue, ...)
+            
+        Returns:
+            VitalsIngestionService: The running service
+        """
+        if self.ingestion is not None:
+            raise ValueError("Ingestion is already running")
+        service = VitalsIngestionService(self.predictor, snapshots=self.snapshots, **options)
+        service.seed()
+        start_background(service, events_path, follow=follow)
+        self.ingestion = service
+        return service
+    
+    def _build_snapshot(self, reload_data=False):
+        """Build a replacement snapshot from the configured artifacts"""
+        current = self.snapshots.current.predictor
+        options = dict(self.reload_config)
+        options.pop('reload_data', None)
+        predictor = build_predictor(
+            reload_data=reload_data, metrics=current.metrics,
+            # Reuse the live (never mutated) daily records unless they are being reloaded
+            processed_data=None if reload_data else current.processed_data,
+            **options
+        )
+        return ModelSnapshot(predictor)
+    
+    def _require_risk_store(self):
+        if self.risk_store is None:
+            raise ValueError("Risk history store not configured")
+        return self.risk_store
+    
+    def _record_scores(self, patient_risks):
+        """
+        Queue a cohort scoring run for the risk store, once per day and model version
+        
+        The Parquet write, rollup and compaction run on a background thread,
+        off the request. Runs are keyed by the model version rather than the
+        snapshot version, so streamed data updates do not each append
+        another full-cohort run.
+        """
+        if self.risk_store is not None:
+            self.risk_store.append_async(patient_risks, run_id=g.snapshot.model_version)
+    
+    def _validators(self):
+        """
+        ETag and Last-Modified for the current request, or None if the route is not cacheable
+        
+        The tag is derived from the snapshot version (model + data), so it can
+        be computed without touching the route's work. Bodies carry generation
+        timestamps, so tags are weak.
+        """
+        if request.method != 'GET' or request.endpoint not in self.CONDITIONAL_ENDPOINTS:
+            return None
+        
+        snapshot = g.snapshot
+        parts = [snapshot.version]
+        last_modified = datetime.fromisoformat(snapshot.created_at)
+        depends_on = self.CONDITIONAL_ENDPOINTS[request.endpoint]
+        if depends_on == 'risk_store' and self.risk_store is not None:
+            parts.append(self.risk_store.version)
+            if self.risk_store.updated_at is not None:
+                last_modified = max(last_modified, self.risk_store.updated_at)
+        elif depends_on == 'cohort' and self.risk_store is not None:
+            # The first summary of each day is also recorded, so it must not be skipped
+            # (a new model gives a new snapshot version, hence a new tag)
+            parts.append(datetime.now().strftime('%Y-%m-%d'))
+        
+        etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+        return etag, last_modified.replace(microsecond=0).astimezone(timezone.utc)
+    
+    def _setup_conditional_requests(self):
+        """Answer revalidation requests with 304 before any prediction work is done"""
+        
+        @self.app.before_request
+        def check_not_modified():
+            validators = self._validators()
+            if validators is None:
+                return None
+            etag, last_modified = validators
+            g.validators = validators
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (request.if_modified_since is not None and
+                                last_modified <= request.if_modified_since)
+            if not_modified:
+                response = Response(status=304)
+                self._set_validators(response, etag, last_modified)
+                return response
+            return None
+        
+        @self.app.after_request
+        def add_validators(response):
+            validators = g.pop('validators', None)
+            if validators is not None and response.status_code == 200:
+                self._set_validators(response, *validators)
+            return response
+    
+    @staticmethod
+    def _set_validators(response, etag, last_modified):
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        # Let browsers store the body but revalidate it on every use
+        response.cache_control.no_cache = True
     
     def _safe_jsonify(self, data):
         """Convert data to JSON-safe format and return jsonify response"""
         return jsonify(json.loads(json.dumps(data, cls=NumpyEncoder)))
     
+    def _setup_instrumentation(self):
+        """Record per-route request counts and latency histograms"""
+        metrics = self.predictor.metrics
+        
+        @self.app.before_request
+        def start_timer():
+            g.metrics_token = metrics.start_request()
+        
+        @self.app.after_request
+        def record_latency(response):
+            token = g.pop('metrics_token', None)
+            if token is not None:
+                # Label by route template, not raw path, to keep label cardinality bounded
+                endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                metrics.finish_request(token, request.method, endpoint, response.status_code)
+            return response
+    
     def _setup_routes(self):
         """Setup API routes"""
         
+        @self.app.before_request
+        def bind_snapshot():
+            # One snapshot per request: a concurrent swap never changes what this request reads
+            g.snapshot = self.snapshots.current
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def prometheus_metrics():
+            return Response(self.predictor.metrics.render_prometheus(),
+                            mimetype='text/plain; version=0.0.4')
+        
         @self.app.route('/health', methods=['GET'])
         def health_check():
-            return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+            return jsonify({'status': 'healthy', 'model_version': g.snapshot.version,
+                            'timestamp': datetime.now().isoformat()})
+        
+        @self.app.route('/admin/reload', methods=['POST'])
+        def reload_snapshot():
+            options = request.get_json(silent=True) or {}
+            unknown = set(options) - self.RELOAD_REQUEST_OPTIONS
+            if unknown:
+                return jsonify({'error': f'Unsupported reload options: {sorted(unknown)}'}), 400
+            if not self.reload_config.get('model_path'):
+                return jsonify({'error': 'Reload is not configured for this server'}), 400
+            
+            reload_data = bool(options.get('reload_data', False))
+            if not self.snapshots.reload_async(lambda: self._build_snapshot(reload_data)):
+                return self._safe_jsonify(dict(self.snapshots.status(), error='Reload already in progress')), 409
+            return self._safe_jsonify(self.snapshots.status()), 202
+        
+        @self.app.route('/admin/reload', methods=['GET'])
+        def reload_status():
+            return self._safe_jsonify(self.snapshots.status())
+        
+        @self.app.route('/admin/ingestion', methods=['GET'])
+        def ingestion_status():
+            if self.ingestion is None:
+                return jsonify({'error': 'Ingestion is not running'}), 404
+            return self._safe_jsonify(self.ingestion.stats())
         
         @self.app.route('/predict/<patient_id>', methods=['GET'])
         def predict_patient(patient_id):
             try:
-                result = self.predictor.predict_patient_risk(patient_id)
+                result = g.snapshot.predictor.predict_patient_risk(
+                    patient_id, as_of=request.args.get('as_of')
+                )
+                return self._safe_jsonify(result)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/predict/batch', methods=['POST'])
+        def predict_batch():
+            try:
+                payload = request.get_json(silent=True) or {}
+                results = g.snapshot.predictor.predict_batch(
+                    patient_ids=payload.get('patient_ids'),
+                    records=payload.get('records'),
+                    explain=bool(payload.get('explain', False))
+                )
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # One JSON object per line, written as results are produced
+            lines = (json.dumps(result, cls=NumpyEncoder) + '\n' for result in results)
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        
+        @self.app.route('/similar/<patient_id>', methods=['GET'])
+        def similar_patients(patient_id):
+            try:
+                result = g.snapshot.predictor.find_similar_patients(
+                    patient_id, k=int(request.args.get('k', 5))
+                )
                 return self._safe_jsonify(result)
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
@@ -1126,15 +2477,68 @@ class HealthcareAPI:
         @self.app.route('/cohort_summary', methods=['GET'])
         def cohort_summary():
             try:
-                result = self.predictor.get_cohort_risk_summary()
+                result = g.snapshot.predictor.get_cohort_risk_summary()
+                self._record_scores(result['patient_risks'])
                 return self._safe_jsonify(result)
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
         
+        @self.app.route('/risk_history/<patient_id>', methods=['GET'])
+        def risk_history(patient_id):
+            try:
+                history = self._require_risk_store().patient_history(
+                    patient_id, start=request.args.get('start'), end=request.args.get('end')
+                )
+                return self._safe_jsonify({'patient_id': patient_id, 'history': history,
+                                           'count': len(history)})
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/cohort_risk_history', methods=['GET'])
+        def cohort_risk_history():
+            try:
+                days = self._require_risk_store().cohort_history(
+                    start=request.args.get('start'), end=request.args.get('end')
+                )
+                return self._safe_jsonify({'days': days, 'count': len(days)})
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/export/scores', methods=['GET'])
+        def export_scores():
+            fmt = request.args.get('format', 'parquet')
+            if fmt not in EXPORT_FORMATS:
+                return jsonify({'error': f"Unknown export format '{fmt}'. Available: {sorted(EXPORT_FORMATS)}"}), 400
+            try:
+                chunks = g.snapshot.predictor.iter_score_chunks(
+                    chunk_size=int(request.args.get('chunk_size', 10000)),
+                    include_features=request.args.get('features', 'false').lower() == 'true',
+                    top_factors=int(request.args.get('top_factors', 3))
+                )
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+            
+            mimetype, extension = EXPORT_FORMATS[fmt]
+            return Response(stream_with_context(iter_export_bytes(chunks, fmt)), mimetype=mimetype, headers={
+                'Content-Disposition': f'attachment; filename=risk_scores.{extension}'
+            })
+        
         @self.app.route('/model_metrics', methods=['GET'])
         def model_metrics():
             try:
-                result = self.predictor.generate_model_report()
+                result = g.snapshot.predictor.generate_model_report()
+                return self._safe_jsonify(result)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+        
+        @self.app.route('/worklists', methods=['GET'])
+        def worklists():
+            try:
+                include = request.args.get('include_patients', 'false').lower() == 'true'
+                result = g.snapshot.predictor.get_cohort_worklists(include_patient_recommendations=include)
+                timeframe = request.args.get('timeframe')
+                if timeframe:
+                    result['by_timeframe'] = {timeframe: result['by_timeframe'].get(timeframe, [])}
                 return self._safe_jsonify(result)
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
@@ -1142,7 +2546,11 @@ class HealthcareAPI:
         @self.app.route('/patients', methods=['GET'])
         def list_patients():
             try:
-                patients = self.predictor.processed_data['patient_id'].unique().tolist()
+                predictor = g.snapshot.predictor
+                if predictor.processed_data is not None:
+                    patients = predictor.processed_data['patient_id'].unique().tolist()
+                else:
+                    patients = list(predictor.serving_features.patient_ids)
                 return jsonify({'patients': patients, 'count': len(patients)})
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
@@ -1150,8 +2558,9 @@ class HealthcareAPI:
         @self.app.route('/patient_details/<patient_id>', methods=['GET'])
         def patient_details(patient_id):
             try:
-                patient_data = self.predictor.processed_data[
-                    self.predictor.processed_data['patient_id'] == patient_id
+                processed_data = g.snapshot.predictor.processed_data
+                patient_data = processed_data[
+                    processed_data['patient_id'] == patient_id
                 ].tail(30).to_dict('records')
                 
                 return self._safe_jsonify({
@@ -1168,6 +2577,55 @@ class HealthcareAPI:
         self.app.run(host=host, port=port, debug=debug)
 
 
+def build_predictor(model_path, serving_path=None, reload_data=False, processed_data=None,
+                    metrics=None, data_path='synthetic_healthcare_dataset.csv',
+                    events_path='deterioration_events.csv',
+                    demographics_path='patient_demographics.csv'):
+    """
+    Load a predictor ready to serve (used at startup and by hot reloads)
+    
+    Args:
+        model_path (str): Saved model package
+        serving_path (str): Serving feature matrix directory
+        reload_data (bool): Load and preprocess the CSV files
+        processed_data (DataFrame): Already preprocessed daily records to reuse
+        metrics (PipelineMetrics): Instrumentation sink to share with the live predictor
+        data_path, events_path, demographics_path (str): CSV locations for reload_data
+    """
+    predictor = HealthcareRiskPredictor(data_path, events_path, demographics_path, metrics=metrics)
+    predictor.load_model(model_path)
+    
+    if reload_data:
+        # Only the columns the loaded model reads are computed
+        predictor.load_data()
+        predictor.preprocess_data(serving=True)
+    elif processed_data is not None:
+        predictor.processed_data = processed_data
+    
+    if predictor.processed_data is not None:
+        # Rebuild rows for the (possibly new) model features; the new version is switched in atomically
+        predictor.build_serving_features(serving_path)
+    elif serving_path:
+        predictor.load_serving_features(serving_path)
+    return predictor
+
+
+def create_serving_app(model_path='trained_healthcare_model.pkl', serving_path='serving_features',
+                       risk_store_path='risk_history'):
+    """
+    Build the API for a serving worker process
+    
+    The worker loads the model and memory-maps the precomputed serving feature
+    matrix instead of loading and preprocessing the daily history, so all
+    workers share the same physical pages. Routes that need daily records
+    (e.g. /patient_details) are unavailable in this mode.
+    """
+    predictor = build_predictor(model_path, serving_path)
+    return HealthcareAPI(predictor, reload_config={
+        'model_path': model_path, 'serving_path': serving_path
+    }, risk_store=RiskScoreStore(risk_store_path)).app
+
+
 # Example usage and main execution
 def main():
     """Main execution function demonstrating the complete pipeline"""
@@ -1176,6 +2634,8 @@ def main():
     
     # Path to the saved model
     model_path = 'trained_healthcare_model.pkl'
+    serving_path = 'serving_features'
+    risk_store_path = 'risk_history'
 
     # Initialize the system
     predictor = HealthcareRiskPredictor(
@@ -1185,17 +2645,22 @@ def main():
     )
     
     try:
-        # Step 1 & 2 are always needed to have data ready for predictions
+        # Step 1 is always needed to have data ready for predictions
         predictor.load_data()
-        predictor.preprocess_data()
         
         # Check if a trained model already exists
         if os.path.exists(model_path):
             print(f"\nFound existing model at '{model_path}'. Loading model...")
             predictor.load_model(model_path)
             print("✓ Model loaded successfully.")
+            
+            # Step 2: compute only the features the loaded model uses
+            predictor.preprocess_data(serving=True)
         else:
             print(f"\nNo existing model found. Starting training process...")
+            # Step 2: full feature catalogue for training
+            predictor.preprocess_data()
+            
             # Step 3: Prepare ML dataset
             ml_dataset = predictor.prepare_ml_dataset(lookback_days=30)
             
@@ -1204,10 +2669,19 @@ def main():
             
             # Step 5: Save the newly trained model
             predictor.save_model(model_path)
+        
+        # Precompute latest feature rows; API workers map this file
+        predictor.build_serving_features(serving_path)
 
         # Step 6: Start the API server with the loaded or newly trained model
         print("\n🌐 Starting API server...")
-        api = HealthcareAPI(predictor)
+        api = HealthcareAPI(predictor, reload_config={
+            'model_path': model_path,
+            'serving_path': serving_path,
+            'data_path': predictor.data_path,
+            'events_path': predictor.events_path,
+            'demographics_path': predictor.demographics_path
+        }, risk_store=RiskScoreStore(risk_store_path))
         
         # Your API endpoints will be available here
         api.run(host='0.0.0.0', port=5001, debug=False)
@@ -0,0 +1,119 @@
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+INDEX_FILE = 'registry.json'
+
+
+def write_registry(directory, packages, report=None):
+    """
+    Write per-condition model packages and their index
+
+    Args:
+        directory (str): Registry directory
+        packages (dict): condition code -> model package dict (model, scaler,
+            feature_names, shap_explainer, condition)
+        report (dict): Training report stored alongside the index
+    """
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    for code, package in packages.items():
+        filename = f'condition-{int(code)}.pkl'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.pkl.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(package, f)
+        os.replace(tmp_path, os.path.join(directory, filename))
+        entries[str(int(code))] = {
+            'condition': package.get('condition'),
+            'file': filename,
+            'size_bytes': os.path.getsize(os.path.join(directory, filename)),
+        }
+
+    fd, tmp_index = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'conditions': entries, 'report': report or {}}, f, indent=2, default=str)
+    os.replace(tmp_index, os.path.join(directory, INDEX_FILE))
+
+
+class ModelRegistry:
+    """
+    Per-condition models loaded on first use, evicted LRU under a memory budget
+
+    Only the index is read up front. A condition's package is unpickled the
+    first time a patient with that condition is scored and kept in an LRU
+    cache; when the cached packages' sizes (their pickled size) exceed the
+    budget, the least recently used ones are dropped. Conditions without a
+    model are not in the index and route to the global model.
+    """
+
+    def __init__(self, directory, memory_budget_bytes=256 * 2 ** 20):
+        """
+        Args:
+            directory (str): Directory written by write_registry
+            memory_budget_bytes (int): Upper bound on cached package bytes
+                (the most recently used package is always kept)
+        """
+        self.directory = directory
+        self.memory_budget_bytes = memory_budget_bytes
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.entries = {int(code): entry for code, entry in index['conditions'].items()}
+        self.report = index.get('report', {})
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __contains__(self, code):
+        return code is not None and int(code) in self.entries
+
+    @property
+    def cached_bytes(self):
+        return sum(self.entries[code]['size_bytes'] for code in self._cache)
+
+    def get(self, code):
+        """
+        Model package for a condition code, or None if it has no dedicated model
+
+        Args:
+            code (int): primary_condition_encoded value
+        """
+        if code is None or int(code) not in self.entries:
+            return None
+        code = int(code)
+
+        with self._lock:
+            package = self._cache.get(code)
+            if package is not None:
+                self._cache.move_to_end(code)
+                self.stats['hits'] += 1
+                return package
+
+        # Unpickle outside the lock; a concurrent load of the same code is harmless
+        with open(os.path.join(self.directory, self.entries[code]['file']), 'rb') as f:
+            package = pickle.load(f)
+
+        with self._lock:
+            self.stats['misses'] += 1
+            self._cache[code] = package
+            self._cache.move_to_end(code)
+            while len(self._cache) > 1 and self.cached_bytes > self.memory_budget_bytes:
+                self._cache.popitem(last=False)
+                self.stats['evictions'] += 1
+        return package
+
+    def describe(self):
+        with self._lock:
+            loaded = [self.entries[code]['condition'] for code in self._cache]
+            cached_bytes = self.cached_bytes
+        return {
+            'conditions': {entry['condition']: entry['size_bytes'] for entry in self.entries.values()},
+            'loaded': loaded,
+            'cached_bytes': cached_bytes,
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'stats': dict(self.stats),
+        }
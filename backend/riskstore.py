@@ -0,0 +1,316 @@
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+RISK_CATEGORIES = ('Low', 'Medium', 'High')
+CATEGORY_THRESHOLDS = (0.3, 0.6)
+HISTOGRAM_EDGES = np.linspace(0.0, 1.0, 11)
+ROLLUP_FILE = 'rollups.parquet'
+
+
+def risk_category_codes(probabilities):
+    """Category code (index into RISK_CATEGORIES) for each probability"""
+    return np.digitize(np.asarray(probabilities, dtype=np.float64), CATEGORY_THRESHOLDS).astype(np.int8)
+
+
+def daily_rollup(day, scores):
+    """
+    Cohort distribution for one day
+
+    Args:
+        day (str): Partition date (YYYY-MM-DD)
+        scores (DataFrame): The day's scores, one row per patient
+
+    Returns:
+        dict: Patient count, mean and percentiles, category counts and a
+        10-bin probability histogram
+    """
+    prob = scores['risk_probability'].to_numpy(dtype=np.float64)
+    counts = np.bincount(scores['risk_category'].to_numpy(), minlength=len(RISK_CATEGORIES))
+    histogram, _ = np.histogram(prob, bins=HISTOGRAM_EDGES)
+    rollup = {
+        'date': day,
+        'patients': int(len(prob)),
+        'average_risk': float(prob.mean()) if len(prob) else 0.0,
+        'p50_risk': float(np.percentile(prob, 50)) if len(prob) else 0.0,
+        'p90_risk': float(np.percentile(prob, 90)) if len(prob) else 0.0,
+    }
+    for name, count in zip(RISK_CATEGORIES, counts):
+        rollup[f'{name.lower()}_count'] = int(count)
+    for i, count in enumerate(histogram):
+        rollup[f'hist_{i}'] = int(count)
+    return rollup
+
+
+class RiskScoreStore:
+    """
+    Append-only Parquet store of daily risk scores, partitioned by date
+
+    Each scoring run becomes one immutable file under ``date=YYYY-MM-DD/``
+    holding patient_id, risk_probability (float32), risk_category (int8 code)
+    and scored_at. A patient's score for a day is the one from the latest
+    run that day.
+
+    Once a later day is appended, earlier day partitions are compacted into
+    one ``month=YYYY-MM.parquet`` file per month, sorted by patient_id, so a
+    patient's history is a row-group-pruned read of one file per month
+    rather than one file per day.
+
+    Every append also recomputes that day's cohort rollup (category counts,
+    percentiles, histogram) from that day's scores only and keeps the small
+    rollup table in memory, so cohort trends never touch raw scores.
+
+    ``append_async`` does the same write on a background thread, for callers
+    on a request path.
+    """
+
+    def __init__(self, directory, row_group_size=16384):
+        """
+        Args:
+            directory (str): Store root (created if missing)
+            row_group_size (int): Parquet row group size of each run file
+        """
+        self.directory = directory
+        self.row_group_size = row_group_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # (day, run_id) of runs handed to append_async and not yet written
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self.last_error = None
+
+        rollup_path = os.path.join(directory, ROLLUP_FILE)
+        if os.path.exists(rollup_path):
+            self._rollups = pd.read_parquet(rollup_path)
+            self.updated_at = datetime.fromtimestamp(os.path.getmtime(rollup_path))
+        else:
+            self._rollups = pd.DataFrame(columns=['date'])
+            self.updated_at = None
+
+    @property
+    def version(self):
+        """Changes whenever a run is appended"""
+        return self.updated_at.isoformat() if self.updated_at is not None else 'empty'
+
+    def _partition_dir(self, day):
+        return os.path.join(self.directory, f'date={day}')
+
+    def _month_path(self, month):
+        return os.path.join(self.directory, f'month={month}.parquet')
+
+    def _listing(self, prefix):
+        return sorted(
+            name[len(prefix):].replace('.parquet', '')
+            for name in os.listdir(self.directory) if name.startswith(prefix)
+        )
+
+    def dates(self):
+        """Dates with at least one stored run, ascending"""
+        return self._rollups['date'].tolist() if len(self._rollups) else []
+
+    def has_run(self, day, run_id):
+        day = pd.Timestamp(day).strftime('%Y-%m-%d')
+        runs = self._rollups.loc[self._rollups['date'] == day, 'runs'] if len(self._rollups) else []
+        return any(run_id in existing.split(',') for existing in runs)
+
+    def append(self, scores, day=None, run_id=None):
+        """
+        Store one scoring run
+
+        Args:
+            scores (DataFrame | list): patient_id and risk_probability per
+                patient (risk_category is derived if absent)
+            day (str | date): Score date (today if None)
+            run_id (str): Run identifier (no commas); a run already stored
+                for this day under the same id is not written again
+
+        Returns:
+            bool: False if the run was already stored
+        """
+        day = pd.Timestamp(day if day is not None else pd.Timestamp.now()).strftime('%Y-%m-%d')
+        scored_at = pd.Timestamp.now()
+        run_id = run_id or scored_at.strftime('%H%M%S%f')
+
+        frame = pd.DataFrame(scores)
+        table = pd.DataFrame({
+            'patient_id': frame['patient_id'].astype(str).to_numpy(),
+            'risk_probability': frame['risk_probability'].to_numpy(dtype=np.float32),
+            'risk_category': risk_category_codes(frame['risk_probability']),
+            'scored_at': scored_at,
+        }).sort_values('patient_id', kind='stable')
+
+        with self._lock:
+            if self.has_run(day, run_id):
+                return False
+            partition = self._partition_dir(day)
+            os.makedirs(partition, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=partition, suffix='.tmp')
+            os.close(fd)
+            table.to_parquet(tmp_path, index=False, row_group_size=self.row_group_size)
+            os.replace(tmp_path, os.path.join(partition, f'run-{run_id}.parquet'))
+            self._update_rollup(day, run_id)
+            # Everything but the latest day is final enough to compact
+            self._compact(before=self.dates()[-1])
+        return True
+
+    def append_async(self, scores, day=None, run_id=None):
+        """
+        Store one scoring run on a background thread
+
+        Returns immediately. A run already stored, or still being written,
+        for the same day and id is skipped.
+
+        Args:
+            scores (DataFrame | list): As for ``append``
+            day (str | date): Score date (today if None)
+            run_id (str): Run identifier (no commas)
+
+        Returns:
+            bool: False if the run was skipped
+        """
+        day = pd.Timestamp(day if day is not None else pd.Timestamp.now()).strftime('%Y-%m-%d')
+        key = (day, run_id)
+        with self._pending_lock:
+            if key in self._pending or (run_id is not None and self.has_run(day, run_id)):
+                return False
+            self._pending.add(key)
+        self._thread = threading.Thread(target=self._run_append, args=(scores, day, run_id), daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_append(self, scores, day, run_id):
+        try:
+            self.append(scores, day=day, run_id=run_id)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Warning: Could not record risk scores: {str(e)}")
+        finally:
+            with self._pending_lock:
+                self._pending.discard((day, run_id))
+
+    def wait(self, timeout=None):
+        """Block until the latest background append (if any) finishes"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _read_partitions(self, days, patient_id=None):
+        """Raw rows of uncompacted day partitions, with a date column"""
+        filters = [('patient_id', '==', patient_id)] if patient_id is not None else None
+        frames = []
+        for day in days:
+            partition = self._partition_dir(day)
+            for name in sorted(os.listdir(partition)):
+                if name.endswith('.parquet'):
+                    frame = pd.read_parquet(os.path.join(partition, name), filters=filters)
+                    frames.append(frame.assign(date=day))
+        return frames
+
+    def _read_months(self, months, patient_id=None, day=None):
+        filters = []
+        if patient_id is not None:
+            filters.append(('patient_id', '==', patient_id))
+        if day is not None:
+            filters.append(('date', '==', day))
+        return [
+            pd.read_parquet(self._month_path(month), filters=filters or None)
+            for month in months if os.path.exists(self._month_path(month))
+        ]
+
+    @staticmethod
+    def _latest_per_day(frames):
+        if not frames:
+            return pd.DataFrame(columns=['patient_id', 'risk_probability', 'risk_category', 'scored_at', 'date'])
+        scores = pd.concat(frames, ignore_index=True)
+        # Latest run wins for a patient scored more than once that day
+        scores = scores.sort_values('scored_at', kind='stable').drop_duplicates(['patient_id', 'date'], keep='last')
+        return scores.sort_values(['patient_id', 'date'], kind='stable').reset_index(drop=True)
+
+    def _read_day(self, day, patient_id=None):
+        frames = self._read_months([day[:7]], patient_id=patient_id, day=day)
+        if os.path.isdir(self._partition_dir(day)):
+            frames += self._read_partitions([day], patient_id=patient_id)
+        return self._latest_per_day(frames)
+
+    def _compact(self, before):
+        """Merge day partitions older than ``before`` into their month files"""
+        pending = [day for day in self._listing('date=') if day < before]
+        for month in sorted({day[:7] for day in pending}):
+            days = [day for day in pending if day[:7] == month]
+            merged = self._latest_per_day(self._read_months([month]) + self._read_partitions(days))
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            merged.to_parquet(tmp_path, index=False, row_group_size=self.row_group_size)
+            os.replace(tmp_path, self._month_path(month))
+            for day in days:
+                shutil.rmtree(self._partition_dir(day))
+
+    def _update_rollup(self, day, run_id):
+        previous = self._rollups[self._rollups['date'] == day]
+        runs = previous['runs'].iloc[0].split(',') if len(previous) else []
+        rollup = pd.DataFrame([dict(daily_rollup(day, self._read_day(day)), runs=','.join(runs + [run_id]))])
+        rollups = self._rollups[self._rollups['date'] != day]
+        rollups = pd.concat([rollups, rollup], ignore_index=True) if len(rollups) else rollup
+        rollups = rollups.sort_values('date', kind='stable').reset_index(drop=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        rollups.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.directory, ROLLUP_FILE))
+        self._rollups = rollups
+        self.updated_at = datetime.now()
+
+    def _date_range(self, dates, start=None, end=None):
+        start = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+        end = pd.Timestamp(end).strftime('%Y-%m-%d') if end is not None else None
+        return [day for day in dates if (start is None or day >= start) and (end is None or day <= end)]
+
+    def patient_history(self, patient_id, start=None, end=None):
+        """
+        One patient's daily scores
+
+        Args:
+            patient_id (str): Patient to read
+            start, end (str | date): Inclusive date bounds (open if None)
+
+        Returns:
+            list: {date, risk_probability, risk_category} per scored day
+        """
+        patient_id = str(patient_id)
+        days = self._date_range(self.dates(), start, end)
+        if not days:
+            return []
+        months = [month for month in self._listing('month=') if days[0][:7] <= month <= days[-1][:7]]
+        partitions = [day for day in self._listing('date=') if days[0] <= day <= days[-1]]
+
+        rows = self._latest_per_day(
+            self._read_months(months, patient_id=patient_id) +
+            self._read_partitions(partitions, patient_id=patient_id)
+        )
+        rows = rows[rows['date'].isin(days)]
+        return [
+            {'date': day, 'risk_probability': float(prob), 'risk_category': RISK_CATEGORIES[int(code)]}
+            for day, prob, code in zip(rows['date'], rows['risk_probability'], rows['risk_category'])
+        ]
+
+    def cohort_history(self, start=None, end=None):
+        """
+        Daily cohort rollups between two dates
+
+        Returns:
+            list: daily_rollup dicts, ascending by date
+        """
+        rollups = self._rollups
+        if rollups.empty:
+            return []
+        days = set(self._date_range(rollups['date'].tolist(), start, end))
+        return rollups[rollups['date'].isin(days)].drop(columns=['runs']).to_dict('records')
@@ -0,0 +1,243 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+
+_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+}
+
+# Declarative clinical recommendation rules, evaluated in order.
+# Rules sharing a `group` are mutually exclusive: only the first matching
+# rule of the group fires (the elif chains of the original implementation).
+RECOMMENDATION_RULES = [
+    {
+        'id': 'high_risk_assessment',
+        'feature': 'risk_probability', 'op': '>', 'threshold': 0.6,
+        'priority': 'high',
+        'action': 'Schedule immediate clinical assessment',
+        'rationale': 'High risk of deterioration in next 90 days',
+        'timeframe': 'within 48 hours'
+    },
+    {
+        'id': 'glucose_medication_review', 'group': 'glucose',
+        'feature': 'glucose_mg_dl_latest', 'op': '>', 'threshold': 180,
+        'priority': 'high',
+        'action': 'Review and adjust diabetes medications',
+        'rationale': 'Recent glucose level {value:.0f} mg/dL is above target',
+        'timeframe': 'within 1 week'
+    },
+    {
+        'id': 'glucose_monitoring', 'group': 'glucose',
+        'feature': 'glucose_mg_dl_latest', 'op': '>', 'threshold': 150,
+        'priority': 'medium',
+        'action': 'Increase glucose monitoring frequency',
+        'rationale': 'Glucose level {value:.0f} mg/dL trending above target',
+        'timeframe': 'within 2 weeks'
+    },
+    {
+        'id': 'adherence_counseling', 'group': 'adherence',
+        'feature': 'adherence_avg_latest', 'op': '<', 'threshold': 0.7,
+        'priority': 'high',
+        'action': 'Medication adherence counseling and support',
+        'rationale': 'Poor medication adherence ({value:.1%})',
+        'timeframe': 'within 1 week'
+    },
+    {
+        'id': 'adherence_barriers', 'group': 'adherence',
+        'feature': 'adherence_avg_latest', 'op': '<', 'threshold': 0.8,
+        'priority': 'medium',
+        'action': 'Review medication barriers and simplify regimen if possible',
+        'rationale': 'Suboptimal adherence ({value:.1%})',
+        'timeframe': 'within 2 weeks'
+    },
+    {
+        'id': 'bp_urgent', 'group': 'bp',
+        'feature': 'systolic_bp_latest', 'op': '>', 'threshold': 160,
+        'priority': 'high',
+        'action': 'Urgent blood pressure management',
+        'rationale': 'Systolic BP {value:.0f} mmHg requires immediate attention',
+        'timeframe': 'within 24 hours'
+    },
+    {
+        'id': 'bp_optimize', 'group': 'bp',
+        'feature': 'systolic_bp_latest', 'op': '>', 'threshold': 140,
+        'priority': 'medium',
+        'action': 'Optimize antihypertensive therapy',
+        'rationale': 'BP {value:.0f} mmHg above target',
+        'timeframe': 'within 1 week'
+    },
+    {
+        'id': 'rapid_weight_gain',
+        'feature': 'weight_kg_slope', 'op': '>', 'threshold': 0.3,  # >0.3 kg/day trend
+        'priority': 'high',
+        'action': 'Evaluate for fluid retention and heart failure',
+        'rationale': 'Rapid weight gain detected',
+        'timeframe': 'within 48 hours'
+    },
+    {
+        'id': 'hba1c_intensify',
+        'feature': 'hba1c_latest', 'op': '>', 'threshold': 8.0,
+        'priority': 'medium',
+        'action': 'Intensify diabetes management plan',
+        'rationale': 'HbA1c {value:.1f}% above target',
+        'timeframe': 'within 1 week'
+    },
+    {
+        'id': 'lifestyle_review',
+        'feature': 'risk_probability', 'op': '>', 'threshold': 0.4,
+        'priority': 'medium',
+        'action': 'Reinforce lifestyle modifications (diet, exercise, stress management)',
+        'rationale': 'Elevated risk profile warrants comprehensive lifestyle review',
+        'timeframe': 'within 2 weeks'
+    },
+]
+
+# Rule-based risk factor explanations used when SHAP is unavailable
+EXPLANATION_RULES = [
+    {'id': 'glucose_high', 'feature': 'glucose_mg_dl_latest', 'op': '>', 'threshold': 200,
+     'factor': 'Recent glucose levels', 'impact': 'increases risk', 'magnitude': 0.8},
+    {'id': 'bp_high', 'feature': 'systolic_bp_latest', 'op': '>', 'threshold': 150,
+     'factor': 'Blood pressure control', 'impact': 'increases risk', 'magnitude': 0.6},
+    {'id': 'adherence_low', 'feature': 'adherence_avg_latest', 'op': '<', 'threshold': 0.8,
+     'factor': 'Medication adherence', 'impact': 'increases risk', 'magnitude': 0.9},
+    {'id': 'age_high', 'feature': 'age', 'op': '>', 'threshold': 70,
+     'factor': 'Age', 'impact': 'increases risk', 'magnitude': 0.4},
+]
+
+_PRIORITY_ORDER = {'high': 0}
+
+
+def evaluate_rules(features, rules):
+    """
+    Evaluate every rule against every row of a feature matrix
+
+    Args:
+        features (DataFrame): One row per patient
+        rules (list): Rule table (see RECOMMENDATION_RULES)
+
+    Returns:
+        ndarray: Boolean mask of shape (n_rows, n_rules)
+    """
+    masks = np.zeros((len(features), len(rules)), dtype=bool)
+    group_taken = {}
+
+    for j, rule in enumerate(rules):
+        feature = rule['feature']
+        if feature not in features.columns:
+            continue
+        values = pd.to_numeric(features[feature], errors='coerce').to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            mask = _OPERATORS[rule['op']](values, rule['threshold'])
+
+        group = rule.get('group')
+        if group is not None:
+            taken = group_taken.get(group)
+            if taken is not None:
+                mask &= ~taken
+                group_taken[group] = taken | mask
+            else:
+                group_taken[group] = mask.copy()
+        masks[:, j] = mask
+
+    return masks
+
+
+def _rule_value(features, row, rule):
+    if rule['feature'] not in features.columns:
+        return None
+    return features[rule['feature']].iat[row]
+
+
+def recommendations_from_masks(features, masks, rules=RECOMMENDATION_RULES):
+    """
+    Build per-patient recommendation lists from an evaluated mask matrix
+
+    Returns:
+        list: One list of recommendation dicts per row of ``features``,
+        high priority first (stable within priority)
+    """
+    results = []
+    for row in range(len(features)):
+        recommendations = []
+        for j in np.flatnonzero(masks[row]):
+            rule = rules[j]
+            value = _rule_value(features, row, rule)
+            recommendations.append({
+                'priority': rule['priority'],
+                'action': rule['action'],
+                'rationale': rule['rationale'].format(value=value),
+                'timeframe': rule['timeframe']
+            })
+        recommendations.sort(key=lambda x: _PRIORITY_ORDER.get(x['priority'], 1))
+        results.append(recommendations)
+    return results
+
+
+def explanations_from_masks(features, masks, rules=EXPLANATION_RULES, top_k=5):
+    """Build per-patient rule-based explanation lists, largest magnitude first"""
+    results = []
+    for row in range(len(features)):
+        explanations = []
+        for j in np.flatnonzero(masks[row]):
+            rule = rules[j]
+            explanations.append({
+                'factor': rule['factor'],
+                'impact': rule['impact'],
+                'magnitude': rule['magnitude'],
+                'value': _rule_value(features, row, rule)
+            })
+        explanations.sort(key=lambda x: x['magnitude'], reverse=True)
+        results.append(explanations[:top_k])
+    return results
+
+
+def build_worklists(patient_ids, masks, rules=RECOMMENDATION_RULES):
+    """
+    Collect the patients flagged by each rule into cohort worklists
+
+    Args:
+        patient_ids (array-like): Patient identifier for each mask row
+        masks (ndarray): Output of ``evaluate_rules``
+        rules (list): Rule table the masks were evaluated with
+
+    Returns:
+        dict: ``by_rule`` (rule id -> action/priority/timeframe/patients) and
+        ``by_timeframe`` (timeframe -> sorted unique patient ids)
+    """
+    patient_ids = np.asarray(patient_ids)
+    by_rule = {}
+    timeframe_masks = {}
+
+    for j, rule in enumerate(rules):
+        mask = masks[:, j]
+        by_rule[rule['id']] = {
+            'action': rule['action'],
+            'priority': rule['priority'],
+            'timeframe': rule['timeframe'],
+            'patients': patient_ids[mask].tolist(),
+            'count': int(mask.sum())
+        }
+        tf = rule['timeframe']
+        timeframe_masks[tf] = timeframe_masks[tf] | mask if tf in timeframe_masks else mask.copy()
+
+    by_timeframe = {tf: np.unique(patient_ids[mask]).tolist() for tf, mask in timeframe_masks.items()}
+    return {'by_rule': by_rule, 'by_timeframe': by_timeframe}
+
+
+def trend_features(trends):
+    """Flatten a trends dict into signed slope features usable by the rule table"""
+    features = {}
+    for key, col in (('glucose_trend', 'glucose_mg_dl'), ('weight_trend', 'weight_kg'),
+                     ('bp_trend', 'systolic_bp')):
+        trend = trends.get(key)
+        if trend and 'magnitude' in trend:
+            sign = -1.0 if trend.get('direction') == 'decreasing' else 1.0
+            # 'stable' trends are below every rule threshold, so their sign is irrelevant
+            features[f'{col}_slope'] = sign * trend['magnitude']
+    return features
@@ -0,0 +1,149 @@
+import pickle
+import time
+
+import numpy as np
+import shap
+
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def build_explainer(name, model, background):
+    """SHAP explainer matching the one predict_patient_risk uses for this candidate"""
+    if name == 'Logistic Regression':
+        return shap.LinearExplainer(model, background)
+    return shap.TreeExplainer(model)
+
+
+def positive_class_shap(explainer, X):
+    """
+    SHAP values of the positive class as an (n_rows, n_features) array
+
+    Explainers report binary classifiers differently: a list with one array
+    per class, an (n, features, classes) array (tree ensembles such as the
+    random forest) or a plain (n, features) array (LightGBM, linear).
+    """
+    shap_values = explainer.shap_values(X)
+    if isinstance(shap_values, list):
+        shap_values = shap_values[1]
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        shap_values = shap_values[:, :, 1]
+    return shap_values.reshape(len(X), -1)
+
+
+def benchmark_candidate(name, model, X_eval, background, repeats=20, batch_size=1000):
+    """
+    Measure what serving a candidate would cost
+
+    Args:
+        name (str): Candidate name
+        model (estimator): Fitted model
+        X_eval (array-like): Rows in the model's input space (scaled for LR)
+        background (array-like): Background data for linear SHAP explainers
+        repeats (int): Timed repetitions per measurement (median is reported)
+        batch_size (int): Rows per batch-prediction call
+
+    Returns:
+        tuple: (serving stats dict, SHAP explainer or None)
+    """
+    X_eval = np.asarray(X_eval, dtype=np.float64)
+    single = X_eval[:1]
+    reps = max(1, -(-batch_size // len(X_eval)))
+    batch = np.tile(X_eval, (reps, 1))[:batch_size]
+
+    stats = {
+        'predict_single_ms': _median_ms(lambda: model.predict_proba(single), repeats),
+        'predict_batch_ms': _median_ms(lambda: model.predict_proba(batch), max(3, repeats // 5)),
+        'batch_size': int(len(batch)),
+        'model_size_bytes': len(pickle.dumps(model)),
+    }
+
+    explainer = None
+    try:
+        explainer = build_explainer(name, model, background)
+        stats['shap_single_ms'] = _median_ms(
+            lambda: explainer.shap_values(single.astype(np.float32)), max(3, repeats // 4)
+        )
+    except Exception as e:
+        print(f"  ⚠️ SHAP benchmark failed for {name}: {e}")
+        stats['shap_single_ms'] = None
+
+    # Cost of one /predict call: model score plus explanation
+    stats['serving_ms'] = stats['predict_single_ms'] + (stats['shap_single_ms'] or 0.0)
+    return stats, explainer
+
+
+def pareto_front(results):
+    """
+    Candidates not dominated on (higher AUC, lower serving latency)
+
+    Args:
+        results (dict): name -> {'auc': float, 'serving': {'serving_ms': float}}
+
+    Returns:
+        list: Names on the front, fastest first
+    """
+    names = list(results)
+    front = []
+    for a in names:
+        auc_a, ms_a = results[a]['auc'], results[a]['serving']['serving_ms']
+        dominated = any(
+            results[b]['auc'] >= auc_a and results[b]['serving']['serving_ms'] <= ms_a and
+            (results[b]['auc'] > auc_a or results[b]['serving']['serving_ms'] < ms_a)
+            for b in names if b != a
+        )
+        if not dominated:
+            front.append(a)
+    return sorted(front, key=lambda n: results[n]['serving']['serving_ms'])
+
+
+def select_model(results, policy='auc', latency_budget_ms=None):
+    """
+    Pick the model to serve
+
+    Args:
+        results (dict): name -> {'auc': float, 'serving': {...}}
+        policy (str): 'auc' (best AUC), 'latency_budget' (best AUC whose
+            serving_ms is within the budget) or 'pareto' (best AUC on the
+            Pareto front, within the budget if one is given)
+        latency_budget_ms (float): Per-request serving budget in milliseconds
+
+    Returns:
+        tuple: (selected name, selection report dict)
+    """
+    if policy not in ('auc', 'latency_budget', 'pareto'):
+        raise ValueError(f"Unknown selection policy: {policy}")
+    if policy == 'latency_budget' and latency_budget_ms is None:
+        raise ValueError("latency_budget policy requires latency_budget_ms")
+
+    front = pareto_front(results)
+    pool = front if policy == 'pareto' else list(results)
+    note = None
+
+    if policy != 'auc' and latency_budget_ms is not None:
+        within = [n for n in pool if results[n]['serving']['serving_ms'] <= latency_budget_ms]
+        if within:
+            pool = within
+        else:
+            # Nothing fits: serve the fastest model rather than blow the budget
+            fastest = min(pool, key=lambda n: results[n]['serving']['serving_ms'])
+            pool = [fastest]
+            note = f"No candidate within {latency_budget_ms} ms; selected the fastest"
+
+    selected = max(pool, key=lambda n: results[n]['auc'])
+    report = {
+        'policy': policy,
+        'latency_budget_ms': latency_budget_ms,
+        'selected': selected,
+        'pareto_front': front,
+    }
+    if note:
+        report['note'] = note
+    return selected, report
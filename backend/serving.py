@@ -0,0 +1,219 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+MATRIX_FILE = 'features.npy'
+INDEX_FILE = 'index.json'
+CURRENT_FILE = 'CURRENT'
+VERSION_PREFIX = 'v-'
+
+
+class ServingFeatureMatrix:
+    """
+    Latest feature row per patient as a patients x columns float32 matrix
+
+    The first ``n_model_features`` columns are the model inputs in
+    ``feature_names`` order; the remaining columns carry serving-only values
+    (rule inputs, trend statistics). Saved as a plain ``.npy`` file so any
+    number of worker processes can memory-map it and share the same
+    physical pages.
+
+    A matrix is never written in place once built: ``with_rows`` returns a
+    new matrix that shares the base array and keeps changed rows in a small
+    per-row overlay, so snapshots holding the previous matrix are unaffected
+    and the mapped pages stay shared. ``generation`` counts those updates.
+
+    ``source`` identifies the inputs the rows were built from (daily
+    records, model and lookback), so rebuilding or re-mapping the same rows
+    keeps the same identity.
+    """
+
+    def __init__(self, matrix, patient_ids, columns, n_model_features, created_at=None,
+                 source=None, generation=0):
+        self.matrix = matrix
+        self.patient_ids = list(patient_ids)
+        self.columns = list(columns)
+        self.n_model_features = n_model_features
+        self.created_at = created_at or datetime.now().isoformat()
+        self._row_index = {pid: i for i, pid in enumerate(self.patient_ids)}
+        self._column_index = {col: i for i, col in enumerate(self.columns)}
+        self._overlay = {}
+        self.source = source
+        self.generation = generation
+
+    @classmethod
+    def from_frame(cls, frame, feature_names, source=None):
+        """
+        Build from a patient-indexed frame
+
+        Args:
+            frame (DataFrame): One row per patient, indexed by patient_id
+            feature_names (list): Model features, placed first (missing ones filled with 0)
+            source (str): Identity of the inputs the frame was built from
+        """
+        extra_cols = [col for col in frame.columns if col not in set(feature_names)]
+        model_part = frame.reindex(columns=feature_names, fill_value=0)
+        ordered = pd.concat([model_part, frame[extra_cols]], axis=1)
+        matrix = np.ascontiguousarray(ordered.to_numpy(dtype=np.float32, na_value=np.nan))
+        return cls(matrix, frame.index.astype(str), ordered.columns, len(feature_names), source=source)
+
+    @property
+    def feature_names(self):
+        return self.columns[:self.n_model_features]
+
+    def __len__(self):
+        return len(self.patient_ids)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._row_index
+
+    def row(self, patient_id):
+        """Full row for one patient (read-only; a view into the mapped file unless updated), or None"""
+        i = self._row_index.get(patient_id)
+        if i is None:
+            return None
+        return self._overlay[i] if i in self._overlay else self.matrix[i]
+
+    def _patched(self, block, positions):
+        """Copy of ``block`` with overlaid rows substituted (positions: matrix row of each block row)"""
+        for k, i in enumerate(positions):
+            if i in self._overlay:
+                block[k] = self._overlay[i]
+        return block
+
+    def rows(self, patient_ids):
+        """Full rows (n, n_columns) for a list of patients"""
+        positions = [self._row_index[pid] for pid in patient_ids]
+        return self._patched(self.matrix[positions], positions)
+
+    def model_rows(self, patient_ids):
+        """Model-input block (n, n_model_features) for a list of patients"""
+        return self.rows(patient_ids)[:, :self.n_model_features]
+
+    def block(self, start, stop):
+        """Copy of the consecutive rows [start, stop)"""
+        block = np.array(self.matrix[start:stop])
+        for i, row in self._overlay.items():
+            if start <= i < stop:
+                block[i - start] = row
+        return block
+
+    def row_dict(self, patient_id):
+        """Column name -> value for one patient"""
+        row = self.row(patient_id)
+        if row is None:
+            return None
+        return dict(zip(self.columns, row.tolist()))
+
+    def with_rows(self, updates):
+        """
+        New matrix with some columns of some rows overwritten
+
+        This matrix is left unchanged. The result shares the base array; the
+        changed rows (with those of earlier calls) are held in its overlay,
+        so a call costs the rows updated so far rather than a copy of the
+        whole matrix.
+
+        Args:
+            updates (dict): patient_id -> {column name: value}; unknown
+                patients and columns are ignored
+
+        Returns:
+            ServingFeatureMatrix: The updated matrix, one generation later
+        """
+        overlay = dict(self._overlay)
+        for patient_id, values in updates.items():
+            i = self._row_index.get(patient_id)
+            if i is None:
+                continue
+            row = np.array(overlay[i] if i in overlay else self.matrix[i], dtype=np.float32)
+            for col, value in values.items():
+                j = self._column_index.get(col)
+                if j is not None:
+                    row[j] = value
+            row.flags.writeable = False
+            overlay[i] = row
+
+        # Shallow copy: the base array and the id/column indexes are shared
+        matrix = copy.copy(self)
+        matrix._overlay = overlay
+        matrix.generation = self.generation + 1
+        return matrix
+
+    def column(self, name):
+        j = self._column_index[name]
+        column = np.array(self.matrix[:, j])
+        for i, row in self._overlay.items():
+            column[i] = row[j]
+        return column
+
+    def save(self, path):
+        """
+        Write the matrix and index to a directory
+
+        Each save writes a new ``v-*`` version directory holding both files,
+        then switches the ``CURRENT`` pointer file to it with one rename, so
+        a reader always sees a matrix with its own index. The previous
+        version is kept for readers that resolved the pointer just before
+        the switch; older ones are removed.
+        """
+        os.makedirs(path, exist_ok=True)
+        version = f"{VERSION_PREFIX}{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        version_dir = os.path.join(path, version)
+        os.makedirs(version_dir)
+
+        out = np.lib.format.open_memmap(os.path.join(version_dir, MATRIX_FILE), mode='w+',
+                                        dtype=np.float32, shape=self.matrix.shape)
+        out[:] = self.matrix
+        for i, row in self._overlay.items():
+            out[i] = row
+        out.flush()
+        del out
+
+        with open(os.path.join(version_dir, INDEX_FILE), 'w') as f:
+            json.dump({
+                'patient_ids': self.patient_ids,
+                'columns': self.columns,
+                'n_model_features': self.n_model_features,
+                'created_at': self.created_at,
+                'source': self.source,
+                'generation': self.generation,
+            }, f)
+
+        previous = _current_version(path)
+        fd, tmp_pointer = tempfile.mkstemp(dir=path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(path, CURRENT_FILE))
+
+        for name in os.listdir(path):
+            if name.startswith(VERSION_PREFIX) and name not in (version, previous):
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Map (or read) the current matrix saved with ``save``"""
+        version = _current_version(path)
+        directory = os.path.join(path, version) if version is not None else path
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        matrix = np.load(os.path.join(directory, MATRIX_FILE), mmap_mode='r' if mmap else None)
+        return cls(matrix, index['patient_ids'], index['columns'], index['n_model_features'],
+                   index.get('created_at'), index.get('source'), index.get('generation', 0))
+
+
+def _current_version(path):
+    """Version directory named by the pointer file (None for a pre-versioning layout)"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
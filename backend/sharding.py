@@ -0,0 +1,220 @@
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def shard_ids(patient_ids, n_shards):
+    """
+    Stable hash partitioning of patient ids
+
+    Uses CRC32 rather than ``hash()`` so shard assignment is identical across
+    processes and runs (Python string hashing is randomized per process).
+    """
+    unique, inverse = np.unique(np.asarray(patient_ids, dtype=str), return_inverse=True)
+    buckets = np.fromiter((zlib.crc32(pid.encode('utf-8')) % n_shards for pid in unique),
+                          dtype=np.int64, count=len(unique))
+    return buckets[inverse]
+
+
+def partition_frame(df, n_shards):
+    """Split a frame into ``n_shards`` patient-disjoint shards, preserving row order"""
+    ids = shard_ids(df['patient_id'], n_shards)
+    return [(shard, df[ids == shard]) for shard in range(n_shards) if (ids == shard).any()]
+
+
+def partition_csv(csv_path, out_dir, n_shards, chunksize=250_000):
+    """
+    Stream a CSV into per-shard CSV partitions without loading it whole
+
+    The global row number is kept as the first column so shard outputs can
+    be restored to the source order.
+
+    Returns:
+        list: (shard id, partition path) for every non-empty shard
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Partitions are appended to chunk by chunk, so drop any left by an earlier run
+    for name in os.listdir(out_dir):
+        if name.startswith('raw-') and name.endswith('.csv'):
+            os.remove(os.path.join(out_dir, name))
+    paths = {shard: os.path.join(out_dir, f'raw-{shard:05d}.csv') for shard in range(n_shards)}
+    written = set()
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        ids = shard_ids(chunk['patient_id'], n_shards)
+        for shard in np.unique(ids):
+            part = chunk[ids == shard]
+            part.to_csv(paths[shard], mode='a', header=shard not in written, index=True)
+            written.add(shard)
+
+    return [(shard, paths[shard]) for shard in sorted(written)]
+
+
+def read_raw_partition(path):
+    """Read a partition written by ``partition_csv``"""
+    df = pd.read_csv(path, index_col=0)
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+# ----------------------------------------------------------------------
+# Pairwise-complete Pearson correlation from mergeable per-shard moments
+# ----------------------------------------------------------------------
+def correlation_moments(df):
+    """
+    Per-pair co-moments of the numeric columns of one shard
+
+    For every column pair the statistics cover only rows where both values
+    are present, matching ``DataFrame.corr()``'s pairwise-complete handling.
+    Values are centered on the shard's column means before accumulating to
+    limit cancellation error.
+    """
+    numeric = df.select_dtypes(include=[np.number])
+    columns = list(numeric.columns)
+    X = numeric.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(X)
+    M = mask.astype(np.float64)
+
+    with np.errstate(invalid='ignore'):
+        shift = np.nanmean(X, axis=0) if len(X) else np.zeros(X.shape[1])
+    shift = np.nan_to_num(shift)
+    Xc = np.where(mask, X - shift, 0.0)
+
+    n = M.T @ M                       # n[i, j]: rows where both i and j present
+    sx = Xc.T @ M                     # sx[i, j]: sum of x_i over those rows
+    sxx = (Xc * Xc).T @ M             # sxx[i, j]: sum of x_i^2 over those rows
+    sxy = Xc.T @ Xc                   # sxy[i, j]: sum of x_i * x_j
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sx / n                 # mean of x_i over the (i, j) rows
+        m2 = sxx - sx * mean          # centered sum of squares of x_i over (i, j) rows
+        cov = sxy - sx * sx.T / n
+
+    mean = np.nan_to_num(mean) + shift[:, None]
+    return {
+        'columns': columns,
+        'n': n,
+        'mean': mean,
+        'm2': np.nan_to_num(m2),
+        'cov': np.nan_to_num(cov),
+    }
+
+
+def _align_moments(m, columns):
+    index = {col: i for i, col in enumerate(m['columns'])}
+    pos = np.array([index.get(col, -1) for col in columns])
+    present = pos >= 0
+    out = {'columns': columns}
+    for key in ('n', 'mean', 'm2', 'cov'):
+        arr = np.zeros((len(columns), len(columns)))
+        sel = np.ix_(present, present)
+        arr[sel] = m[key][np.ix_(pos[present], pos[present])]
+        out[key] = arr
+    return out
+
+
+def merge_correlation_moments(a, b):
+    """Combine two shards' co-moments (Chan et al. parallel update, per pair)"""
+    if a is None:
+        return b
+    columns = list(a['columns']) + [col for col in b['columns'] if col not in set(a['columns'])]
+    a = _align_moments(a, columns)
+    b = _align_moments(b, columns)
+
+    n = a['n'] + b['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(n > 0, a['n'] * b['n'] / n, 0.0)
+        frac_b = np.where(n > 0, b['n'] / n, 0.0)
+    delta = b['mean'] - a['mean']
+    return {
+        'columns': columns,
+        'n': n,
+        'mean': a['mean'] + delta * frac_b,
+        'm2': a['m2'] + b['m2'] + delta * delta * weight,
+        'cov': a['cov'] + b['cov'] + delta * delta.T * weight,
+    }
+
+
+def correlation_from_moments(m, rel_tol=1e-12):
+    """Pearson correlation matrix (DataFrame) from merged co-moments"""
+    var_i = m['m2']
+    var_j = m['m2'].T
+    # Treat numerically-zero variance as constant, like pandas does
+    scale_i = np.maximum(m['mean'] ** 2, 1.0) * np.maximum(m['n'], 1.0) * rel_tol
+    constant = (var_i <= scale_i) | (var_j <= scale_i.T) | (m['n'] < 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = m['cov'] / np.sqrt(var_i * var_j)
+    corr = np.clip(np.where(constant, np.nan, corr), -1.0, 1.0)
+    return pd.DataFrame(corr, index=m['columns'], columns=m['columns'])
+
+
+# ----------------------------------------------------------------------
+# Workers and feature store
+# ----------------------------------------------------------------------
+def process_shard(fn, shard_id, source, fn_args=(), output_path=None):
+    """
+    Run ``fn(shard_df, *fn_args)`` for one shard inside a worker process
+
+    Args:
+        fn (callable): Picklable per-patient pipeline
+        shard_id (int): Shard number
+        source (DataFrame | str): Shard frame, or path of a raw CSV partition
+        fn_args (tuple): Extra arguments for ``fn`` (centrally fitted state)
+        output_path (str): If given, write the result as Parquet and return only its path
+
+    Returns:
+        dict: shard_id, result (frame or path), correlation moments, seconds
+    """
+    start = time.perf_counter()
+    df = read_raw_partition(source) if isinstance(source, str) else source
+    result = fn(df, *fn_args)
+    moments = correlation_moments(result) if output_path is not None else None
+
+    if output_path is not None:
+        result.to_parquet(output_path, index=True)
+        result = output_path
+
+    return {
+        'shard_id': shard_id,
+        'result': result,
+        'moments': moments,
+        'rows': len(df),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def write_manifest(store_dir, shard_paths, dropped_columns, extra=None):
+    manifest = {
+        'shards': [os.path.basename(path) for path in shard_paths],
+        'dropped_columns': list(dropped_columns),
+        'created_at': pd.Timestamp.now().isoformat(),
+    }
+    manifest.update(extra or {})
+    with open(os.path.join(store_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_feature_store(store_dir, columns=None):
+    """
+    Load a sharded feature store as one frame, restored to source row order
+
+    Columns pruned by the central correlation step are skipped at read time.
+    """
+    with open(os.path.join(store_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    dropped = set(manifest['dropped_columns'])
+    frames = []
+    for name in manifest['shards']:
+        shard = pd.read_parquet(os.path.join(store_dir, name), columns=columns)
+        frames.append(shard.drop(columns=[col for col in shard.columns if col in dropped]))
+
+    return pd.concat(frames).sort_index()
@@ -0,0 +1,142 @@
+import copy
+import warnings
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+
+class SimilarPatientIndex:
+    """
+    Nearest-neighbour index over standardized patient feature vectors
+
+    Vectors are the model-input part of the serving rows, standardized with
+    the column means/stds seen at build time (missing values sit at the
+    mean). A BallTree holds the vectors from the last build; ``with_rows``
+    returns a new index that shares the tree and keeps the changed vectors
+    in a small brute-force delta set (their tree entries are skipped), so an
+    update costs the rows changed rather than a rebuild and queries merge
+    both. An index is never changed once built, so a snapshot holding it
+    keeps answering from the same vectors. When the delta grows past
+    ``rebuild_fraction`` of the tree, the new index gets a rebuilt tree.
+    """
+
+    def __init__(self, rows, patient_ids, leaf_size=40, rebuild_fraction=0.1):
+        """
+        Args:
+            rows (ndarray): Model-input rows, one per patient
+            patient_ids (list): Patient identifier of each row
+            leaf_size (int): BallTree leaf size
+            rebuild_fraction (float): Rebuild once updated rows exceed this
+                fraction of the indexed rows
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        with warnings.catch_warnings():
+            # All-missing columns give NaN statistics; they are neutralized below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(rows, axis=0)
+            std = np.nanstd(rows, axis=0)
+        self.mean = np.where(np.isfinite(mean), mean, 0.0)
+        self.scale = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+
+        self.stats = {'updates': 0, 'rebuilds': 0}
+        self._build(list(patient_ids), self.transform(rows))
+
+    @classmethod
+    def from_serving(cls, serving_features, **kwargs):
+        """Index the model-input columns of a ServingFeatureMatrix"""
+        rows = serving_features.block(0, len(serving_features))[:, :serving_features.n_model_features]
+        return cls(rows, serving_features.patient_ids, **kwargs)
+
+    def transform(self, rows):
+        """Standardize raw model-input rows (missing values map to the mean)"""
+        scaled = (np.asarray(rows, dtype=np.float64) - self.mean) / self.scale
+        return np.nan_to_num(scaled, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def __len__(self):
+        return len(self._tree_ids) + sum(pid not in self._tree_pos for pid in self._delta)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._delta or patient_id in self._tree_pos
+
+    def _vector(self, patient_id):
+        if patient_id in self._delta:
+            return self._delta[patient_id]
+        return self._tree_matrix[self._tree_pos[patient_id]]
+
+    def _build(self, patient_ids, matrix):
+        self._tree_ids = patient_ids
+        self._tree_pos = {pid: i for i, pid in enumerate(patient_ids)}
+        self._tree_matrix = matrix
+        self._tree = BallTree(matrix, leaf_size=self.leaf_size) if len(patient_ids) else None
+        self._delta = {}
+
+    def with_rows(self, updates):
+        """
+        New index with some patients' vectors replaced (or added)
+
+        This index is left unchanged.
+
+        Args:
+            updates (dict): patient_id -> raw model-input row
+
+        Returns:
+            SimilarPatientIndex: The updated index
+        """
+        index = copy.copy(self)
+        index._delta = dict(self._delta)
+        if updates:
+            ids = list(updates)
+            vectors = self.transform(np.array([np.asarray(updates[pid], dtype=np.float64) for pid in ids]))
+            index._delta.update(zip(ids, vectors))
+        index.stats = dict(self.stats, updates=self.stats['updates'] + len(updates))
+
+        if len(index._delta) > self.rebuild_fraction * max(len(self._tree_ids), 1):
+            added = [pid for pid in index._delta if pid not in self._tree_pos]
+            matrix = np.vstack([self._tree_matrix] + [index._delta[pid][None, :] for pid in added])
+            for pid, vector in index._delta.items():
+                if pid in self._tree_pos:
+                    matrix[self._tree_pos[pid]] = vector
+            index._build(self._tree_ids + added, matrix)
+            index.stats['rebuilds'] += 1
+        return index
+
+    def query(self, patient_id, k=5):
+        """
+        The k patients closest to a patient (the patient itself excluded)
+
+        Returns:
+            list: (patient_id, distance) pairs, nearest first
+        """
+        if patient_id not in self:
+            raise ValueError(f"Patient {patient_id} not found")
+        vector = self._vector(patient_id)
+        candidates = []
+
+        if self._tree is not None:
+            # Over-fetch to cover rows superseded by the delta and the patient itself
+            n = min(len(self._tree_ids), k + 1 + len(self._delta))
+            distances, indices = self._tree.query(vector.reshape(1, -1), k=n)
+            for distance, i in zip(distances[0], indices[0]):
+                pid = self._tree_ids[i]
+                if pid not in self._delta:
+                    candidates.append((pid, float(distance)))
+
+        if self._delta:
+            delta_ids = list(self._delta)
+            delta = np.array([self._delta[pid] for pid in delta_ids])
+            distances = np.sqrt(((delta - vector) ** 2).sum(axis=1))
+            candidates.extend(zip(delta_ids, distances.tolist()))
+
+        candidates = [(pid, distance) for pid, distance in candidates if pid != patient_id]
+        candidates.sort(key=lambda item: item[1])
+        return candidates[:k]
+
+    def describe(self):
+        return {
+            'patients': len(self),
+            'indexed': len(self._tree_ids),
+            'pending_updates': len(self._delta),
+            'stats': dict(self.stats),
+        }
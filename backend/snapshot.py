@@ -0,0 +1,214 @@
+import copy
+import hashlib
+import pickle
+import threading
+import time
+import weakref
+from datetime import datetime
+
+
+def artifact_version(data):
+    """Short content hash of a saved model package's bytes"""
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def model_version(predictor):
+    """
+    Version of the model a predictor serves
+
+    The hash of the package it was saved to or loaded from, so every worker
+    and every reload of the same file agree; a model trained in this process
+    and not yet saved falls back to a hash of the pickled model, which is
+    only stable within the process.
+    """
+    if predictor.model is None:
+        return 'none'
+    if predictor.model_version is not None:
+        return predictor.model_version
+    return hashlib.sha1(pickle.dumps(predictor.model)).hexdigest()[:12]
+
+
+def processed_key(df):
+    """Identity of a daily-records frame (shape, latest date, patient count)"""
+    if df is None:
+        return None
+    return f"{df.shape}|{df['date'].max()}|{df['patient_id'].nunique()}"
+
+
+def data_version(predictor, processed=None):
+    """
+    Short hash identifying the daily records and serving rows a predictor reads
+
+    Serving rows built from daily records carry the records' key in their
+    source, so a worker that only maps the rows gets the same version as the
+    process that built them.
+
+    Args:
+        predictor (HealthcareRiskPredictor): Predictor to identify
+        processed (str): processed_key of its processed_data, if already known
+    """
+    parts = []
+    serving = predictor.serving_features
+    if predictor.processed_data is not None and (serving is None or serving.source is None):
+        parts.append(processed or processed_key(predictor.processed_data))
+    if serving is not None:
+        parts.append(f"{serving.matrix.shape}|{serving.source or serving.created_at}|{serving.generation}")
+    if not parts:
+        return 'none'
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+
+class ModelSnapshot:
+    """
+    Immutable bundle of everything a prediction reads
+
+    Holds the model, scaler, feature names, SHAP explainer and serving
+    features, plus a private shallow copy of the predictor that was
+    published. Nothing mutates that copy after publication, so a request
+    that captured a snapshot sees one consistent model/data version for its
+    whole lifetime, whatever is swapped in meanwhile.
+    """
+
+    def __init__(self, predictor, previous=None):
+        """
+        Args:
+            predictor (HealthcareRiskPredictor): Predictor to publish
+            previous (ModelSnapshot): Snapshot this one succeeds; its model and
+                daily-record hashes are reused when they are the same objects
+        """
+        view = copy.copy(predictor)
+        view.feature_names = list(predictor.feature_names)
+
+        self.predictor = view
+        self.model = view.model
+        self.scaler = view.scaler
+        self.feature_names = tuple(view.feature_names)
+        self.shap_explainer = view.shap_explainer
+        self.serving_features = view.serving_features
+        if previous is not None and previous.model is view.model:
+            self.model_version = previous.model_version
+        else:
+            self.model_version = model_version(view)
+        if previous is not None and previous.predictor.processed_data is view.processed_data:
+            self.processed_key = previous.processed_key
+        else:
+            self.processed_key = processed_key(view.processed_data)
+        self.data_version = data_version(view, self.processed_key)
+        self.version = f'{self.model_version}-{self.data_version}'
+        self.created_at = datetime.now().isoformat()
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("ModelSnapshot is immutable")
+        object.__setattr__(self, name, value)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'model_version': self.model_version,
+            'data_version': self.data_version,
+            'model_type': type(self.model).__name__,
+            'n_features': len(self.feature_names),
+            'serving_patients': len(self.serving_features) if self.serving_features is not None else 0,
+            'created_at': self.created_at,
+        }
+
+
+class SnapshotHolder:
+    """
+    Atomic reference to the live snapshot, with background rebuilds
+
+    Readers take ``current`` (a single attribute read) and never lock.
+    ``reload_async`` builds a replacement on a background thread and swaps
+    the reference when it is complete; a failed build leaves the live
+    snapshot untouched. Retired snapshots are freed as soon as the last
+    request holding them finishes; they are tracked by weak reference only
+    so ``status`` can report how many are still draining.
+    """
+
+    def __init__(self, snapshot):
+        self._current = snapshot
+        self._lock = threading.Lock()
+        self._retired = []
+        self._thread = None
+        self.state = 'idle'
+        self.last_error = None
+        self.last_reload = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def swap(self, snapshot, expected=None):
+        """
+        Publish a new snapshot and retire the previous one
+
+        Args:
+            snapshot (ModelSnapshot): Snapshot to publish
+            expected (ModelSnapshot): Only publish if this is still the live
+                snapshot (unconditional if None)
+
+        Returns:
+            bool: False if ``expected`` had already been replaced
+        """
+        with self._lock:
+            previous = self._current
+            if expected is not None and previous is not expected:
+                return False
+            self._current = snapshot
+            self._retired = [ref for ref in self._retired if ref() is not None]
+            self._retired.append(weakref.ref(previous))
+        return True
+
+    def reload_async(self, build):
+        """
+        Start building a new snapshot in the background
+
+        Args:
+            build (callable): Returns the new ModelSnapshot
+
+        Returns:
+            bool: False if a reload is already in progress
+        """
+        with self._lock:
+            if self.state == 'building':
+                return False
+            self.state = 'building'
+            self.last_error = None
+        self._thread = threading.Thread(target=self._run_reload, args=(build,), daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_reload(self, build):
+        start = time.perf_counter()
+        try:
+            snapshot = build()
+            self.swap(snapshot)
+            self.last_reload = {
+                'version': snapshot.version,
+                'seconds': time.perf_counter() - start,
+                'completed_at': datetime.now().isoformat(),
+            }
+            self.state = 'idle'
+        except Exception as e:
+            self.last_error = str(e)
+            self.state = 'failed'
+            print(f"❌ Reload failed: {e}")
+
+    def wait(self, timeout=None):
+        """Block until the running reload (if any) finishes"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self):
+        with self._lock:
+            draining = [ref() for ref in self._retired]
+        return {
+            'state': self.state,
+            'current': self._current.describe(),
+            'draining_versions': [snap.version for snap in draining if snap is not None],
+            'last_reload': self.last_reload,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,576 @@
+import argparse
+import asyncio
+import copy
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from trends import TREND_SPECS, ADHERENCE_COLUMN
+from snapshot import ModelSnapshot
+from features import ROLLING_WINDOWS, ROLLING_COLUMNS
+
+
+class RollingWindowState:
+    """
+    Online rolling mean/std/slope for one patient
+
+    Holds the last ``max(windows)`` daily values per column in a ring buffer
+    plus, per window, running count, sum, sum of squares, and the position
+    sums needed for a least-squares slope. Appending a day or revising the
+    current day is O(1) per column regardless of window length. Missing
+    values are skipped but keep their position, matching the pandas rolling
+    mean/std and the polyfit slope in the batch pipeline.
+    """
+
+    __slots__ = ('columns', 'windows', 'size', 'buffer', 'head', 'rows', 'day',
+                 'day_sum', 'day_count', 'count', 's1', 's2', 'sx', 'sxx', 'sxy')
+
+    def __init__(self, columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS):
+        self.columns = list(columns)
+        self.windows = tuple(windows)
+        self.size = max(self.windows)
+        n_windows, n_cols = len(self.windows), len(self.columns)
+
+        self.buffer = np.full((n_cols, self.size), np.nan)
+        self.head = 0           # next write slot
+        self.rows = 0           # daily records seen
+        self.day = None         # date of the open (latest) daily record
+        self.day_sum = np.zeros(n_cols)
+        self.day_count = np.zeros(n_cols)
+
+        self.count = np.zeros((n_windows, n_cols))
+        self.s1 = np.zeros((n_windows, n_cols))
+        self.s2 = np.zeros((n_windows, n_cols))
+        self.sx = np.zeros((n_windows, n_cols))
+        self.sxx = np.zeros((n_windows, n_cols))
+        self.sxy = np.zeros((n_windows, n_cols))
+
+    def seed(self, values, last_day, rows=None):
+        """
+        Initialise from a patient's existing daily records
+
+        Args:
+            values (array): (records, columns) in date order; only the last
+                ``max(windows)`` rows are kept
+            last_day (Timestamp): Date of the last record (later readings on
+                this date revise it)
+            rows (int): Total records the patient has (len(values) if None)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        tail = values[-self.size:]
+        self.buffer[:] = np.nan
+        self.buffer[:, :len(tail)] = tail.T
+        self.head = len(tail) % self.size
+        self.rows = len(values) if rows is None else rows
+        self.day = pd.Timestamp(last_day).normalize()
+
+        last = tail[-1] if len(tail) else np.full(len(self.columns), np.nan)
+        self.day_count = (~np.isnan(last)).astype(np.float64)
+        self.day_sum = np.where(self.day_count > 0, last, 0.0)
+        self._recompute()
+
+    def update(self, date, readings):
+        """
+        Fold one reading into the state
+
+        A reading on a new date opens a daily record; further readings on the
+        same date revise it (each column is the mean of that day's readings).
+
+        Args:
+            date (str | Timestamp): Reading time
+            readings (dict): Column -> value (columns not present are unchanged)
+
+        Returns:
+            bool: False if the reading predates the open daily record (dropped)
+        """
+        day = pd.Timestamp(date).normalize()
+        values = np.array([np.nan if readings.get(col) is None else readings[col]
+                           for col in self.columns], dtype=np.float64)
+        present = ~np.isnan(values)
+
+        if self.day is None or day > self.day:
+            self.day = day
+            self.day_sum = np.where(present, values, 0.0)
+            self.day_count = present.astype(np.float64)
+            self._append(self._day_values())
+        elif day == self.day:
+            self.day_sum += np.where(present, values, 0.0)
+            self.day_count += present
+            self._replace_last(self._day_values())
+        else:
+            return False
+        return True
+
+    def _day_values(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.day_count > 0, self.day_sum / self.day_count, np.nan)
+
+    def _add(self, k, i, values):
+        valid = ~np.isnan(values)
+        v = np.where(valid, values, 0.0)
+        self.count[k] += valid
+        self.s1[k] += v
+        self.s2[k] += v * v
+        self.sx[k] += i * valid
+        self.sxx[k] += i * i * valid
+        self.sxy[k] += i * v
+
+    def _remove(self, k, i, values):
+        valid = ~np.isnan(values)
+        v = np.where(valid, values, 0.0)
+        self.count[k] -= valid
+        self.s1[k] -= v
+        self.s2[k] -= v * v
+        self.sx[k] -= i * valid
+        self.sxx[k] -= i * i * valid
+        self.sxy[k] -= i * v
+
+    def _append(self, values):
+        for k, w in enumerate(self.windows):
+            if self.rows >= w:
+                # Oldest value (position 0) leaves; the rest move down one position
+                self._remove(k, 0, self.buffer[:, (self.head - w) % self.size])
+                self.sxx[k] += self.count[k] - 2 * self.sx[k]
+                self.sx[k] -= self.count[k]
+                self.sxy[k] -= self.s1[k]
+                self._add(k, w - 1, values)
+            else:
+                self._add(k, self.rows, values)
+
+        self.buffer[:, self.head] = values
+        self.head = (self.head + 1) % self.size
+        self.rows += 1
+        if self.head == 0:
+            # Re-derive the sums once per buffer cycle to bound floating-point drift
+            self._recompute()
+
+    def _replace_last(self, values):
+        last = (self.head - 1) % self.size
+        for k, w in enumerate(self.windows):
+            i = min(self.rows, w) - 1
+            self._remove(k, i, self.buffer[:, last])
+            self._add(k, i, values)
+        self.buffer[:, last] = values
+
+    def _recompute(self):
+        for stat in (self.count, self.s1, self.s2, self.sx, self.sxx, self.sxy):
+            stat[:] = 0
+        for k, w in enumerate(self.windows):
+            n = min(self.rows, w)
+            slots = (self.head - n + np.arange(n)) % self.size
+            for i, slot in enumerate(slots):
+                self._add(k, i, self.buffer[:, slot])
+
+    def features(self):
+        """Rolling features named like the batch pipeline ('<col>_<stat>_<window>d')"""
+        c = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(c >= 1, self.s1 / c, np.nan)
+            var = np.where(c >= 2, (self.s2 - self.s1 * self.s1 / c) / (c - 1), np.nan)
+            std = np.sqrt(np.maximum(var, 0.0))
+            slope = np.where(c >= 2, (c * self.sxy - self.sx * self.s1) /
+                             (c * self.sxx - self.sx * self.sx), np.nan)
+
+        features = {}
+        for k, w in enumerate(self.windows):
+            for j, col in enumerate(self.columns):
+                features[f'{col}_mean_{w}d'] = float(mean[k, j])
+                features[f'{col}_std_{w}d'] = float(std[k, j])
+                features[f'{col}_slope_{w}d'] = float(slope[k, j])
+        return features
+
+    def latest(self):
+        """Current day's value per column"""
+        return dict(zip(self.columns, self._day_values().tolist()))
+
+
+def parse_event(event, columns=ROLLING_COLUMNS):
+    """
+    Validate one device event and convert its fields
+
+    Args:
+        event (dict): Raw event (patient_id, timestamp or date, readings)
+        columns (list): Reading columns to convert (others are ignored)
+
+    Returns:
+        tuple: (patient_id, Timestamp, {column: float}) with missing or null
+        readings left out
+
+    Raises:
+        ValueError: If the patient or time is missing, the time cannot be
+            parsed or a reading is not a finite number
+    """
+    if not isinstance(event, dict):
+        raise ValueError(f"Event is not an object: {event!r}")
+    patient_id = event.get('patient_id')
+    when = event.get('timestamp', event.get('date'))
+    if patient_id is None or when is None:
+        raise ValueError("Event needs patient_id and timestamp (or date)")
+    try:
+        when = pd.Timestamp(when)
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError(f"Unparseable timestamp: {when!r}")
+    if pd.isna(when):
+        raise ValueError("Event timestamp is empty")
+    if when.tzinfo is not None:
+        # Daily records are naive dates; compare in UTC
+        when = when.tz_convert(None)
+
+    readings = {}
+    for col in columns:
+        value = event.get(col)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"Reading {col} is not numeric: {value!r}")
+        if np.isinf(value):
+            raise ValueError(f"Reading {col} is not finite")
+        readings[col] = value
+    return str(patient_id), when, readings
+
+
+class VitalsIngestionService:
+    """
+    Asyncio consumer applying device readings to serving state
+
+    Events are dicts with ``patient_id``, ``timestamp`` (or ``date``) and any
+    of the reading columns. Each event updates the patient's rolling state in
+    O(1); after every drained batch the touched patients' serving rows are
+    rewritten once. The queue is
+    bounded: ``submit`` waits while it is full, so producers slow to the
+    rate the consumer sustains. Predictions are not cached: /predict scores
+    the refreshed serving row of the snapshot it is bound to.
+
+    Nothing a published predictor reads is changed in place: each batch
+    produces a new serving matrix, aggregate table and similarity index
+    (their ``with_*`` methods share the unchanged data), published together
+    as a new snapshot. Requests bound to an earlier snapshot keep a
+    consistent view, and the snapshot version (and with it the ETag)
+    advances per batch. A batch finishing while a reload is published is
+    applied on top of the reloaded snapshot; the reload's rebuilt rows do
+    not carry earlier streamed readings until the patient's next reading.
+
+    Rolling state must be seeded from the patients' daily records (``seed``);
+    events for patients without seeded state are refused rather than
+    replacing their serving row with statistics of a single reading. Only
+    the rolling statistics, trend statistics, ``*_latest`` values of the
+    rolling columns and the aggregate risk scores are refreshed. The
+    window-averaged indicators (glucose_tir, bp_controlled) and latest
+    values of other columns keep the values of the last serving build until
+    serving features are rebuilt.
+    """
+
+    def __init__(self, predictor, max_queue=10_000, batch_size=256,
+                 trend_window=30, recent_points=7, min_trend_points=7, snapshots=None):
+        """
+        Args:
+            predictor (HealthcareRiskPredictor): Predictor with serving features built or loaded
+            max_queue (int): Queue capacity (producers block beyond it)
+            batch_size (int): Maximum events applied per consumer step
+            trend_window (int): Rolling window used for the serving trend slope
+            recent_points (int): Rolling window used for the serving trend recent mean/std
+            min_trend_points (int): Readings needed before a trend slope is reported
+            snapshots (SnapshotHolder): Publish every batch to this holder; the
+                live snapshot's predictor is then read instead of ``predictor``
+        """
+        if predictor.serving_features is None:
+            raise ValueError("Serving features not available. Call build_serving_features() first.")
+
+        self.predictor = predictor
+        self.snapshots = snapshots
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.trend_window = trend_window
+        self.recent_points = recent_points
+        self.min_trend_points = min_trend_points
+
+        self.states = {}
+        # (patient_id, day, values) for the aggregate table, applied once per batch
+        self._pending_days = []
+        # Patients whose rolling state changed since the last published snapshot
+        self._unpublished = set()
+        self.counts = {'events': 0, 'late': 0, 'unknown_patient': 0, 'unseeded': 0,
+                       'rejected': 0, 'invalid': 0, 'batches': 0, 'failed_batches': 0}
+        self._busy_seconds = 0.0
+        self._started = None
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    def seed(self, processed_data=None):
+        """
+        Initialise per-patient rolling state from existing daily records
+
+        Args:
+            processed_data (DataFrame): Daily records (predictor.processed_data if None)
+
+        Returns:
+            int: Patients seeded
+        """
+        df = processed_data if processed_data is not None else self._live_predictor().processed_data
+        if df is None:
+            raise ValueError("No daily records to seed rolling state from. Pass processed_data "
+                             "or preprocess the data first; events for unseeded patients are refused.")
+
+        size = max(ROLLING_WINDOWS)
+        columns = [col for col in ROLLING_COLUMNS if col in df.columns]
+        df = df.sort_values(['patient_id', 'date'], kind='stable')
+        counts = df.groupby('patient_id', sort=False).size()
+        tail = df.groupby('patient_id', sort=False).tail(size)
+
+        for patient_id, group in tail.groupby('patient_id', sort=False):
+            state = RollingWindowState(columns)
+            state.seed(group[columns].to_numpy(dtype=np.float64), group['date'].iloc[-1],
+                       rows=int(counts[patient_id]))
+            self.states[patient_id] = state
+
+        print(f"✓ Streaming state seeded for {len(self.states)} patients")
+        return len(self.states)
+
+    def _live_predictor(self):
+        return self.snapshots.current.predictor if self.snapshots is not None else self.predictor
+
+    def apply(self, event):
+        """
+        Apply one event to the rolling state; returns the patient id if it was applied
+
+        Malformed events (see parse_event) are counted under ``invalid`` and
+        skipped, so one bad message does not stop the consumer.
+        """
+        try:
+            patient_id, when, readings = parse_event(event)
+        except ValueError:
+            self.counts['invalid'] += 1
+            return None
+        predictor = self._live_predictor()
+        if patient_id not in predictor.serving_features:
+            self.counts['unknown_patient'] += 1
+            return None
+        state = self.states.get(patient_id)
+        if state is None:
+            # No history to continue from: one reading must not stand in for the window
+            self.counts['unseeded'] += 1
+            return None
+
+        if not state.update(when, readings):
+            self.counts['late'] += 1
+            return None
+        # The open daily record feeds the whole-history aggregates too
+        self._pending_days.append((patient_id, state.day, state.latest()))
+        self.counts['events'] += 1
+        return patient_id
+
+    def serving_values(self, patient_id, aggregates=None):
+        """
+        Serving-row columns derived from the patient's rolling state
+
+        Args:
+            patient_id (str): Patient identifier
+            aggregates (PatientAggregateTable): Table the risk scores are read
+                from (the live predictor's if None)
+        """
+        state = self.states[patient_id]
+        features = state.features()
+        values = dict(features)
+        values.update({f'{col}_latest': value for col, value in state.latest().items()
+                       if not np.isnan(value)})
+
+        # Trend statistics read by trends_from_row
+        for col in [col for _, col, _ in TREND_SPECS] + [ADHERENCE_COLUMN]:
+            if col not in state.columns:
+                continue
+            j = state.columns.index(col)
+            enough = state.count[state.windows.index(self.trend_window), j] >= self.min_trend_points
+            values[f'{col}_slope'] = features[f'{col}_slope_{self.trend_window}d'] if enough else np.nan
+            values[f'{col}_recent_mean'] = features[f'{col}_mean_{self.recent_points}d'] if enough else np.nan
+            values[f'{col}_recent_std'] = features[f'{col}_std_{self.recent_points}d'] if enough else np.nan
+
+        if aggregates is None:
+            aggregates = self._live_predictor().patient_aggregates
+        if aggregates is not None:
+            values.update(aggregates.scores([patient_id]).iloc[0].to_dict())
+        return values
+
+    def _refresh(self, patient_ids):
+        if not patient_ids:
+            return
+        while True:
+            current = self.snapshots.current if self.snapshots is not None else None
+            base = current.predictor if current is not None else self.predictor
+            aggregates = base.patient_aggregates
+            if aggregates is not None:
+                aggregates = aggregates.with_days(self._pending_days)
+            serving = base.serving_features.with_rows(
+                {patient_id: self.serving_values(patient_id, aggregates) for patient_id in patient_ids}
+            )
+            index = base.similarity_index
+            if index is not None:
+                index = index.with_rows({patient_id: serving.row(patient_id)[:serving.n_model_features]
+                                         for patient_id in patient_ids})
+            if self._publish(current, base, serving, aggregates, index):
+                break
+            # A reload was published meanwhile; apply the batch on top of it
+        self._pending_days = []
+        self._unpublished = set()
+
+    def _publish(self, current, base, serving, aggregates, index):
+        """Make the updated serving state current; False if ``current`` was replaced meanwhile"""
+        view = self.predictor if current is None else copy.copy(base)
+        view.serving_features = serving
+        view.patient_aggregates = aggregates
+        view.similarity_index = index
+        if current is None:
+            return True
+        return self.snapshots.swap(ModelSnapshot(view, previous=current), expected=current)
+
+    def process_batch(self, events):
+        """Apply a batch of events and refresh each touched patient once"""
+        start = time.perf_counter()
+        metrics = self._live_predictor().metrics
+        with metrics.stage('stream.batch'):
+            touched = {pid for pid in map(self.apply, events) if pid is not None}
+            # Patients of a batch that failed to publish are refreshed with this one
+            self._unpublished |= touched
+            self._refresh(self._unpublished)
+        self._busy_seconds += time.perf_counter() - start
+        self.counts['batches'] += 1
+        metrics.inc('stream_events_total', len(events))
+        metrics.set_gauge('stream_queue_depth', self.queue.qsize())
+        return touched
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+    async def submit(self, event):
+        """Enqueue an event, waiting while the queue is full"""
+        await self.queue.put(event)
+
+    def try_submit(self, event):
+        """Enqueue without waiting; returns False (and counts a rejection) when full"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.counts['rejected'] += 1
+            return False
+
+    async def run(self):
+        """Consume events until ``stop`` is called"""
+        self._started = time.perf_counter()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            stop = batch[-1] is None
+            events = [event for event in batch if event is not None]
+            if events:
+                try:
+                    self.process_batch(events)
+                except Exception as e:
+                    # Keep consuming; the batch's patients are published with the next one
+                    self.counts['failed_batches'] += 1
+                    print(f"  ⚠️ Streaming batch failed: {e}")
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                break
+            # Let producers run between batches
+            await asyncio.sleep(0)
+
+    async def stop(self):
+        """Finish the events already queued, then end ``run``"""
+        await self.queue.put(None)
+
+    def stats(self):
+        """Ingestion counters and throughput"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return dict(self.counts,
+                    queue_depth=self.queue.qsize(),
+                    patients_tracked=len(self.states),
+                    elapsed_seconds=elapsed,
+                    events_per_second=self.counts['events'] / elapsed if elapsed else 0.0,
+                    events_per_busy_second=(self.counts['events'] / self._busy_seconds
+                                            if self._busy_seconds else 0.0))
+
+
+async def ingest_jsonl(service, path, follow=False, poll_interval=0.5):
+    """
+    Feed a JSON-lines file of events into the service (file-based queue stand-in)
+
+    Args:
+        service (VitalsIngestionService): Target service
+        path (str): File with one event object per line
+        follow (bool): Keep tailing the file for appended events
+        poll_interval (float): Seconds between polls when following
+    """
+    submitted = 0
+    with open(path) as f:
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            line = line.strip()
+            if line:
+                await service.submit(json.loads(line))
+                submitted += 1
+    return submitted
+
+
+async def replay_file(service, path, follow=False, poll_interval=0.5):
+    """Run the consumer over an events file (tailing it if ``follow``) and return the ingestion stats"""
+    consumer = asyncio.create_task(service.run())
+    await ingest_jsonl(service, path, follow=follow, poll_interval=poll_interval)
+    await service.stop()
+    await consumer
+    return service.stats()
+
+
+def start_background(service, path, follow=True, poll_interval=0.5):
+    """
+    Feed an events file into the service on a daemon thread with its own event loop
+
+    Returns:
+        Thread: The ingestion thread
+    """
+    thread = threading.Thread(
+        target=lambda: asyncio.run(replay_file(service, path, follow, poll_interval)),
+        name='vitals-ingestion', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API while streaming device readings into it')
+    parser.add_argument('--events', required=True, help='JSON-lines file of events (tailed with --follow)')
+    parser.add_argument('--follow', action='store_true', help='Keep reading events appended to the file')
+    parser.add_argument('--model', default='trained_healthcare_model.pkl', help='Saved model package')
+    parser.add_argument('--serving', default='serving_features', help='Serving feature matrix directory')
+    parser.add_argument('--data', default='synthetic_healthcare_dataset.csv',
+                        help='Daily records the rolling state is seeded from')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+
+    from main import HealthcareAPI, build_predictor
+
+    # Rolling state needs the daily history, so this process loads it
+    predictor = build_predictor(args.model, args.serving, reload_data=True, data_path=args.data)
+    api = HealthcareAPI(predictor, reload_config={
+        'model_path': args.model, 'serving_path': args.serving, 'data_path': args.data
+    })
+    api.start_ingestion(args.events, follow=args.follow, batch_size=args.batch_size)
+    api.run(port=args.port, debug=False)
+
+
+if __name__ == '__main__':
+    main()
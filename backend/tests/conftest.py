@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Backend modules import each other as top-level modules (run from backend/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+
+CONDITIONS = ['diabetes', 'heart_failure', 'obesity', 'mixed']
+LAB_COLUMNS = ['hba1c', 'creatinine', 'egfr', 'cholesterol_total', 'cholesterol_ldl']
+
+
+def make_daily_records(n_patients=24, seed=0):
+    """
+    Synthetic daily records, deterioration events and demographics
+
+    Patients have 40-90 days of readings with gaps in the vitals, sparse
+    labs, and a hospitalization for roughly a third of them.
+    """
+    rng = np.random.default_rng(seed)
+    frames, events, demographics = [], [], []
+    for i in range(n_patients):
+        patient_id = f'PT_{i:04d}'
+        days = int(rng.integers(40, 90))
+        dates = pd.date_range('2024-01-01', periods=days)
+        age = int(rng.integers(35, 85))
+        condition = CONDITIONS[i % len(CONDITIONS)]
+        df = pd.DataFrame({
+            'patient_id': patient_id, 'date': dates,
+            'glucose_mg_dl': 140 + np.cumsum(rng.normal(0, 3, days)) + rng.normal(0, 15, days),
+            'weight_kg': 85 + np.cumsum(rng.normal(0, 0.2, days)),
+            'systolic_bp': 135 + rng.normal(0, 12, days),
+            'diastolic_bp': 85 + rng.normal(0, 8, days),
+            'heart_rate': 75 + rng.normal(0, 6, days),
+            'steps': rng.normal(6000, 1500, days),
+            'exercise_minutes': rng.normal(20, 5, days),
+            'sleep_hours': rng.normal(7, 1, days),
+            'adherence_avg': np.clip(rng.normal(0.8, 0.1, days), 0, 1),
+            'age': age, 'comorbidity_count': int(rng.integers(0, 5)), 'bmi': float(rng.normal(30, 4)),
+            'primary_condition': condition, 'baseline_risk': ['low', 'medium', 'high'][i % 3],
+            'gender': ['M', 'F'][i % 2], 'smoking_history': ['never', 'former', 'current'][i % 3],
+        })
+        for col, mean, std in zip(LAB_COLUMNS, (7.5, 1.1, 70, 190, 110), (1, 0.2, 10, 20, 20)):
+            df[col] = np.where(rng.random(days) < 0.1, rng.normal(mean, std, days), np.nan)
+        for col in ['glucose_mg_dl', 'systolic_bp', 'weight_kg', 'steps']:
+            df.loc[rng.random(days) < 0.08, col] = np.nan
+
+        labels = np.zeros(days, dtype=int)
+        if i % 3 == 0:
+            event_date = dates[int(rng.integers(0, days))] + pd.Timedelta(days=int(rng.integers(0, 60)))
+            events.append({'patient_id': patient_id, 'event_date': event_date, 'event_type': 'hospitalization'})
+            labels = ((event_date > dates) & (event_date <= dates + pd.Timedelta(days=90))).astype(int)
+        df['deterioration_90d'] = labels
+        frames.append(df)
+        demographics.append({'patient_id': patient_id, 'age': age, 'gender': ['M', 'F'][i % 2],
+                             'primary_condition': condition})
+
+    records = pd.concat(frames, ignore_index=True)
+    events = pd.DataFrame(events, columns=['patient_id', 'event_date', 'event_type'])
+    return records, events, pd.DataFrame(demographics)
+
+
+@pytest.fixture(scope='session')
+def daily_records():
+    return make_daily_records()
+
+
+@pytest.fixture(scope='session')
+def data_paths(tmp_path_factory, daily_records):
+    """The synthetic dataset written as the three CSV files HealthcareRiskPredictor loads"""
+    directory = tmp_path_factory.mktemp('data')
+    records, events, demographics = daily_records
+    paths = {
+        'data_path': str(directory / 'synthetic_healthcare_dataset.csv'),
+        'events_path': str(directory / 'deterioration_events.csv'),
+        'demographics_path': str(directory / 'patient_demographics.csv'),
+    }
+    records.to_csv(paths['data_path'], index=False)
+    events.to_csv(paths['events_path'], index=False)
+    demographics.to_csv(paths['demographics_path'], index=False)
+    return paths
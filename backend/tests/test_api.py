@@ -0,0 +1,96 @@
+import copy
+
+import pytest
+
+from main import HealthcareRiskPredictor, HealthcareAPI
+from riskstore import RiskScoreStore
+from snapshot import ModelSnapshot
+
+
+@pytest.fixture(scope='module')
+def artifacts(data_paths, tmp_path_factory):
+    """A model trained on the synthetic cohort, saved with its serving matrix"""
+    directory = tmp_path_factory.mktemp('artifacts')
+    predictor = HealthcareRiskPredictor(**data_paths)
+    predictor.metrics.enabled = False
+    predictor.load_data()
+    predictor.preprocess_data()
+    predictor.train_models(predictor.prepare_ml_dataset())
+    model_path = str(directory / 'model.pkl')
+    serving_path = str(directory / 'serving')
+    predictor.save_model(model_path)
+    predictor.build_serving_features(serving_path)
+    return predictor, {'model_path': model_path, 'serving_path': serving_path}
+
+
+@pytest.fixture
+def api(artifacts, tmp_path):
+    predictor, reload_config = artifacts
+    return HealthcareAPI(predictor, reload_config=reload_config, risk_store=RiskScoreStore(str(tmp_path / 'risk')))
+
+
+@pytest.fixture
+def patient_id(artifacts):
+    return artifacts[0].serving_features.patient_ids[0]
+
+
+def test_revalidation_answers_304(api, patient_id):
+    client = api.app.test_client()
+    first = client.get(f'/predict/{patient_id}')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get(f'/predict/{patient_id}', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+    by_date = client.get(f'/predict/{patient_id}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert by_date.status_code == 304
+    assert client.get(f'/predict/{patient_id}', headers={'If-None-Match': 'W/"stale"'}).status_code == 200
+
+
+def test_uncacheable_routes_carry_no_validators(api, patient_id):
+    client = api.app.test_client()
+    response = client.post('/predict/batch', json={'patient_ids': [patient_id]})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert client.get('/admin/reload', headers={'If-None-Match': '*'}).status_code == 200
+
+
+def test_etag_survives_reload_of_same_artifacts(api, patient_id):
+    client = api.app.test_client()
+    etag = client.get(f'/predict/{patient_id}').headers['ETag']
+
+    assert client.post('/admin/reload', json={}).status_code == 202
+    api.snapshots.wait()
+    assert api.snapshots.state == 'idle'
+    assert client.get(f'/predict/{patient_id}', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_changes_with_serving_data(api, patient_id):
+    client = api.app.test_client()
+    etag = client.get(f'/predict/{patient_id}').headers['ETag']
+
+    current = api.snapshots.current
+    predictor = copy.copy(current.predictor)
+    predictor.serving_features = predictor.serving_features.with_rows(
+        {patient_id: {predictor.feature_names[0]: 1.0}}
+    )
+    api.snapshots.swap(ModelSnapshot(predictor, previous=current))
+
+    response = client.get(f'/predict/{patient_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_risk_history_etag_follows_recorded_runs(api):
+    client = api.app.test_client()
+    etag = client.get('/cohort_risk_history').headers['ETag']
+
+    assert client.get('/cohort_summary').status_code == 200
+    api.risk_store.wait()
+    response = client.get('/cohort_risk_history', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 1
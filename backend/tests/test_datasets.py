@@ -0,0 +1,112 @@
+import io
+import os
+import shutil
+import subprocess
+import zipfile
+
+import numpy as np
+import pytest
+
+from datasets import LZWReader, ARCHIVE_DIR, open_compressed
+
+
+def lzw_compress(data, max_bits=16, clear_when_full=False):
+    """
+    Minimal Unix ``compress`` encoder (block mode) for round-trip tests
+
+    Codes are packed LSB-first in groups of eight; a code-width change (or a
+    CLEAR) pads the current group, as compress(1) does.
+    """
+    out = bytearray(b'\x1f\x9d' + bytes([0x80 | max_bits]))
+    max_max_code = 1 << max_bits
+    state = {'bits': 0, 'count': 0, 'n_bits': 9, 'group': 0}
+
+    def emit(code):
+        state['bits'] |= code << state['count']
+        state['count'] += state['n_bits']
+        state['group'] += 1
+        while state['count'] >= 8:
+            out.append(state['bits'] & 0xff)
+            state['bits'] >>= 8
+            state['count'] -= 8
+
+    def end_group():
+        while state['group'] % 8:
+            emit(0)
+        state['group'] = 0
+
+    def widen_if_needed(free_ent):
+        max_code = max_max_code if state['n_bits'] == max_bits else (1 << state['n_bits']) - 1
+        if free_ent > max_code and state['n_bits'] < max_bits:
+            end_group()
+            state['n_bits'] += 1
+
+    table = {bytes([i]): i for i in range(256)}
+    free_ent = 257
+    current = b''
+    for byte in data:
+        candidate = current + bytes([byte])
+        if candidate in table:
+            current = candidate
+            continue
+        emit(table[current])
+        widen_if_needed(free_ent)
+        if free_ent < max_max_code:
+            table[candidate] = free_ent
+            free_ent += 1
+        elif clear_when_full:
+            emit(LZWReader.CLEAR)
+            end_group()
+            state['n_bits'] = 9
+            table = {bytes([i]): i for i in range(256)}
+            free_ent = 257
+        current = bytes([byte])
+    if current:
+        emit(table[current])
+    if state['count']:
+        out.append(state['bits'] & 0xff)
+    return bytes(out)
+
+
+def sample_payload(size, seed=0):
+    """Text-like bytes with enough repetition to grow the code table"""
+    rng = np.random.default_rng(seed)
+    words = [bytes(rng.integers(97, 123, rng.integers(2, 9)).astype(np.uint8)) for _ in range(400)]
+    return b' '.join(words[i] for i in rng.integers(0, len(words), size // 5))[:size]
+
+
+def decode(compressed, chunk_size):
+    reader = LZWReader(io.BytesIO(compressed), chunk_size=chunk_size)
+    return io.BufferedReader(reader, buffer_size=257).read()
+
+
+@pytest.mark.parametrize('max_bits', [10, 12, 16])
+@pytest.mark.parametrize('clear_when_full', [False, True])
+def test_round_trip(max_bits, clear_when_full):
+    payload = sample_payload(300_000)
+    compressed = lzw_compress(payload, max_bits=max_bits, clear_when_full=clear_when_full)
+    assert len(compressed) < len(payload)
+    for chunk_size in (1, 7, 64 * 1024):
+        assert decode(compressed, chunk_size) == payload
+
+
+def test_round_trip_edge_inputs():
+    for payload in (b'', b'a', b'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', bytes(range(256)) * 40):
+        assert decode(lzw_compress(payload), chunk_size=3) == payload
+
+
+def test_rejects_non_compress_streams():
+    with pytest.raises(ValueError):
+        LZWReader(io.BytesIO(b'PK\x03\x04 not a .Z stream'))
+
+
+@pytest.mark.skipif(shutil.which('gzip') is None, reason='gzip not installed')
+def test_bundled_archive_matches_gzip():
+    path = os.path.join(ARCHIVE_DIR, 'diabetes.zip')
+    if not os.path.exists(path):
+        pytest.skip('diabetes.zip not available')
+    with zipfile.ZipFile(path) as archive:
+        compressed = archive.read('diabetes-data.tar.Z')
+
+    expected = subprocess.run(['gzip', '-dc'], input=compressed, stdout=subprocess.PIPE, check=True).stdout
+    assert open_compressed(io.BytesIO(compressed)).read() == expected
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from labels import deterioration_labels, next_event_days
+
+
+def reference_labels(records, events, horizon_days, event_types=None):
+    """Per-patient, per-event loop over the records"""
+    if event_types is not None:
+        events = events[events['event_type'].isin(event_types)]
+    labels = np.zeros(len(records), dtype=np.int8)
+    dates = pd.to_datetime(records['date']).to_numpy()
+    for patient_id, patient_events in events.groupby('patient_id'):
+        rows = (records['patient_id'] == patient_id).to_numpy()
+        for event_date in pd.to_datetime(patient_events['event_date']):
+            hit = (event_date > dates) & (event_date <= dates + np.timedelta64(horizon_days, 'D'))
+            labels[rows & hit] = 1
+    return labels
+
+
+@pytest.fixture
+def cohort_events(daily_records):
+    """Generated hospitalizations plus extra events of other types, some for unknown patients"""
+    records, events, _ = daily_records
+    rng = np.random.default_rng(5)
+    patients = records['patient_id'].unique()
+    extra = pd.DataFrame({
+        'patient_id': np.append(rng.choice(patients, 30), ['PT_9999', 'PT_9998']),
+        'event_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(-20, 150, 32), 'D'),
+        'event_type': rng.choice(['ed_visit', 'hospitalization'], 32),
+    })
+    shuffled = records.sample(frac=1, random_state=4).reset_index(drop=True)
+    return shuffled, pd.concat([events, extra], ignore_index=True)
+
+
+def test_labels_match_generated_target(daily_records):
+    records, events, _ = daily_records
+    np.testing.assert_array_equal(deterioration_labels(records, events, 90), records['deterioration_90d'])
+
+
+@pytest.mark.parametrize('horizon_days', [1, 30, 90])
+@pytest.mark.parametrize('event_types', [None, ['hospitalization']])
+def test_labels_match_per_patient_loop(cohort_events, horizon_days, event_types):
+    records, events = cohort_events
+    np.testing.assert_array_equal(
+        deterioration_labels(records, events, horizon_days, event_types),
+        reference_labels(records, events, horizon_days, event_types)
+    )
+
+
+def test_next_event_days_without_events(daily_records):
+    records = daily_records[0]
+    empty = pd.DataFrame(columns=['patient_id', 'event_date', 'event_type'])
+    assert np.isnan(next_event_days(records, empty)).all()
+    assert not deterioration_labels(records, empty).any()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from main import HealthcareRiskPredictor
+
+
+LAB_COLUMNS = ['hba1c', 'creatinine', 'egfr', 'cholesterol_total', 'cholesterol_ldl']
+VITAL_COLUMNS = ['weight_kg', 'glucose_mg_dl', 'systolic_bp', 'diastolic_bp', 'heart_rate']
+
+
+def reference_imputation(df, lifestyle_medians):
+    """The column-by-column grouped fills the batched imputation replaced"""
+    df = df.copy()
+    for col in LAB_COLUMNS:
+        df[col] = df.groupby('patient_id')[col].ffill()
+        df[col] = df.groupby('patient_id')[col].bfill()
+    for col in VITAL_COLUMNS:
+        df[col] = df[col].fillna(df.groupby('patient_id')[col].transform('median'))
+    for col, median in lifestyle_medians.items():
+        df[col] = df[col].fillna(median)
+    return df
+
+
+@pytest.fixture(scope='module')
+def loaded_predictor(data_paths):
+    predictor = HealthcareRiskPredictor(**data_paths)
+    predictor.metrics.enabled = False
+    predictor.load_data()
+    return predictor
+
+
+@pytest.fixture(scope='module')
+def unsharded(loaded_predictor):
+    return loaded_predictor.preprocess_data()
+
+
+def test_sharded_preprocessing_matches_single_process(loaded_predictor, unsharded):
+    sharded = loaded_predictor.preprocess_data(n_shards=4, max_workers=2)
+    pd.testing.assert_frame_equal(sharded, unsharded)
+
+
+def test_feature_store_matches_single_process(loaded_predictor, unsharded, tmp_path):
+    stored = loaded_predictor.preprocess_data(n_shards=3, max_workers=2, feature_store_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(stored[unsharded.columns], unsharded, check_dtype=False)
+
+
+def test_imputation_matches_per_column_fills(daily_records):
+    records = daily_records[0].sample(frac=1, random_state=2).reset_index(drop=True)
+    medians = {'steps': 6000.0, 'exercise_minutes': 20.0, 'sleep_hours': 7.0}
+    imputed = HealthcareRiskPredictor._engineer_patient_features(records, medians, {}, verbose=False)
+
+    columns = LAB_COLUMNS + VITAL_COLUMNS + list(medians)
+    pd.testing.assert_frame_equal(imputed[columns], reference_imputation(records, medians)[columns])
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rules import (RECOMMENDATION_RULES, EXPLANATION_RULES, evaluate_rules, recommendations_from_masks,
+                   explanations_from_masks, build_worklists, trend_features)
+
+
+def reference_recommendations(risk_probability, patient_features, trends):
+    """The if/elif chain the recommendation rule table replaced"""
+    recommendations = []
+
+    if risk_probability > 0.6:
+        recommendations.append({'priority': 'high', 'action': 'Schedule immediate clinical assessment',
+                                'rationale': 'High risk of deterioration in next 90 days',
+                                'timeframe': 'within 48 hours'})
+
+    glucose = patient_features['glucose_mg_dl_latest']
+    if glucose > 180:
+        recommendations.append({'priority': 'high', 'action': 'Review and adjust diabetes medications',
+                                'rationale': f'Recent glucose level {glucose:.0f} mg/dL is above target',
+                                'timeframe': 'within 1 week'})
+    elif glucose > 150:
+        recommendations.append({'priority': 'medium', 'action': 'Increase glucose monitoring frequency',
+                                'rationale': f'Glucose level {glucose:.0f} mg/dL trending above target',
+                                'timeframe': 'within 2 weeks'})
+
+    adherence = patient_features['adherence_avg_latest']
+    if adherence < 0.7:
+        recommendations.append({'priority': 'high', 'action': 'Medication adherence counseling and support',
+                                'rationale': f'Poor medication adherence ({adherence:.1%})',
+                                'timeframe': 'within 1 week'})
+    elif adherence < 0.8:
+        recommendations.append({'priority': 'medium',
+                                'action': 'Review medication barriers and simplify regimen if possible',
+                                'rationale': f'Suboptimal adherence ({adherence:.1%})',
+                                'timeframe': 'within 2 weeks'})
+
+    bp = patient_features['systolic_bp_latest']
+    if bp > 160:
+        recommendations.append({'priority': 'high', 'action': 'Urgent blood pressure management',
+                                'rationale': f'Systolic BP {bp:.0f} mmHg requires immediate attention',
+                                'timeframe': 'within 24 hours'})
+    elif bp > 140:
+        recommendations.append({'priority': 'medium', 'action': 'Optimize antihypertensive therapy',
+                                'rationale': f'BP {bp:.0f} mmHg above target',
+                                'timeframe': 'within 1 week'})
+
+    if 'weight_trend' in trends and trends['weight_trend']['direction'] == 'increasing':
+        if trends['weight_trend']['magnitude'] > 0.3:
+            recommendations.append({'priority': 'high', 'action': 'Evaluate for fluid retention and heart failure',
+                                    'rationale': 'Rapid weight gain detected',
+                                    'timeframe': 'within 48 hours'})
+
+    hba1c = patient_features['hba1c_latest']
+    if hba1c > 8.0:
+        recommendations.append({'priority': 'medium', 'action': 'Intensify diabetes management plan',
+                                'rationale': f'HbA1c {hba1c:.1f}% above target',
+                                'timeframe': 'within 1 week'})
+
+    if risk_probability > 0.4:
+        recommendations.append({'priority': 'medium',
+                                'action': 'Reinforce lifestyle modifications (diet, exercise, stress management)',
+                                'rationale': 'Elevated risk profile warrants comprehensive lifestyle review',
+                                'timeframe': 'within 2 weeks'})
+
+    return sorted(recommendations, key=lambda x: 0 if x['priority'] == 'high' else 1)
+
+
+def reference_explanations(patient_features):
+    """The rule-based explanation chain the explanation rule table replaced"""
+    explanations = []
+    for column, op, threshold, factor, magnitude in (
+            ('glucose_mg_dl_latest', np.greater, 200, 'Recent glucose levels', 0.8),
+            ('systolic_bp_latest', np.greater, 150, 'Blood pressure control', 0.6),
+            ('adherence_avg_latest', np.less, 0.8, 'Medication adherence', 0.9),
+            ('age', np.greater, 70, 'Age', 0.4)):
+        value = patient_features[column]
+        if op(value, threshold):
+            explanations.append({'factor': factor, 'impact': 'increases risk', 'magnitude': magnitude,
+                                 'value': value})
+    return sorted(explanations, key=lambda x: x['magnitude'], reverse=True)[:5]
+
+
+@pytest.fixture
+def cohort():
+    """Feature rows spread across every rule threshold, with some missing values"""
+    rng = np.random.default_rng(7)
+    n = 400
+    features = pd.DataFrame({
+        'glucose_mg_dl_latest': rng.uniform(100, 260, n),
+        'adherence_avg_latest': rng.uniform(0.5, 1.0, n),
+        'systolic_bp_latest': rng.uniform(110, 190, n),
+        'hba1c_latest': rng.uniform(6, 10, n),
+        'age': rng.integers(30, 90, n).astype(float),
+    })
+    for column in features.columns:
+        features.loc[rng.random(n) < 0.05, column] = np.nan
+    risks = rng.uniform(0, 1, n)
+    # Weight trends as trends.trends_from_row reports them (direction from a signed slope)
+    trends = [
+        {'weight_trend': {
+            'direction': 'increasing' if slope > 0.1 else 'decreasing' if slope < -0.1 else 'stable',
+            'magnitude': abs(slope), 'current_avg': 80.0
+        }} if has_trend else {}
+        for slope, has_trend in zip(rng.uniform(-0.6, 0.6, n), rng.random(n) < 0.8)
+    ]
+    return features, risks, trends
+
+
+def _rule_frame(features, risks, trends):
+    slopes = pd.DataFrame([trend_features(t) for t in trends], index=features.index)
+    return pd.concat([features, slopes], axis=1).assign(risk_probability=risks)
+
+
+def test_recommendations_match_original_chain(cohort):
+    features, risks, trends = cohort
+    frame = _rule_frame(features, risks, trends)
+    actual = recommendations_from_masks(frame, evaluate_rules(frame, RECOMMENDATION_RULES))
+
+    for row in range(len(frame)):
+        expected = reference_recommendations(risks[row], features.iloc[row].to_dict(), trends[row])
+        assert actual[row] == expected
+
+
+def test_explanations_match_original_chain(cohort):
+    features = cohort[0]
+    actual = explanations_from_masks(features, evaluate_rules(features, EXPLANATION_RULES))
+
+    for row in range(len(features)):
+        assert actual[row] == reference_explanations(features.iloc[row].to_dict())
+
+
+def test_worklists_collect_patients_flagged_per_rule(cohort):
+    features, risks, trends = cohort
+    frame = _rule_frame(features, risks, trends)
+    patient_ids = [f'PT_{i:04d}' for i in range(len(frame))]
+    worklists = build_worklists(patient_ids, evaluate_rules(frame, RECOMMENDATION_RULES))
+
+    expected = {}
+    for row, patient_id in enumerate(patient_ids):
+        for rec in reference_recommendations(risks[row], features.iloc[row].to_dict(), trends[row]):
+            expected.setdefault(rec['timeframe'], set()).add(patient_id)
+    for timeframe, patients in worklists['by_timeframe'].items():
+        assert patients == sorted(expected.get(timeframe, ()))
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import ROLLING_WINDOWS, _slope
+from streaming import RollingWindowState
+
+
+COLUMNS = ['glucose_mg_dl', 'systolic_bp']
+
+
+def pandas_rolling(frame):
+    """Rolling features of the last row, computed as the batch pipeline does"""
+    expected = {}
+    for window in ROLLING_WINDOWS:
+        for column in COLUMNS:
+            rolling = frame[column].rolling(window=window, min_periods=1)
+            expected[f'{column}_mean_{window}d'] = rolling.mean().iloc[-1]
+            expected[f'{column}_std_{window}d'] = rolling.std().iloc[-1]
+            expected[f'{column}_slope_{window}d'] = (
+                frame[column].rolling(window=window, min_periods=2).apply(_slope).iloc[-1]
+            )
+    return expected
+
+
+def assert_features_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name, value in expected.items():
+        if np.isnan(value):
+            assert np.isnan(actual[name]), name
+        else:
+            assert actual[name] == pytest.approx(value, rel=1e-7, abs=1e-7), name
+
+
+@pytest.fixture
+def daily_values():
+    rng = np.random.default_rng(3)
+    days = 75  # more than two buffer cycles of the longest window
+    frame = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=days),
+        'glucose_mg_dl': 150 + np.cumsum(rng.normal(0, 4, days)),
+        'systolic_bp': 135 + rng.normal(0, 10, days),
+    })
+    frame.loc[rng.random(days) < 0.15, 'glucose_mg_dl'] = np.nan
+    frame.loc[rng.random(days) < 0.15, 'systolic_bp'] = np.nan
+    return frame
+
+
+def test_streamed_days_match_pandas_rolling(daily_values):
+    state = RollingWindowState(columns=COLUMNS)
+    for n, row in enumerate(daily_values.itertuples(index=False), start=1):
+        assert state.update(row.date, {col: getattr(row, col) for col in COLUMNS})
+        assert_features_equal(state.features(), pandas_rolling(daily_values.iloc[:n]))
+
+
+def test_same_day_readings_revise_the_open_day(daily_values):
+    state = RollingWindowState(columns=COLUMNS)
+    for row in daily_values.itertuples(index=False):
+        state.update(row.date, {col: getattr(row, col) for col in COLUMNS})
+
+    last_day = daily_values['date'].iloc[-1]
+    state.update(last_day + pd.Timedelta(hours=20), {'glucose_mg_dl': 400.0})
+    previous = daily_values['glucose_mg_dl'].iloc[-1]
+    revised = daily_values.copy()
+    revised.loc[revised.index[-1], 'glucose_mg_dl'] = 400.0 if np.isnan(previous) else (previous + 400.0) / 2
+
+    assert_features_equal(state.features(), pandas_rolling(revised))
+    assert not state.update(last_day - pd.Timedelta(days=1), {'glucose_mg_dl': 90.0})
+
+
+def test_seeded_state_continues_like_pandas_rolling(daily_values):
+    state = RollingWindowState(columns=COLUMNS)
+    seeded = daily_values.iloc[:50]
+    state.seed(seeded[COLUMNS].to_numpy(), seeded['date'].iloc[-1])
+    assert_features_equal(state.features(), pandas_rolling(seeded))
+
+    for n in range(50, len(daily_values)):
+        row = daily_values.iloc[n]
+        state.update(row['date'], {col: row[col] for col in COLUMNS})
+    assert_features_equal(state.features(), pandas_rolling(daily_values))
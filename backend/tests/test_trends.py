@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from trends import compute_trend_table, trends_from_row
+
+
+def reference_trends(patient_data, days=30):
+    """The per-patient polyfit loop compute_trend_table replaced"""
+    recent_data = patient_data.tail(days)
+    trends = {}
+    for key, column, threshold in (('glucose_trend', 'glucose_mg_dl', 1), ('weight_trend', 'weight_kg', 0.1),
+                                   ('bp_trend', 'systolic_bp', 0.5)):
+        data = recent_data[column].dropna()
+        if len(data) >= 7:
+            slope = np.polyfit(range(len(data)), data, 1)[0]
+            trends[key] = {
+                'direction': 'increasing' if slope > threshold else 'decreasing' if slope < -threshold else 'stable',
+                'magnitude': abs(slope),
+                'current_avg': data.tail(7).mean()
+            }
+    data = recent_data['adherence_avg'].dropna()
+    if len(data) >= 7:
+        trends['adherence_trend'] = {
+            'current_avg': data.tail(7).mean(),
+            'consistency': 1 - data.tail(7).std()
+        }
+    return trends
+
+
+def test_trend_table_matches_per_patient_loop(daily_records):
+    records = daily_records[0].sample(frac=1, random_state=1)
+    table = compute_trend_table(records)
+
+    assert set(table.index) == set(records['patient_id'])
+    for patient_id, patient_data in records.groupby('patient_id'):
+        expected = reference_trends(patient_data.sort_values('date'))
+        actual = trends_from_row(table.loc[patient_id])
+        assert actual.keys() == expected.keys()
+        for key, trend in expected.items():
+            assert actual[key].keys() == trend.keys()
+            for name, value in trend.items():
+                if isinstance(value, str):
+                    assert actual[key][name] == value
+                else:
+                    assert actual[key][name] == pytest.approx(value, rel=1e-9, abs=1e-9)
+
+
+def test_short_histories_have_no_trend(daily_records):
+    records = daily_records[0]
+    first = records['patient_id'].iloc[0]
+    short = records[records['patient_id'] == first].head(6)
+    assert trends_from_row(compute_trend_table(short).loc[first]) == {}
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+
+# (trend key, source column, slope threshold for 'increasing'/'decreasing')
+TREND_SPECS = [
+    ('glucose_trend', 'glucose_mg_dl', 1.0),
+    ('weight_trend', 'weight_kg', 0.1),
+    ('bp_trend', 'systolic_bp', 0.5),
+]
+
+ADHERENCE_COLUMN = 'adherence_avg'
+
+
+def _group_layout(df):
+    """Sort by patient/date if needed and return (sorted df, group codes, patient ids)"""
+    if not (df['patient_id'].is_monotonic_increasing and
+            df.groupby('patient_id', sort=False)['date'].is_monotonic_increasing.all()):
+        df = df.sort_values(['patient_id', 'date'], kind='stable')
+    codes, patients = pd.factorize(df['patient_id'], sort=False)
+    return df, codes, patients
+
+
+def _grouped_series_stats(values, codes, n_groups, min_points, recent_points):
+    """
+    Closed-form least-squares slope and recent-window stats for every group
+
+    Values must already be restricted to each group's lookback window and
+    ordered by time within group. NaNs are dropped first and x is the
+    position among the remaining values, matching
+    ``np.polyfit(range(len(series.dropna())), series.dropna(), 1)``.
+    """
+    valid = ~np.isnan(values)
+    y = values[valid]
+    c = codes[valid]
+
+    n = np.bincount(c, minlength=n_groups).astype(np.float64)
+    starts = np.cumsum(n) - n
+    x = np.arange(len(c), dtype=np.float64) - starts[c]
+
+    sum_x = np.bincount(c, weights=x, minlength=n_groups)
+    sum_y = np.bincount(c, weights=y, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+        dx = x - mean_x[c]
+        dy = y - mean_y[c]
+        sxx = np.bincount(c, weights=dx * dx, minlength=n_groups)
+        sxy = np.bincount(c, weights=dx * dy, minlength=n_groups)
+        slope = sxy / sxx
+
+        # Last `recent_points` valid values of each group
+        recent = (n[c] - 1 - x) < recent_points
+        rc = c[recent]
+        ry = y[recent]
+        rn = np.bincount(rc, minlength=n_groups).astype(np.float64)
+        recent_mean = np.bincount(rc, weights=ry, minlength=n_groups) / rn
+        rdev = ry - recent_mean[rc]
+        recent_std = np.sqrt(np.bincount(rc, weights=rdev * rdev, minlength=n_groups) / (rn - 1))
+
+    enough = n >= min_points
+    return {
+        'n': n,
+        'slope': np.where(enough, slope, np.nan),
+        'recent_mean': np.where(enough, recent_mean, np.nan),
+        'recent_std': np.where(enough, recent_std, np.nan),
+    }
+
+
+def compute_trend_table(df, days=30, min_points=7, recent_points=7):
+    """
+    Compute trend statistics for every patient in one vectorized pass
+
+    Args:
+        df (DataFrame): Daily records with patient_id, date and vital columns
+        days (int): Number of most recent rows per patient to analyse
+        min_points (int): Minimum non-null values required to report a trend
+        recent_points (int): Number of latest values used for current_avg / consistency
+
+    Returns:
+        DataFrame: One row per patient_id with ``<col>_slope``,
+        ``<col>_recent_mean`` and ``<col>_recent_std`` columns
+    """
+    df, codes, patients = _group_layout(df)
+    n_groups = len(patients)
+
+    # Restrict to the last `days` rows of each patient
+    sizes = np.bincount(codes, minlength=n_groups)
+    ends = np.cumsum(sizes)
+    rev_pos = ends[codes] - 1 - np.arange(len(codes))
+    in_window = rev_pos < days
+    window_codes = codes[in_window]
+
+    table = {}
+    columns = [col for _, col, _ in TREND_SPECS] + [ADHERENCE_COLUMN]
+    for col in columns:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)[in_window]
+        stats = _grouped_series_stats(values, window_codes, n_groups, min_points, recent_points)
+        table[f'{col}_slope'] = stats['slope']
+        table[f'{col}_recent_mean'] = stats['recent_mean']
+        table[f'{col}_recent_std'] = stats['recent_std']
+
+    return pd.DataFrame(table, index=pd.Index(patients, name='patient_id'))
+
+
+def trends_from_row(row):
+    """
+    Convert one row of ``compute_trend_table`` into the trends dict
+    returned by ``predict_patient_risk``
+    """
+    trends = {}
+
+    for key, col, threshold in TREND_SPECS:
+        slope = row.get(f'{col}_slope', np.nan)
+        if pd.isna(slope):
+            continue
+        trends[key] = {
+            'direction': 'increasing' if slope > threshold else 'decreasing' if slope < -threshold else 'stable',
+            'magnitude': float(abs(slope)),
+            'current_avg': float(row[f'{col}_recent_mean'])
+        }
+
+    recent_mean = row.get(f'{ADHERENCE_COLUMN}_recent_mean', np.nan)
+    if not pd.isna(recent_mean):
+        trends['adherence_trend'] = {
+            'current_avg': float(recent_mean),
+            'consistency': float(1 - row[f'{ADHERENCE_COLUMN}_recent_std'])  # Higher is more consistent
+        }
+
+    return trends
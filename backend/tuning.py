@@ -0,0 +1,169 @@
+import time
+
+import numpy as np
+import lightgbm as lgb
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+
+
+# Declared search spaces for each train_models candidate
+PARAM_SPACES = {
+    'LightGBM': {
+        'learning_rate': [0.02, 0.05, 0.1],
+        'num_leaves': [15, 31, 63],
+        'max_depth': [-1, 4, 6, 8],
+        'min_child_samples': [10, 20, 40],
+        'subsample': [0.7, 0.8, 1.0],
+        'subsample_freq': [1],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'reg_lambda': [0.0, 1.0, 5.0],
+    },
+    'Random Forest': {
+        'n_estimators': [200, 300, 500],
+        'max_depth': [6, 8, 12, None],
+        'min_samples_split': [2, 10, 20],
+        'min_samples_leaf': [1, 5, 10],
+        'max_features': ['sqrt', 0.5],
+    },
+    'Gradient Boosting': {
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [3, 4, 6],
+        'subsample': [0.7, 0.85, 1.0],
+        'min_samples_leaf': [1, 10, 20],
+    },
+    'Logistic Regression': {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'class_weight': [None, 'balanced'],
+    },
+}
+
+# Upper bound on boosting rounds when early stopping decides the actual count
+MAX_BOOSTING_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+
+
+def fit_with_early_stopping(name, model, X, y, X_val, y_val):
+    """
+    Fit one candidate, using the validation fold to stop boosting early
+
+    Returns:
+        tuple: (fitted model, boosting rounds actually built or None)
+    """
+    if name == 'LightGBM':
+        model.set_params(n_estimators=MAX_BOOSTING_ROUNDS)
+        model.fit(X, y, eval_set=[(X_val, y_val)], eval_metric='auc',
+                  callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        return model, int(model.best_iteration_ or model.n_estimators)
+
+    if name == 'Gradient Boosting':
+        # sklearn's built-in early stopping holds out its own validation fraction
+        model.set_params(n_estimators=MAX_BOOSTING_ROUNDS, n_iter_no_change=EARLY_STOPPING_ROUNDS // 5,
+                         validation_fraction=0.2)
+        model.fit(X, y)
+        return model, int(model.n_estimators_)
+
+    model.fit(X, y)
+    return model, None
+
+
+def _subsample(X, y, n, random_state):
+    if n >= len(y):
+        return X, y
+    try:
+        X_sub, _, y_sub, _ = train_test_split(X, y, train_size=n, random_state=random_state, stratify=y)
+    except ValueError:
+        # Too few minority rows to stratify this rung
+        X_sub, _, y_sub, _ = train_test_split(X, y, train_size=n, random_state=random_state)
+    return X_sub, y_sub
+
+
+def successive_halving(name, base_model, X, y, n_candidates=27, eta=3, min_resource=None,
+                       validation_size=0.2, random_state=42):
+    """
+    Successive-halving search over ``PARAM_SPACES[name]``
+
+    All sampled configurations start on a small stratified subsample of the
+    training rows; after each rung only the best 1/eta (by validation AUC)
+    continue, with eta times more rows, until the survivors are fitted on
+    all training rows.
+
+    Args:
+        name (str): Candidate name (key of PARAM_SPACES)
+        base_model (estimator): Estimator carrying the fixed parameters
+        X, y: Training data (a validation fold is split off for scoring/early stopping)
+        n_candidates (int): Configurations sampled for the first rung
+        eta (int): Halving rate
+        min_resource (int): Rows used in the first rung (derived from eta and rung count if None)
+        validation_size (float): Share of training rows used as validation fold
+        random_state (int): Random state for reproducibility
+
+    Returns:
+        tuple: (best fitted model, report dict with best params, rungs and compute budget)
+    """
+    start = time.perf_counter()
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=validation_size, random_state=random_state, stratify=y
+    )
+    n_rows = len(y_fit)
+
+    configs = list(ParameterSampler(PARAM_SPACES.get(name, {}), n_iter=n_candidates,
+                                    random_state=random_state)) or [{}]
+    n_rungs = max(1, int(np.ceil(np.log(len(configs)) / np.log(eta))) + 1)
+    if min_resource is None:
+        min_resource = max(int(n_rows / eta ** (n_rungs - 1)), 20)
+
+    survivors = [(config, None) for config in configs]
+    rungs = []
+    fits = samples_used = boosting_rounds = 0
+    resource = min_resource
+
+    for rung in range(n_rungs):
+        last_rung = rung == n_rungs - 1 or len(survivors) == 1
+        rows = n_rows if last_rung else min(resource, n_rows)
+        X_r, y_r = _subsample(X_fit, y_fit, rows, random_state + rung)
+
+        scored = []
+        for config, _ in survivors:
+            model = clone(base_model).set_params(**config)
+            try:
+                model, rounds = fit_with_early_stopping(name, model, X_r, y_r, X_val, y_val)
+                score = roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+            except Exception:
+                model, rounds, score = None, None, -np.inf
+            fits += 1
+            samples_used += rows
+            boosting_rounds += rounds or 0
+            scored.append((score, config, model))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        rungs.append({
+            'rung': rung,
+            'rows': rows,
+            'candidates': len(scored),
+            'best_auc': float(scored[0][0]),
+        })
+
+        if last_rung:
+            break
+        keep = max(1, len(scored) // eta)
+        survivors = [(config, model) for _, config, model in scored[:keep]]
+        resource *= eta
+
+    best_score, best_config, best_model = scored[0]
+    report = {
+        'best_params': best_config,
+        'validation_auc': float(best_score),
+        'rungs': rungs,
+        'budget': {
+            'fits': fits,
+            'samples_used': int(samples_used),
+            'boosting_rounds': int(boosting_rounds),
+            'seconds': time.perf_counter() - start,
+            # What an exhaustive evaluation of the same configurations on all rows would cost
+            'full_search_samples': int(len(configs) * n_rows),
+        },
+    }
+    if best_model is not None and hasattr(best_model, 'best_iteration_'):
+        report['best_iteration'] = int(best_model.best_iteration_ or 0)
+    return best_model, report
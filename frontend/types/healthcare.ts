@@ -76,6 +76,26 @@ export interface ModelMetrics {
     mean_predicted_value: number[];
     fraction_of_positives: number[];
   };
+  all_results?: Record<string, {
+    auc: number;
+    auprc: number;
+    confusion_matrix: number[][];
+    serving?: {
+      predict_single_ms: number;
+      predict_batch_ms: number;
+      batch_size: number;
+      shap_single_ms: number | null;
+      serving_ms: number;
+      model_size_bytes: number;
+    };
+  }>;
+  selection?: {
+    policy: 'auc' | 'latency_budget' | 'pareto';
+    latency_budget_ms: number | null;
+    selected: string;
+    pareto_front: string[];
+    note?: string;
+  };
   clinical_interpretation: {
     model_reliability: string;
     recommended_use: string[];